@@ -0,0 +1,165 @@
+"""
+エージェント実行の計測・表示用コールバック
+
+LangChain のコールバック機構を使い、モデル呼び出し回数、呼び出しごとのトークン数、
+最初のツール呼び出し・最初の回答トークンまでの時間を記録する。ストリーミング表示（langchain_client.py --stream）もここで行う。
+langchain_core の読み込みを伴うため、エージェントを実行する時点で初めてインポートされる。
+"""
+
+import json
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from tool_descriptions import count_tokens
+
+# OpenAI のチャット形式でメッセージごとに加わるトークン数（概算時のみ使用）
+MESSAGE_OVERHEAD_TOKENS = 3
+
+
+class ModelTurnCounter(BaseCallbackHandler):
+    """エージェント実行中のモデル呼び出し回数（ターン数）を数えるコールバック"""
+    def __init__(self):
+        self.turns = 0
+        
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.turns += 1
+        
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.turns += 1
+
+
+@lru_cache(maxsize=64)
+def _tool_schema_tokens(definitions_json: str) -> int:
+    return count_tokens(definitions_json)
+
+
+def _tool_definitions(invocation_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """モデルに送られる関数定義（tools 形式は function の部分、tool_descriptions.measure_tool_tokens と同じ単位）"""
+    definitions = invocation_params.get("tools") or invocation_params.get("functions") or []
+    return [definition.get("function", definition) if isinstance(definition, dict) else definition
+            for definition in definitions]
+
+
+def _message_tokens(message) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(str(message.content or ""))
+    tool_calls = getattr(message, "tool_calls", None) or message.additional_kwargs.get("function_call")
+    if tool_calls:
+        tokens += count_tokens(json.dumps(tool_calls, ensure_ascii=False, default=str))
+    return tokens
+
+
+class TokenUsageCounter(BaseCallbackHandler):
+    """
+    エージェント実行中のモデル呼び出し（ターン）ごとのトークン数を記録するコールバック。
+    
+    API が報告した usage（usage_metadata / llm_output["token_usage"]）を使い、報告がない場合
+    （ストリーミング・テスト用のモデルなど）はメッセージとツール定義から概算して estimated とする。
+    tool_schema_tokens はツール定義（functions / tools 引数）の分で、報告値の場合も概算で内訳を示す。
+    LLM応答キャッシュのヒットは cached とする（トークンは消費されていない）。
+    """
+    
+    def __init__(self):
+        self.turns: List[Dict[str, Any]] = []
+        self._pending: Dict[Any, Dict[str, int]] = {}
+        
+    def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+        definitions = _tool_definitions(kwargs.get("invocation_params") or {})
+        schema_tokens = _tool_schema_tokens(json.dumps(definitions, ensure_ascii=False)) if definitions else 0
+        message_tokens = sum(_message_tokens(message) for batch in messages for message in batch)
+        self._pending[run_id] = {"prompt_tokens": message_tokens + schema_tokens, "tool_schema_tokens": schema_tokens}
+        
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        self._pending[run_id] = {"prompt_tokens": sum(count_tokens(prompt) for prompt in prompts),
+                                 "tool_schema_tokens": 0}
+        
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        estimate = self._pending.pop(run_id, {"prompt_tokens": 0, "tool_schema_tokens": 0})
+        generations = [generation for batch in response.generations for generation in batch]
+        message = getattr(generations[0], "message", None) if generations else None
+        usage = getattr(message, "usage_metadata", None) or {}
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        
+        turn = {"tool_schema_tokens": estimate["tool_schema_tokens"], "estimated": False,
+                "cached": "total_cost" in usage and not response.llm_output}
+        if usage.get("input_tokens"):
+            turn["prompt_tokens"] = usage["input_tokens"]
+            turn["completion_tokens"] = usage.get("output_tokens", 0)
+        elif token_usage.get("prompt_tokens"):
+            turn["prompt_tokens"] = token_usage["prompt_tokens"]
+            turn["completion_tokens"] = token_usage.get("completion_tokens", 0)
+        else:
+            turn["prompt_tokens"] = estimate["prompt_tokens"]
+            turn["completion_tokens"] = sum(_message_tokens(generation.message) - MESSAGE_OVERHEAD_TOKENS
+                                            if getattr(generation, "message", None) is not None
+                                            else count_tokens(generation.text) for generation in generations)
+            turn["estimated"] = True
+        self.turns.append(turn)
+        
+    def totals(self, include_cached: bool = False) -> Dict[str, Any]:
+        """ターンの合計（既定ではキャッシュヒットのターンを除く）"""
+        turns = [turn for turn in self.turns if include_cached or not turn["cached"]]
+        return {
+            "prompt_tokens": sum(turn["prompt_tokens"] for turn in turns),
+            "completion_tokens": sum(turn["completion_tokens"] for turn in turns),
+            "tool_schema_tokens": sum(turn["tool_schema_tokens"] for turn in turns),
+            "estimated": any(turn["estimated"] for turn in turns),
+        }
+
+
+class StreamTimingHandler(BaseCallbackHandler):
+    """
+    エージェント実行中の最初の回答トークン・最初のツール呼び出しまでの時間を記録するコールバック。
+    
+    ストリーミングしない経路（LLM応答キャッシュ有効時など）では、テキストを含む応答の完了時刻を
+    最初のトークンの時刻とする。
+    """
+    
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+        self.time_to_first_tool_call: Optional[float] = None
+    
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token and self.time_to_first_token is None:
+            self.time_to_first_token = self._elapsed()
+    
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        if self.time_to_first_token is None and any(
+                generation.text for generations in response.generations for generation in generations):
+            self.time_to_first_token = self._elapsed()
+    
+    def on_tool_start(self, serialized, input_str, **kwargs: Any) -> None:
+        if self.time_to_first_tool_call is None:
+            self.time_to_first_tool_call = self._elapsed()
+
+
+class StreamingConsoleHandler(StreamTimingHandler):
+    """ツール呼び出しの途中経過と回答トークンを到着順に表示するコールバック"""
+    
+    def __init__(self):
+        super().__init__()
+        self.streamed_tokens = False
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        super().on_llm_new_token(token, **kwargs)
+        if token:
+            self.streamed_tokens = True
+            print(token, end="", flush=True)
+    
+    def on_agent_action(self, action, **kwargs: Any) -> None:
+        print(f"\n🔧 {action.tool}({action.tool_input})", flush=True)
+    
+    def on_tool_end(self, output, **kwargs: Any) -> None:
+        print(f"   → {getattr(output, 'content', output)}", flush=True)
+    
+    def print_timings(self):
+        total = self._elapsed()
+        first_token = f"{self.time_to_first_token:.2f}s" if self.time_to_first_token is not None else "-"
+        first_tool = f"{self.time_to_first_tool_call:.2f}s" if self.time_to_first_tool_call is not None else "-"
+        print(f"\n⏱️  first tool call: {first_tool}, first token: {first_token}, total: {total:.2f}s")
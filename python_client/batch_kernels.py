@@ -0,0 +1,363 @@
+"""
+リスト値を一括で処理するバッチ版の数学関数（NumPy ベクトル化カーネル）
+
+多数の値を素数判定・素因数分解する場合、エージェントは値ごとに CSharpFunctionTool を呼び出し、
+値の数だけ HTTP 往復とツール呼び出しが発生する。このモジュールは純粋関数のバッチ版を提供し、
+1回の /execute で配列全体を処理する。
+
+- is_prime_batch / prime_factorization_batch: 最小素因数テーブル（spf_table）の参照をベクトル化
+  （テーブル範囲外の値は素数判定は小さな素数による一括試し割り、素因数分解は値ごとの試し割り）
+- gcd_batch / lcm_batch: 整数ペアの配列に対して np.gcd と int32 のラップアラウンドを再現した演算
+
+各要素の結果・エラーメッセージは math_reference（MathFunctions.cs の意味論）のスカラー版と同じで、
+1つでも不正な要素があれば C# のリスト関数と同様にリクエスト全体がエラーになる。
+ツール定義は /tools と同じ形式の BATCH_TOOL_DEFINITIONS で、local_function_server が公開する。
+
+使用方法:
+    from batch_kernels import execute_batch
+    execute_batch("is_prime_batch", {"list": [2, 15, 97]})     # result: [True, False, True]
+    execute_batch("gcd_batch", {"pairs": [[12, 18], [7, 5]]})   # result: [6, 1]
+
+    python batch_kernels.py --benchmark                          # 10, 10k, 1M 要素でスカラー版と比較
+    python batch_kernels.py --benchmark --server http://localhost:8080
+"""
+
+import gc
+import math
+import time
+import argparse
+from typing import Dict, Any, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import math_reference as ref
+import spf_table
+
+PAIR_ALIASES = ("pairs", "list", "values", "data", "items")
+
+# 一括試し割りで、この素数の個数ごとに判定済みの値を除外する
+TRIAL_DIVISION_COMPACT_INTERVAL = 64
+
+
+def _require_numpy():
+    if np is None:
+        raise Exception("numpy is required for the batch math kernels (pip install numpy)")
+
+
+def to_int32_array(value: Any) -> Optional["np.ndarray"]:
+    """
+    ParseIntegerList 相当: 整数リストを int64 配列に変換する（変換できなければ None = "Invalid list format"）
+    数値の配列はベクトル化して検査し、数値の文字列などを含む場合は math_reference.parse_integer_list で要素ごとに変換する
+    """
+    _require_numpy()
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        return None
+    array = np.asarray(value)
+    if array.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    if array.ndim != 1:
+        return None
+    if array.dtype.kind not in "iubf":
+        numbers = ref.parse_integer_list(array.tolist())
+        return None if numbers is None else np.asarray(numbers, dtype=np.int64)
+    if array.dtype.kind == "f" and not np.all(np.isfinite(array) & (array == np.round(array))):
+        return None
+    if array.min() < ref.INT32_MIN or array.max() > ref.INT32_MAX:
+        return None
+    return array.astype(np.int64)
+
+
+def to_int32_pairs(value: Any) -> "np.ndarray":
+    """[[a, b], ...] を (n, 2) の int64 配列に変換する"""
+    _require_numpy()
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        raise ValueError("Invalid pairs format")
+    array = np.asarray(value)
+    if array.size == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    if array.ndim != 2 or array.shape[1] != 2:
+        raise ValueError("Invalid pairs format")
+    first, second = to_int32_array(array[:, 0]), to_int32_array(array[:, 1])
+    if first is None or second is None:
+        raise ValueError("Invalid pairs format")
+    return np.stack([first, second], axis=1)
+
+
+def _wrap_int32(values: "np.ndarray") -> "np.ndarray":
+    return (values + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+def _trial_division_is_prime(values: "np.ndarray") -> "np.ndarray":
+    """sqrt(最大値) 以下の素数で一括して試し割りする（値はすべて 2 以上）"""
+    primes = np.flatnonzero(spf_table.build_spf_array(math.isqrt(int(values.max())) + 1) == 0)[2:]
+    result = np.ones(len(values), dtype=bool)
+    alive = np.arange(len(values))
+    for start in range(0, len(primes), TRIAL_DIVISION_COMPACT_INTERVAL):
+        candidates = values[alive]
+        composite = np.zeros(len(alive), dtype=bool)
+        for p in primes[start:start + TRIAL_DIVISION_COMPACT_INTERVAL]:
+            composite |= (candidates % p == 0) & (candidates != p)
+        result[alive[composite]] = False
+        # 合成数と、残りの素数の2乗より小さい値（素数と確定）を除外する
+        if start + TRIAL_DIVISION_COMPACT_INTERVAL < len(primes):
+            next_prime = int(primes[start + TRIAL_DIVISION_COMPACT_INTERVAL])
+            alive = alive[~composite & (candidates >= next_prime * next_prime)]
+        if len(alive) == 0:
+            break
+    return result
+
+
+def is_prime_batch(numbers: "np.ndarray", table: Optional["spf_table.SPFTable"] = None) -> List[bool]:
+    table = table or spf_table.get_spf_table()
+    numbers = np.asarray(numbers, dtype=np.int64)
+    result = numbers > 1
+    in_range = result & (numbers <= table.limit)
+    result[in_range] = table.spf[numbers[in_range]] == 0
+    outside = np.flatnonzero(numbers > table.limit)
+    if len(outside):
+        result[outside] = _trial_division_is_prime(numbers[outside])
+    return result.tolist()
+
+
+def prime_factorization_batch(numbers: "np.ndarray",
+                              table: Optional["spf_table.SPFTable"] = None) -> List[List[int]]:
+    table = table or spf_table.get_spf_table()
+    numbers = np.asarray(numbers, dtype=np.int64)
+    if len(numbers) and numbers.min() <= 1:
+        raise ValueError("Number must be greater than 1")
+
+    in_range = np.flatnonzero(numbers <= table.limit)
+    remaining = numbers[in_range].copy()
+    columns = []
+    # 全要素の最小素因数を同時にたどる（反復回数は素因数の個数の最大値 <= log2(limit)）
+    while True:
+        active = remaining > 1
+        if not active.any():
+            break
+        factor = table.spf[remaining].astype(np.int64)
+        factor = np.where(factor == 0, remaining, factor)
+        columns.append(np.where(active, factor, 0).astype(np.int32))
+        remaining = np.where(active, remaining // np.where(active, factor, 1), remaining)
+
+    results: List[List[int]] = [[] for _ in range(len(numbers))]
+    if columns:
+        # 各行の素因数は左詰めなので、0 以外を行優先で取り出して行ごとの個数で切り分ける
+        matrix = np.stack(columns, axis=1)
+        present = matrix != 0
+        flat = matrix[present].tolist()
+        ends = np.cumsum(np.count_nonzero(present, axis=1)).tolist()
+        start = 0
+        for index, end in zip(in_range.tolist(), ends):
+            results[index] = flat[start:end]
+            start = end
+    for index in np.flatnonzero(numbers > table.limit).tolist():
+        results[index] = ref.prime_factorization(int(numbers[index]))
+    return results
+
+
+def _gcd_arrays(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    # Math.Abs(int.MinValue) と同じく OverflowError
+    if np.any(a == ref.INT32_MIN) or np.any(b == ref.INT32_MIN):
+        raise OverflowError(ref.NEGATE_MIN_VALUE_MESSAGE)
+    return np.gcd(np.abs(a), np.abs(b))
+
+
+def gcd_batch(pairs: "np.ndarray") -> List[int]:
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    return _gcd_arrays(pairs[:, 0], pairs[:, 1]).tolist()
+
+
+def lcm_batch(pairs: "np.ndarray") -> List[int]:
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    a, b = pairs[:, 0], pairs[:, 1]
+    zero = (a == 0) | (b == 0)
+    # Math.Abs(a * b) は乗算が先にラップしてから絶対値を取る
+    product = _wrap_int32(a * b)
+    if np.any(product[~zero] == ref.INT32_MIN):
+        raise OverflowError(ref.NEGATE_MIN_VALUE_MESSAGE)
+    gcd = _gcd_arrays(np.where(zero, 1, a), np.where(zero, 1, b))
+    return np.where(zero, 0, np.abs(product) // gcd).tolist()
+
+
+LIST_MISSING_MESSAGE = ("Missing list argument. Expected: 'list', 'numbers', 'values', 'arr', 'data', or 'items'. "
+                        "Received: {received}")
+PAIRS_MISSING_MESSAGE = ("Missing pairs argument. Expected: 'pairs', 'list', 'values', 'data', or 'items'. "
+                         "Received: {received}")
+
+# math_reference.FUNCTION_TABLE と同じ形式のバッチ関数表
+BATCH_FUNCTION_TABLE: Dict[str, Any] = {
+    "is_prime_batch": ([(ref.LIST_ALIASES, to_int32_array)], is_prime_batch, LIST_MISSING_MESSAGE),
+    "prime_factorization_batch": (
+        [(ref.LIST_ALIASES, to_int32_array)], prime_factorization_batch, LIST_MISSING_MESSAGE),
+    "gcd_batch": ([(PAIR_ALIASES, to_int32_pairs)], gcd_batch, PAIRS_MISSING_MESSAGE),
+    "lcm_batch": ([(PAIR_ALIASES, to_int32_pairs)], lcm_batch, PAIRS_MISSING_MESSAGE),
+}
+
+# バッチ版 -> 対応するスカラー版
+SCALAR_FUNCTIONS = {
+    "is_prime_batch": "is_prime",
+    "prime_factorization_batch": "prime_factorization",
+    "gcd_batch": "gcd",
+    "lcm_batch": "lcm",
+}
+
+
+def _integer_list_schema(description: str) -> Dict[str, Any]:
+    return {"type": "array", "description": description, "items": {"type": "integer", "description": None, "items": None}}
+
+
+def _pair_list_schema(description: str) -> Dict[str, Any]:
+    pair = {"type": "array", "description": "[a, b]", "items": {"type": "integer", "description": None, "items": None}}
+    return {"type": "array", "description": description, "items": pair}
+
+
+# /tools と同じ形式のツール定義
+BATCH_TOOL_DEFINITIONS: List[Dict[str, Any]] = [
+    {
+        "name": "is_prime_batch",
+        "description": ("整数リストの各要素が素数かどうかを一括で判定する。\n\n"
+                        "複数の数値を判定する場合は is_prime を繰り返し呼び出さずにこの関数を1回呼び出してください。\n"
+                        "結果は入力と同じ順序の真偽値のリストです。\n\n"
+                        "使用例:\n- is_prime_batch([2, 15, 97]) → [true, false, true]"),
+        "parameters": {"type": "object", "properties": {"list": _integer_list_schema("素数判定する整数のリスト")},
+                       "required": ["list"]},
+    },
+    {
+        "name": "prime_factorization_batch",
+        "description": ("整数リストの各要素を一括で素因数分解する。\n\n"
+                        "複数の数値を素因数分解する場合は prime_factorization を繰り返し呼び出さずに"
+                        "この関数を1回呼び出してください。\n"
+                        "- 各要素は1より大きい整数である必要があります（最大対応値: 1,000,000）\n"
+                        "- 結果は入力と同じ順序の素因数リストのリストです\n\n"
+                        "使用例:\n- prime_factorization_batch([12, 15]) → [[2, 2, 3], [3, 5]]"),
+        "parameters": {"type": "object",
+                       "properties": {"list": _integer_list_schema("素因数分解する整数のリスト (各要素2以上1,000,000以下)")},
+                       "required": ["list"]},
+    },
+    {
+        "name": "gcd_batch",
+        "description": ("整数ペアのリストの各ペアの最大公約数を一括で計算する。\n\n"
+                        "使用例:\n- gcd_batch([[12, 18], [7, 5]]) → [6, 1]"),
+        "parameters": {"type": "object", "properties": {"pairs": _pair_list_schema("[a, b] 形式の整数ペアのリスト")},
+                       "required": ["pairs"]},
+    },
+    {
+        "name": "lcm_batch",
+        "description": ("整数ペアのリストの各ペアの最小公倍数を一括で計算する。\n\n"
+                        "使用例:\n- lcm_batch([[4, 6], [3, 5]]) → [12, 15]"),
+        "parameters": {"type": "object", "properties": {"pairs": _pair_list_schema("[a, b] 形式の整数ペアのリスト")},
+                       "required": ["pairs"]},
+    },
+]
+
+
+def execute_batch(function_name: str, arguments: Dict[str, Any], request_id: str = "",
+                  functions: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """バッチ関数を /execute と同じ形式の応答で実行する"""
+    return ref.execute(function_name, arguments, request_id, functions=functions,
+                       function_table=BATCH_FUNCTION_TABLE)
+
+
+def _benchmark_inputs(function_name: str, size: int, rng) -> Dict[str, Any]:
+    if function_name in ("gcd_batch", "lcm_batch"):
+        # lcm が int32 に収まる範囲の値
+        return {"pairs": rng.integers(1, 40000, size=(size, 2)).tolist()}
+    return {"list": rng.integers(2, 1_000_001, size=size).tolist()}
+
+
+def _scalar_arguments(function_name: str, arguments: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if "pairs" in arguments:
+        return [{"a": a, "b": b} for a, b in arguments["pairs"]]
+    return [{"number": n} for n in arguments["list"]]
+
+
+def benchmark(sizes=(10, 10_000, 1_000_000), server_url: Optional[str] = None,
+              http_scalar_max: int = 10_000, seed: int = 0) -> Dict[str, Any]:
+    """
+    バッチ版（1回の呼び出し）とスカラー版（要素ごとの呼び出し）の処理時間を比較する。
+    server_url を指定すると /execute 経由で計測する（スカラー版は http_scalar_max 要素まで）。
+    """
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    spf_table.get_spf_table()
+    # 初回呼び出し時の NumPy の遅延初期化を計測から除く
+    for batch_name in SCALAR_FUNCTIONS:
+        execute_batch(batch_name, _benchmark_inputs(batch_name, 10, rng))
+
+    if server_url:
+        import uuid
+        from csharp_tools import get_http_session
+        session = get_http_session()
+
+        def call(name, arguments):
+            response = session.post(f"{server_url}/execute", timeout=300,
+                                    json={"function_name": name, "arguments": arguments, "request_id": str(uuid.uuid4())})
+            return response.json()
+    else:
+        def call(name, arguments):
+            if name in BATCH_FUNCTION_TABLE:
+                return execute_batch(name, arguments)
+            return ref.execute(name, arguments)
+
+    results: Dict[str, Any] = {}
+    for batch_name, scalar_name in SCALAR_FUNCTIONS.items():
+        results[batch_name] = {}
+        for size in sizes:
+            # 前回の大きな結果の解放が計測に含まれないようにする
+            batch_response = scalar_results = None
+            gc.collect()
+            arguments = _benchmark_inputs(batch_name, size, rng)
+            start = time.perf_counter()
+            batch_response = call(batch_name, arguments)
+            batch_seconds = time.perf_counter() - start
+            if not batch_response.get("success"):
+                raise Exception(f"{batch_name} failed: {batch_response.get('error')}")
+
+            entry = {"batch_seconds": batch_seconds, "scalar_seconds": None, "speedup": None}
+            if not server_url or size <= http_scalar_max:
+                scalar_results = []
+                start = time.perf_counter()
+                for scalar_arguments in _scalar_arguments(batch_name, arguments):
+                    scalar_results.append(call(scalar_name, scalar_arguments)["result"])
+                entry["scalar_seconds"] = time.perf_counter() - start
+                entry["speedup"] = entry["scalar_seconds"] / batch_seconds if batch_seconds else 0.0
+                if scalar_results != batch_response["result"]:
+                    raise Exception(f"{batch_name} differs from {scalar_name} at size {size}")
+            results[batch_name][size] = entry
+    return results
+
+
+def print_benchmark_report(results: Dict[str, Any]):
+    print(f"\n{'Function':<28} {'Elements':>10} {'Scalar':>12} {'Batch':>12} {'Speedup':>10}")
+    for batch_name, by_size in results.items():
+        for size, entry in by_size.items():
+            scalar = f"{entry['scalar_seconds'] * 1000:.1f}ms" if entry["scalar_seconds"] is not None else "skipped"
+            speedup = f"{entry['speedup']:.1f}x" if entry["speedup"] is not None else "-"
+            print(f"{batch_name:<28} {size:>10,} {scalar:>12} {entry['batch_seconds'] * 1000:>10.1f}ms {speedup:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch math kernels against the scalar functions")
+    parser.add_argument("--benchmark", action="store_true", required=True, help="Run the benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 1_000_000], help="Element counts")
+    parser.add_argument("--server", type=str, metavar="URL", help="Measure through /execute on a running server")
+    parser.add_argument("--http-scalar-max", type=int, default=10_000,
+                        help="Largest size measured with per-element HTTP calls (default: 10000)")
+    args = parser.parse_args()
+
+    try:
+        where = f"via {args.server}/execute" if args.server else "in-process"
+        print(f"📊 Batch kernels vs scalar calls ({where})")
+        print_benchmark_report(benchmark(args.sizes, args.server, args.http_scalar_max))
+        return 0
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
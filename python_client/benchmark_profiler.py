@@ -0,0 +1,388 @@
+"""
+ベンチマーク実行のためのプロファイリングユーティリティ
+
+test_performance.py の --profile モードとメモリストレステストから使用され、以下を提供:
+- cProfile による関数単位のホットスポット集計（スレッドごとに計測して統合）
+- 統計的スタックサンプラーによるフレームグラフ用 collapsed-stack 出力
+- tracemalloc スナップショット差分による割り当て追跡とリーク判定
+
+collapsed-stack 形式は flamegraph.pl や speedscope にそのまま読み込める:
+    python test_performance.py --benchmark-basic --profile
+    flamegraph.pl profiles/single_request.collapsed > single_request.svg
+"""
+
+import os
+import sys
+import gc
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable
+
+
+class StackSampler:
+    """登録されたスレッドのPythonスタックを一定間隔でサンプリングする"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stack_counts: Counter = Counter()
+        self.sample_count = 0
+        self._thread_ids: Set[int] = set()
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def register_thread(self, thread_id: Optional[int] = None):
+        """Add a thread to the sampling target set"""
+        with self._lock:
+            self._thread_ids.add(thread_id or threading.get_ident())
+
+    def unregister_thread(self, thread_id: Optional[int] = None):
+        """Remove a thread from the sampling target set"""
+        with self._lock:
+            self._thread_ids.discard(thread_id or threading.get_ident())
+
+    def start(self):
+        """Start the background sampling thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self._sample_loop, name="stack-sampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def _sample_loop(self):
+        """Take stack samples in a loop"""
+        while self._running:
+            with self._lock:
+                targets = set(self._thread_ids)
+
+            frames = sys._current_frames()
+            for thread_id in targets:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                self.stack_counts[";".join(stack)] += 1
+                self.sample_count += 1
+
+            time.sleep(self.interval)
+
+    def write_collapsed(self, filename: str):
+        """Write samples in collapsed-stack format ("frame;frame;frame count")"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, count in self.stack_counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class BenchmarkProfiler:
+    """ベンチマーク区間を cProfile と統計的サンプラーで計測する"""
+
+    def __init__(self, name: str, output_dir: str = "profiles",
+                 sample_interval: float = 0.005, top_n: int = 15):
+        self.name = name
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.sampler = StackSampler(sample_interval)
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def __enter__(self) -> "BenchmarkProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start sampling and profile the calling thread"""
+        self.start_time = time.time()
+        self.sampler.start()
+        self._main_profile = self._begin_thread_profile()
+
+    def stop(self):
+        """Stop sampling and profiling of the calling thread"""
+        self._end_thread_profile(self._main_profile)
+        self.sampler.stop()
+        self.end_time = time.time()
+
+    @contextmanager
+    def thread_profile(self):
+        """Profile the current worker thread (for concurrent benchmarks)"""
+        profile = self._begin_thread_profile()
+        try:
+            yield
+        finally:
+            self._end_thread_profile(profile)
+
+    def _begin_thread_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        self.sampler.register_thread()
+        profile.enable()
+        return profile
+
+    def _end_thread_profile(self, profile: cProfile.Profile):
+        profile.disable()
+        self.sampler.unregister_thread()
+
+    def _merged_stats(self) -> Optional[pstats.Stats]:
+        """Merge per-thread profiles into a single pstats.Stats"""
+        stats = None
+        for profile in self._profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # 一度も関数呼び出しを記録しなかったプロファイル
+                continue
+        return stats
+
+    def get_hot_functions(self, top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return the functions with the highest own (tottime) cost"""
+        stats = self._merged_stats()
+        if stats is None:
+            return []
+
+        entries = []
+        for (filename, line, func_name), (cc, nc, tottime, cumtime, callers) in stats.stats.items():
+            entries.append({
+                "function": func_name,
+                "file": os.path.basename(filename),
+                "line": line,
+                "calls": nc,
+                "tottime": tottime,
+                "cumtime": cumtime
+            })
+
+        entries.sort(key=lambda e: e["tottime"], reverse=True)
+        return entries[:top_n or self.top_n]
+
+    def save(self) -> Dict[str, str]:
+        """Write pstats and collapsed-stack files, return their paths"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        pstats_file = os.path.join(self.output_dir, f"{self.name}.prof")
+        collapsed_file = os.path.join(self.output_dir, f"{self.name}.collapsed")
+
+        stats = self._merged_stats()
+        if stats is not None:
+            stats.dump_stats(pstats_file)
+        self.sampler.write_collapsed(collapsed_file)
+
+        return {"pstats": pstats_file, "collapsed_stacks": collapsed_file}
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Save outputs and return a JSON-serializable profile summary"""
+        files = self.save()
+        return {
+            "duration_seconds": self.end_time - self.start_time,
+            "samples": self.sampler.sample_count,
+            "files": files,
+            "hot_functions": self.get_hot_functions()
+        }
+
+
+class AllocationTracker:
+    """tracemalloc スナップショットを周期的に取得し、割り当ての増加箇所を追跡する"""
+
+    # 生存数を数えるオブジェクト型（エージェント、会話メモリ、テスト結果、ログキャプチャ）
+    DEFAULT_TRACKED_TYPES = (
+        "AgentExecutor", "ConversationBufferMemory", "InMemoryChatMessageHistory",
+        "HumanMessage", "AIMessage", "FunctionMessage",
+        "TestResult", "TestSession", "StringIO"
+    )
+
+    def __init__(self, snapshot_interval: int = 50, top_n: int = 10, traceback_frames: int = 10,
+                 tracked_types: Iterable[str] = DEFAULT_TRACKED_TYPES,
+                 leak_threshold_bytes: float = 1024):
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.top_n = top_n
+        self.traceback_frames = traceback_frames
+        self.tracked_types = set(tracked_types)
+        self.leak_threshold_bytes = leak_threshold_bytes
+        self.samples: List[Dict[str, Any]] = []
+        self.interval_diffs: List[Dict[str, Any]] = []
+        self._first_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracing and take the baseline snapshot"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self._started_tracing = True
+        self.snapshot(0)
+
+    def stop(self, iteration: int):
+        """Take the final snapshot and stop tracing"""
+        if not self.samples or self.samples[-1]["iteration"] != iteration:
+            self.snapshot(iteration)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def maybe_snapshot(self, iteration: int):
+        """Take a snapshot every snapshot_interval iterations"""
+        if iteration > 0 and iteration % self.snapshot_interval == 0:
+            self.snapshot(iteration)
+
+    def snapshot(self, iteration: int):
+        """Record traced memory, live object counts and the diff to the previous snapshot"""
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        traced_bytes = sum(stat.size for stat in snapshot.statistics("filename"))
+
+        self.samples.append({
+            "iteration": iteration,
+            "traced_bytes": traced_bytes,
+            "object_counts": self.count_live_objects()
+        })
+
+        if self._last_snapshot is not None:
+            self.interval_diffs.append({
+                "from_iteration": self.samples[-2]["iteration"],
+                "to_iteration": iteration,
+                "top_growth": self._top_growth(snapshot, self._last_snapshot, 3)
+            })
+
+        if self._first_snapshot is None:
+            self._first_snapshot = snapshot
+        self._last_snapshot = snapshot
+
+    def count_live_objects(self) -> Dict[str, int]:
+        """Count live objects of the tracked types"""
+        counts = {type_name: 0 for type_name in self.tracked_types}
+        for obj in gc.get_objects():
+            type_name = type(obj).__name__
+            if type_name in counts:
+                counts[type_name] += 1
+        return counts
+
+    def _top_growth(self, newer: tracemalloc.Snapshot, older: tracemalloc.Snapshot,
+                    limit: int) -> List[Dict[str, Any]]:
+        """Return allocation sites with the largest growth between two snapshots"""
+        growth = []
+        for stat in newer.compare_to(older, "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            growth.append({
+                "site": f"{frame.filename}:{frame.lineno}",
+                "size_diff_kb": stat.size_diff / 1024,
+                "count_diff": stat.count_diff,
+                "size_kb": stat.size / 1024
+            })
+            if len(growth) >= limit:
+                break
+        return growth
+
+    @staticmethod
+    def _slope(points: List[Tuple[float, float]]) -> Tuple[float, float]:
+        """Least-squares slope and R² of (x, y) points"""
+        n = len(points)
+        if n < 2:
+            return 0.0, 0.0
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        syy = sum((y - mean_y) ** 2 for _, y in points)
+        if sxx == 0:
+            return 0.0, 0.0
+        slope = sxy / sxx
+        r_squared = (sxy * sxy) / (sxx * syy) if syy > 0 else 0.0
+        return slope, r_squared
+
+    def get_report(self) -> Dict[str, Any]:
+        """Build a JSON-serializable allocation report with a leak verdict"""
+        bytes_slope, r_squared = self._slope(
+            [(s["iteration"], s["traced_bytes"]) for s in self.samples])
+
+        object_slopes = {}
+        for type_name in sorted(self.tracked_types):
+            slope, _ = self._slope([(s["iteration"], s["object_counts"].get(type_name, 0))
+                                    for s in self.samples])
+            object_slopes[type_name] = slope
+
+        iterations = self.samples[-1]["iteration"] if self.samples else 0
+        if len(self.samples) < 3:
+            verdict = "insufficient_data"
+        elif bytes_slope > self.leak_threshold_bytes and r_squared >= 0.8:
+            verdict = "leak_suspected"
+        elif bytes_slope > self.leak_threshold_bytes:
+            verdict = "growth_unstable"
+        else:
+            verdict = "no_leak"
+
+        top_growth = []
+        if self._first_snapshot is not None and self._last_snapshot is not None:
+            top_growth = self._top_growth(self._last_snapshot, self._first_snapshot, self.top_n)
+
+        return {
+            "iterations": iterations,
+            "snapshot_interval": self.snapshot_interval,
+            "verdict": verdict,
+            "bytes_per_iteration": bytes_slope,
+            "r_squared": r_squared,
+            "object_growth_per_iteration": object_slopes,
+            "samples": self.samples,
+            "top_growth": top_growth,
+            "interval_diffs": self.interval_diffs
+        }
+
+
+def print_allocation_report(report: Dict[str, Any]):
+    """Print the allocation tracking section of a memory benchmark"""
+    print(f"Allocations - Verdict: {report['verdict']} "
+          f"({report['bytes_per_iteration'] / 1024:.2f} KB/iteration over {report['iterations']} iterations, "
+          f"R²={report['r_squared']:.2f})")
+
+    if report["samples"]:
+        first_counts = report["samples"][0]["object_counts"]
+        last_counts = report["samples"][-1]["object_counts"]
+        live = [f"{name}={last_counts[name]} ({last_counts[name] - first_counts.get(name, 0):+d})"
+                for name in sorted(last_counts) if last_counts[name] or first_counts.get(name)]
+        if live:
+            print(f"  Live objects: {', '.join(live)}")
+
+    if report["top_growth"]:
+        print("  Top growing allocation sites:")
+        for entry in report["top_growth"]:
+            print(f"    {entry['size_diff_kb']:+10.1f} KB {entry['count_diff']:+8d} blocks  {entry['site']}")
+
+
+def print_hot_functions(profile: Dict[str, Any], limit: int = 10):
+    """Print the hot function table of a profile summary"""
+    hot_functions = profile.get("hot_functions", [])
+    print(f"Profile - Samples: {profile.get('samples', 0)}, "
+          f"Flame graph input: {profile.get('files', {}).get('collapsed_stacks', '-')}")
+    if not hot_functions:
+        return
+    print(f"  {'tottime':>9} {'cumtime':>9} {'calls':>8}  function")
+    for entry in hot_functions[:limit]:
+        print(f"  {entry['tottime']:9.3f} {entry['cumtime']:9.3f} {entry['calls']:8d}  "
+              f"{entry['function']} ({entry['file']}:{entry['line']})")
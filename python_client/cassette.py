@@ -0,0 +1,290 @@
+"""
+LLM・ツール通信の記録/再生（カセット）
+
+Azure OpenAI へのリクエスト（httpx）と C# サーバーへのリクエスト（requests）をHTTPレベルで横取りし、
+リクエストの指紋（メソッド・パス・クエリ・正規化したJSONボディのSHA-256）ごとに応答をカセットファイルへ記録する。
+再生モードではネットワークに出ずに記録済みの応答を返すため、実際の通信内容を使って
+Python側のパイプライン（エージェント、パーサー、評価、レポート）を全速で繰り返し実行・プロファイルできる。
+
+カセットは1行1やり取りのJSONLで、記録中は完了したやり取りから順に追記する。
+記録モードを開始すると既存のカセットは空にする（再記録で古いやり取りが重複して残り、再生順が曖昧になるのを防ぐ）。
+同じ指紋のリクエストが複数回記録されている場合、再生時は記録順に返す（尽きたら先頭に戻る）。
+
+使用方法:
+    from cassette import use_cassette
+    use_cassette("cassettes/run.jsonl", mode="record")   # 以降に作成するエージェントの通信を記録
+    use_cassette("cassettes/run.jsonl", mode="replay")   # 記録済みの応答で再生
+
+    python test_comprehensive.py --quick --record-cassette cassettes/quick.jsonl
+    python test_comprehensive.py --quick --replay-cassette cassettes/quick.jsonl
+    python cassette.py --info cassettes/quick.jsonl
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+MODES = ("record", "replay")
+
+# 毎回変わるため指紋から除外するJSONボディのキー（/execute の request_id など）
+VOLATILE_BODY_KEYS = {"request_id"}
+
+# 記録した本文は展開済みのため、再生時に再展開されないよう除外するヘッダー
+DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CassetteMissError(Exception):
+    """再生モードで記録にないリクエストが発生した"""
+
+
+def _canonical_body(body: Optional[bytes]) -> str:
+    """JSONボディはキー順を正規化し揮発キーを除いた文字列に、それ以外はそのまま"""
+    if not body:
+        return ""
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return hashlib.sha256(body).hexdigest()
+    if isinstance(data, dict):
+        data = {key: value for key, value in data.items() if key not in VOLATILE_BODY_KEYS}
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def request_fingerprint(method: str, url: str, body: Optional[bytes]) -> str:
+    """ホスト名に依存しない（パスとクエリのみ）リクエストの指紋"""
+    parts = urlsplit(url)
+    query = "&".join(f"{k}={v}" for k, v in sorted(parse_qsl(parts.query)))
+    key = f"{method.upper()} {parts.path}?{query}\n{_canonical_body(body)}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"text": content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode('ascii')}
+
+
+def _decode_body(body: Dict[str, str]) -> bytes:
+    if "base64" in body:
+        return base64.b64decode(body["base64"])
+    return body.get("text", "").encode('utf-8')
+
+
+class Cassette:
+    """指紋ごとのHTTPやり取りの記録/再生"""
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            # 再記録は前回の記録を置き換える
+            open(path, 'w', encoding='utf-8').close()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions.setdefault(interaction["fingerprint"], []).append(interaction["response"])
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._interactions.values())
+
+    def lookup(self, method: str, url: str, body: Optional[bytes]) -> Tuple[int, Dict[str, str], bytes]:
+        """記録済みの応答 (status, headers, content) を返す"""
+        fingerprint = request_fingerprint(method, url, body)
+        with self._lock:
+            responses = self._interactions.get(fingerprint)
+            if not responses:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for {method} {url} (fingerprint {fingerprint[:12]})")
+            position = self._positions.get(fingerprint, 0)
+            self._positions[fingerprint] = position + 1
+            self.hits += 1
+        response = responses[position % len(responses)]
+        return response["status"], response["headers"], _decode_body(response["body"])
+
+    def record(self, method: str, url: str, body: Optional[bytes], status: int,
+               headers: Dict[str, str], content: bytes, elapsed: float):
+        """やり取りを1行追記する"""
+        interaction = {
+            "fingerprint": request_fingerprint(method, url, body),
+            "recorded_at": datetime.now().isoformat(),
+            "elapsed_seconds": elapsed,
+            "request": {"method": method.upper(), "url": url, "body": _encode_body(body or b"")},
+            "response": {
+                "status": status,
+                "headers": {k: v for k, v in headers.items() if k.lower() not in DROPPED_RESPONSE_HEADERS},
+                "body": _encode_body(content),
+            },
+        }
+        line = json.dumps(interaction, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._interactions.setdefault(interaction["fingerprint"], []).append(interaction["response"])
+            self.recorded += 1
+
+    def requests_adapter(self) -> "CassetteRequestsAdapter":
+        return CassetteRequestsAdapter(self)
+
+    def httpx_transport(self) -> "CassetteHTTPXTransport":
+        if httpx is None:
+            raise Exception("httpx is required to record/replay Azure OpenAI traffic")
+        return CassetteHTTPXTransport(self)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "mode": self.mode, "interactions": len(self),
+                "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+class CassetteRequestsAdapter(HTTPAdapter):
+    """requests.Session にマウントする記録/再生アダプター（C#サーバー通信用）"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+
+        if self.cassette.mode == "replay":
+            status, headers, content = self.cassette.lookup(request.method, request.url, body)
+            response = requests.Response()
+            response.status_code = status
+            response.headers = CaseInsensitiveDict(headers)
+            response._content = content
+            response.url = request.url
+            response.request = request
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers) or 'utf-8'
+            response.reason = "Replayed"
+            return response
+
+        start_time = time.time()
+        response = super().send(request, **kwargs)
+        self.cassette.record(request.method, request.url, body, response.status_code,
+                             dict(response.headers), response.content, time.time() - start_time)
+        return response
+
+
+if httpx is not None:
+    class CassetteHTTPXTransport(httpx.BaseTransport):
+        """httpx.Client に渡す記録/再生トランスポート（Azure OpenAI 通信用）"""
+
+        def __init__(self, cassette: Cassette):
+            self.cassette = cassette
+            self._transport = httpx.HTTPTransport() if cassette.mode == "record" else None
+
+        def handle_request(self, request: "httpx.Request") -> "httpx.Response":
+            body = request.read()
+
+            if self.cassette.mode == "replay":
+                status, headers, content = self.cassette.lookup(request.method, str(request.url), body)
+                return httpx.Response(status, headers=headers, content=content, request=request)
+
+            start_time = time.time()
+            response = self._transport.handle_request(request)
+            # ストリーミング応答も含め本文を読み切ってから記録する
+            content = response.read()
+            response.close()
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_RESPONSE_HEADERS}
+            self.cassette.record(request.method, str(request.url), body, response.status_code,
+                                 headers, content, time.time() - start_time)
+            return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+        def close(self):
+            if self._transport is not None:
+                self._transport.close()
+
+
+# 以降に作成されるエージェント・ツールが使用するカセット
+_active_cassette: Optional[Cassette] = None
+
+
+def use_cassette(path: str, mode: str = "replay") -> Cassette:
+    """カセットを有効にし、C#サーバー用HTTPセッションにアダプターをマウントする"""
+    global _active_cassette
+    from csharp_tools import get_http_session
+
+    cassette = Cassette(path, mode)
+    adapter = cassette.requests_adapter()
+    session = get_http_session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    _active_cassette = cassette
+    print(f"📼 Cassette {mode}: {path}" + (f" ({len(cassette)} interactions)" if mode == "replay" else ""))
+    return cassette
+
+
+def get_active_cassette() -> Optional[Cassette]:
+    return _active_cassette
+
+
+def print_cassette_stats(cassette: Optional[Cassette] = None):
+    cassette = cassette or _active_cassette
+    if cassette is None:
+        return
+    stats = cassette.get_stats()
+    if stats["mode"] == "replay":
+        print(f"📼 Cassette replay: {stats['hits']} hits, {stats['misses']} misses")
+    else:
+        print(f"📼 Cassette recorded {stats['recorded']} interactions to {stats['path']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a record/replay cassette")
+    parser.add_argument("--info", type=str, required=True, metavar="PATH", help="Cassette file")
+    args = parser.parse_args()
+
+    try:
+        by_path: Dict[str, List[float]] = {}
+        with open(args.info, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    path = urlsplit(interaction["request"]["url"]).path
+                    by_path.setdefault(path, []).append(interaction.get("elapsed_seconds", 0.0))
+
+        print(f"{'Path':<60} {'Count':>8} {'Recorded time':>14}")
+        for path, elapsed in sorted(by_path.items()):
+            print(f"{path:<60} {len(elapsed):>8} {sum(elapsed):>13.2f}s")
+        return 0
+
+    except FileNotFoundError:
+        print(f"❌ Cassette not found: {args.info}")
+        return 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -1,9 +1,57 @@
 import requests
 import uuid
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 
+from schema_validator import Validator, compile_validator, validate_call
+from tool_transport import get_tool_transport, get_single_flight, coalescing_key
+
+
+# C#サーバーとの通信に共有するHTTPセッション（接続の再利用、カセット等のアダプターのマウント先）
+_http_session = requests.Session()
+
+
+def get_http_session() -> requests.Session:
+    """C#サーバー通信用の共有HTTPセッションを返す"""
+    return _http_session
+
+
+class PayloadRecorder:
+    """ツール呼び出しごとの /execute の送受信バイト数（HTTP本文）を記録する"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.by_tool: Dict[str, Dict[str, int]] = {}
+        
+    def record(self, function_name: str, request_bytes: int, response_bytes: int):
+        self.calls += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        tool = self.by_tool.setdefault(function_name, {"calls": 0, "request_bytes": 0, "response_bytes": 0})
+        tool["calls"] += 1
+        tool["request_bytes"] += request_bytes
+        tool["response_bytes"] += response_bytes
+
+
+# 実行中のエージェント呼び出しの記録先（スレッド・並列ツール呼び出しにはコンテキストごとに引き継がれる）
+_payload_recorder: ContextVar[Optional[PayloadRecorder]] = ContextVar("payload_recorder", default=None)
+
+
+@contextmanager
+def record_payloads() -> Iterator[PayloadRecorder]:
+    """ブロック内（同じコンテキスト）のツール呼び出しの送受信バイト数を記録する"""
+    recorder = PayloadRecorder()
+    token = _payload_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _payload_recorder.reset(token)
+
 
 class CSharpFunctionTool(BaseTool):
     """C# HTTPサーバー上で関数を実行するカスタムツール。"""
@@ -12,27 +60,40 @@ class CSharpFunctionTool(BaseTool):
     description: str = Field(description="Description of what the function does")
     base_url: str = Field(default="http://localhost:8080", description="Base URL of the C# server")
     parameters_schema: Dict[str, Any] = Field(description="JSON schema for function parameters")
+    validator: Optional[Validator] = Field(default=None, exclude=True,
+                                           description="Compiled argument validator (None disables validation)")
+    idempotent: bool = Field(default=True,
+                             description="Safe to retry, hedge or coalesce (server functions are side-effect free computations)")
     
     def _run(self, **kwargs: Any) -> str:
         """C#サーバー上で関数を実行する。"""
+        # スキーマに違反する引数はサーバーに送らず、サーバーと同じエラーで失敗させる
+        validation_error = validate_call(self.name, self.validator, kwargs)
+        if validation_error is not None:
+            raise Exception(f"Function execution failed: {validation_error}")
+        
+        # 一意のリクエストIDを生成
+        request_id = str(uuid.uuid4())
+        
+        # Prepare the request payload
+        payload = {
+            "function_name": self.name,
+            "arguments": kwargs,
+            "request_id": request_id
+        }
+        
         try:
-            # 一意のリクエストIDを生成
-            request_id = str(uuid.uuid4())
-            
-            # Prepare the request payload
-            payload = {
-                "function_name": self.name,
-                "arguments": kwargs,
-                "request_id": request_id
-            }
+            if self.idempotent:
+                # 同じ引数の呼び出しが実行中なら送信せずにその応答を共有する
+                response = get_single_flight().do(coalescing_key(self.base_url, self.name, kwargs),
+                                                  lambda: self._execute(payload), self.name)
+            else:
+                response = self._execute(payload)
             
-            # Make the HTTP request to the C# server
-            response = requests.post(
-                f"{self.base_url}/execute",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
+            # 応答を共有した呼び出しも、それぞれの呼び出し元のコンテキストで記録する
+            recorder = _payload_recorder.get()
+            if recorder is not None:
+                recorder.record(self.name, len(response.request.body or b""), len(response.content))
             
             # Check if the request was successful
             response.raise_for_status()
@@ -40,46 +101,54 @@ class CSharpFunctionTool(BaseTool):
             # Parse the response
             result_data = response.json()
             
-            if result_data.get("success", False):
-                return str(result_data["result"])
-            else:
-                error_msg = result_data.get("error", "Unknown error occurred")
-                raise Exception(f"Function execution failed: {error_msg}")
-                
         except requests.exceptions.RequestException as e:
             raise Exception(f"HTTP request failed: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Tool execution error: {str(e)}")
+            
+        if result_data.get("success", False):
+            return str(result_data["result"])
+        error_msg = result_data.get("error", "Unknown error occurred")
+        raise Exception(f"Function execution failed: {error_msg}")
+
+    def _execute(self, payload: Dict[str, Any]) -> requests.Response:
+        """/execute に送信して応答を返す（同時に実行中の同じ呼び出しとは single-flight で共有される）。"""
+        # リトライ・サーキットブレーカー・ヘッジは tool_transport のポリシーに従う
+        return get_tool_transport().post(self.base_url, "/execute", payload, idempotent=self.idempotent)
 
     async def _arun(self, **kwargs: Any) -> str:
         """_runの非同期版（未実装、同期版にフォールバック）。"""
         return self._run(**kwargs)
 
 
-def create_tools_from_csharp_server(base_url: str = "http://localhost:8080") -> List[CSharpFunctionTool]:
+def create_tools_from_csharp_server(base_url: str = "http://localhost:8080",
+                                    validate_arguments: bool = True,
+                                    descriptions: Optional[Dict[str, str]] = None) -> List[CSharpFunctionTool]:
     """
     C#サーバーからツール定義を取得してLangChainツールを作成。
     
     Args:
         base_url: C# HTTPサーバーのベースURL
+        validate_arguments: ツール定義のスキーマから引数の検証関数を作成し、不正な呼び出しをローカルで拒否する
+        descriptions: ツール名 -> モデルに渡す説明（サーバーの説明の置き換え、tool_descriptions のバリアント）
         
     Returns:
         CSharpFunctionToolインスタンスのリスト
     """
     try:
         # Get tool definitions from the C# server
-        response = requests.get(f"{base_url}/tools", timeout=30)
+        response = _http_session.get(f"{base_url}/tools", timeout=30)
         response.raise_for_status()
         
         tools_data = response.json()
         tools = []
         
         for tool_def in tools_data.get("tools", []):
+            parameters_schema = tool_def.get("parameters", {})
             tool = CSharpFunctionTool(
                 name=tool_def["name"],
-                description=tool_def["description"],
+                description=(descriptions or {}).get(tool_def["name"], tool_def["description"]),
                 base_url=base_url,
-                parameters_schema=tool_def.get("parameters", {})
+                parameters_schema=parameters_schema,
+                validator=compile_validator(tool_def["name"], parameters_schema) if validate_arguments else None
             )
             tools.append(tool)
         
@@ -102,7 +171,7 @@ def test_csharp_server_connection(base_url: str = "http://localhost:8080") -> bo
         サーバーがアクセス可能な場合True、そうでなければFalse
     """
     try:
-        response = requests.get(f"{base_url}/tools", timeout=5)
+        response = _http_session.get(f"{base_url}/tools", timeout=5)
         return response.status_code == 200
     except:
         return False
\ No newline at end of file
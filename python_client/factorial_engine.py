@@ -0,0 +1,265 @@
+"""
+階乗エンジン（増分の階乗テーブルと10進文字列のキャッシュ）
+
+MathFunctions.Factorial は呼び出しのたびに 1 から BigInteger の積を計算し直し、最大約2,568桁の文字列を返す。
+scale_* / precision_* のテストは同じ値や近い値を繰り返し要求するため、このエンジンは
+
+- 計算済みの k! を接頭辞テーブル（k = 0, 1, 2, ...）として保持し、新しい n までは1回ずつの乗算で伸ばす
+- 一度作った10進文字列をキャッシュし、2回目以降は文字列をそのまま返す
+- テーブルを超える値（コールド値）は、テーブルを上限 k まで伸ばしたうえで、n が 2k 以下なら k! と (k+1)...n の二分割積、
+  それより大きければ math.factorial（CPython の二分割法）で計算する
+- Python 3.11 以降の int -> str の桁数制限（4300桁）を超える値は、decimal による分割統治で10進文字列にする
+
+結果とエラーメッセージは math_reference.factorial（C#と同じ、上限 1000）と同一。
+
+使用方法:
+    from factorial_engine import get_factorial_engine
+    engine = get_factorial_engine()
+    engine.factorial(100)                 # "93326215443944152681699..."
+
+    python factorial_engine.py --benchmark
+    python factorial_engine.py --benchmark --beyond 2000 5000 20000
+"""
+
+import sys
+import math
+import time
+import decimal
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import math_reference as ref
+
+DEFAULT_LIMIT = 1000
+
+# 二分割積で、この個数以下の区間は順に掛ける
+PRODUCT_LEAF_SIZE = 16
+
+# この桁数を超える整数は decimal による分割統治で10進文字列にする（int の str は桁数の2乗に比例する）
+DIRECT_STR_MAX_DIGITS = 4000
+_DECIMAL_CHUNK_BITS = 8192
+_DECIMAL_CONTEXT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX)
+_decimal_powers_of_two: Dict[int, decimal.Decimal] = {}
+
+
+def product_range(low: int, high: int) -> int:
+    """low * (low+1) * ... * high を二分割で計算する（大きさの近い数同士を掛けるため高速）"""
+    if high < low:
+        return 1
+    if high - low < PRODUCT_LEAF_SIZE:
+        result = low
+        for i in range(low + 1, high + 1):
+            result *= i
+        return result
+    middle = (low + high) // 2
+    return product_range(low, middle) * product_range(middle + 1, high)
+
+
+def _to_decimal(value: int) -> decimal.Decimal:
+    bits = value.bit_length()
+    if bits <= _DECIMAL_CHUNK_BITS:
+        return decimal.Decimal(value)
+    shift = _DECIMAL_CHUNK_BITS
+    while shift * 2 < bits:
+        shift *= 2
+    power = _decimal_powers_of_two.get(shift)
+    if power is None:
+        power = _decimal_powers_of_two[shift] = _DECIMAL_CONTEXT.power(decimal.Decimal(2), shift)
+    high, low = value >> shift, value & ((1 << shift) - 1)
+    return _DECIMAL_CONTEXT.add(_DECIMAL_CONTEXT.multiply(_to_decimal(high), power), _to_decimal(low))
+
+
+def to_decimal_string(value: int) -> str:
+    """非負整数の10進文字列（桁数制限なし、大きな値は分割統治）"""
+    if value.bit_length() * 0.30103 < DIRECT_STR_MAX_DIGITS:
+        return str(value)
+    return str(_to_decimal(value))
+
+
+class FactorialEngine:
+    """接頭辞テーブルと10進文字列キャッシュを持つ階乗計算（スレッドセーフ）"""
+
+    def __init__(self, limit: Optional[int] = DEFAULT_LIMIT, table_size: Optional[int] = None,
+                 max_cold_entries: int = 64):
+        """
+        Args:
+            limit: 受け付ける n の上限（C#と同じ 1000、None で無制限）
+            table_size: 接頭辞テーブルを伸ばす上限（既定は limit、無制限の場合は 1000）
+            max_cold_entries: テーブルを超える値の文字列を保持する件数（最終使用が古い順に削除）
+        """
+        self.limit = limit
+        self.table_size = table_size if table_size is not None else (limit if limit is not None else DEFAULT_LIMIT)
+        self.max_cold_entries = max_cold_entries
+        self._values: List[int] = [1]
+        self._strings: Dict[int, str] = {}
+        self._cold_strings: "OrderedDict[int, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cold_computations = 0
+
+    def value(self, n: int) -> int:
+        """n! の整数値"""
+        if n < len(self._values):
+            return self._values[n]
+        if n <= self.table_size:
+            with self._lock:
+                values = self._values
+                for k in range(len(values), n + 1):
+                    values.append(values[-1] * k)
+            return self._values[n]
+
+        self.cold_computations += 1
+        base = self.table_size
+        self.value(base)
+        if n <= 2 * base:
+            return self._values[base] * product_range(base + 1, n)
+        return math.factorial(n)
+
+    def factorial(self, n: int) -> str:
+        """n! の10進文字列（math_reference.factorial と同じ結果・エラー）"""
+        if n < 0:
+            raise ValueError("Factorial is not defined for negative numbers")
+        if self.limit is not None and n > self.limit:
+            raise ValueError(f"Factorial calculation limit exceeded (maximum: {self.limit})")
+
+        text = self._strings.get(n)
+        if text is None and n > self.table_size:
+            with self._lock:
+                text = self._cold_strings.get(n)
+                if text is not None:
+                    self._cold_strings.move_to_end(n)
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        text = to_decimal_string(self.value(n))
+        if n <= self.table_size:
+            self._strings[n] = text
+        else:
+            with self._lock:
+                self._cold_strings[n] = text
+                while len(self._cold_strings) > self.max_cold_entries:
+                    self._cold_strings.popitem(last=False)
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups else 0.0,
+            "table_size": len(self._values) - 1,
+            "cached_strings": len(self._strings) + len(self._cold_strings),
+            "cold_computations": self.cold_computations,
+        }
+
+
+# プロセス内で共有するエンジン（上限ごと）
+_engines: Dict[Optional[int], FactorialEngine] = {}
+
+
+def get_factorial_engine(limit: Optional[int] = DEFAULT_LIMIT) -> FactorialEngine:
+    engine = _engines.get(limit)
+    if engine is None:
+        engine = _engines.setdefault(limit, FactorialEngine(limit))
+    return engine
+
+
+def naive_factorial(n: int) -> str:
+    """MathFunctions.Factorial と同じく 1 から順に掛ける（比較用）"""
+    result = 1
+    for i in range(2, n + 1):
+        result *= i
+    return to_decimal_string(result)
+
+
+def benchmark(limit: int = DEFAULT_LIMIT, beyond=(2000, 5000, 20000), repeat: int = 3) -> Dict[str, Any]:
+    """n = 0..limit の全値と、上限を超える値の計算時間を比較する"""
+    numbers = list(range(limit + 1))
+    results: Dict[str, Any] = {"limit": limit, "all_values": {}, "beyond": {}}
+
+    def measure(func, values) -> float:
+        start = time.perf_counter()
+        for n in values:
+            func(n)
+        return time.perf_counter() - start
+
+    engine = FactorialEngine(limit)
+    for n in numbers[::50]:
+        assert engine.factorial(n) == ref.factorial(n), f"factorial({n}) mismatch"
+
+    all_values = results["all_values"]
+    all_values["naive_loop"] = measure(naive_factorial, numbers)
+    all_values["math_reference"] = measure(ref.factorial, numbers)
+    engine = FactorialEngine(limit)
+    all_values["engine_cold"] = measure(engine.factorial, numbers)
+    all_values["engine_warm"] = min(measure(engine.factorial, numbers) for _ in range(repeat))
+
+    for n in beyond:
+        start = time.perf_counter()
+        with _unlimited_int_str():
+            expected = str(math.factorial(n))
+        math_seconds = time.perf_counter() - start
+
+        # 上限までのテーブルが温まった状態（サーバーの通常状態）から計測する
+        engine = FactorialEngine(None, table_size=limit)
+        engine.factorial(limit)
+        cold_seconds = measure(engine.factorial, [n])
+        warm_seconds = measure(engine.factorial, [n])
+        assert engine.factorial(n) == expected, f"factorial({n}) mismatch"
+        results["beyond"][n] = {
+            "digits": len(expected),
+            "naive_loop": measure(naive_factorial, [n]) if n <= 20000 else None,
+            "math_factorial_str": math_seconds,
+            "engine_cold": cold_seconds,
+            "engine_warm": warm_seconds,
+        }
+    return results
+
+
+class _unlimited_int_str:
+    """比較用に int -> str の桁数制限を一時的に外す"""
+
+    def __enter__(self):
+        self._previous = sys.get_int_max_str_digits() if hasattr(sys, "get_int_max_str_digits") else None
+        if self._previous is not None:
+            sys.set_int_max_str_digits(0)
+
+    def __exit__(self, *exc):
+        if self._previous is not None:
+            sys.set_int_max_str_digits(self._previous)
+
+
+def print_benchmark_report(results: Dict[str, Any]):
+    limit = results["limit"]
+    print(f"\n📊 All n = 0..{limit} (total time)")
+    for name, seconds in results["all_values"].items():
+        print(f"  {name:<16} {seconds * 1000:>10.2f}ms")
+
+    if results["beyond"]:
+        print("\n📊 Beyond the limit (single call)")
+        print(f"  {'n':>8} {'digits':>9} {'naive':>11} {'math+str':>11} {'cold':>11} {'warm':>11}")
+        for n, entry in results["beyond"].items():
+            naive = f"{entry['naive_loop'] * 1000:.2f}ms" if entry["naive_loop"] is not None else "skipped"
+            print(f"  {n:>8} {entry['digits']:>9,} {naive:>11} {entry['math_factorial_str'] * 1000:>9.2f}ms "
+                  f"{entry['engine_cold'] * 1000:>9.2f}ms {entry['engine_warm'] * 1000:>9.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the factorial engine")
+    parser.add_argument("--benchmark", action="store_true", required=True, help="Run the benchmark")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Upper bound (default: {DEFAULT_LIMIT})")
+    parser.add_argument("--beyond", type=int, nargs="*", default=[2000, 5000, 20000],
+                        help="Values above the limit to measure")
+    args = parser.parse_args()
+
+    print_benchmark_report(benchmark(args.limit, args.beyond))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,34 @@
 import os
 import sys
-from typing import List
-from langchain_openai import AzureChatOpenAI
-from langchain.agents import AgentExecutor, create_openai_functions_agent
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.memory import ConversationBufferMemory
-from csharp_tools import create_tools_from_csharp_server, test_csharp_server_connection
+import argparse
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
+
+# LangChain・OpenAI SDK の読み込みには数秒かかるため、エージェントを作成する時点まで遅延させる
+# （--help やレポート生成など、エージェントを使わない経路の起動を速くする）
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+    from llm_cache import LLMResponseCache
+    from trajectory_cache import TrajectoryCache, TrajectoryCachingAgent
+    from tool_selector import ToolSubsettingAgent
+
+
+SYSTEM_PROMPT = "You are a helpful assistant that can perform mathematical calculations using available tools. When asked to perform calculations, use the appropriate tools to get accurate results."
+
+PARALLEL_TOOLS_PROMPT = " When several calculations do not depend on each other, request all of them in the same turn so they can run in parallel."
 
 
 def create_langchain_agent(
     azure_endpoint: str,
     azure_deployment: str,
     api_version: str = "2024-12-01-preview",
-    csharp_server_url: str = "http://localhost:8080"
-) -> AgentExecutor:
+    csharp_server_url: str = "http://localhost:8080",
+    llm_cache: Optional["LLMResponseCache"] = None,
+    parallel_tool_calls: bool = False,
+    trajectory_cache: Optional["TrajectoryCache"] = None,
+    verbose: bool = True,
+    tool_descriptions: Optional[Dict[str, str]] = None,
+    max_tools: Optional[int] = None
+) -> Union["AgentExecutor", "ToolSubsettingAgent", "TrajectoryCachingAgent"]:
     """
     HTTP経由でC#関数を使用するLangChainエージェントを作成。
     
@@ -22,11 +37,27 @@ def create_langchain_agent(
         azure_deployment: Azure OpenAI デプロイメント名
         api_version: Azure OpenAI API バージョン
         csharp_server_url: C#関数サーバーのURL
+        llm_cache: チャット補完応答のキャッシュ（省略時は use_llm_cache で有効にしたもの、なければ無効）
+        parallel_tool_calls: 1ターンで複数のツール呼び出しを受け付け、並行実行する（tools API を使用）
+        trajectory_cache: 同一プロンプトのツール呼び出し軌跡のキャッシュ（省略時は use_trajectory_cache で有効にしたもの）
+        verbose: AgentExecutor の詳細ログを標準出力に表示する（ストリーミング表示時は False）
+        tool_descriptions: ツール名 -> モデルに渡す説明（tool_descriptions.py のバリアント、省略時はサーバーの説明）
+        max_tools: プロンプトごとに関係しそうなツールを最大この個数だけ選んでモデルに渡す（tool_selector.py、省略時は全ツール）
         
     Returns:
-        設定済みAgentExecutorインスタンス
+        設定済みAgentExecutorインスタンス（ツール選択・軌跡キャッシュ有効時は同じインターフェースのラッパー）
     """
     
+    from langchain_openai import AzureChatOpenAI
+    from langchain.agents import AgentExecutor, create_openai_functions_agent, create_openai_tools_agent
+    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain.memory import ConversationBufferMemory
+    from csharp_tools import create_tools_from_csharp_server, test_csharp_server_connection
+    from cassette import get_active_cassette
+    from llm_cache import get_active_llm_cache
+    from trajectory_cache import TrajectoryCachingAgent, get_active_trajectory_cache
+    from parallel_agent import ParallelToolAgentExecutor
+    
     # C#サーバー接続をテスト
     print(f"Testing connection to C# server at {csharp_server_url}...")
     if not test_csharp_server_connection(csharp_server_url):
@@ -34,17 +65,33 @@ def create_langchain_agent(
     print("✓ C# server connection successful")
     
     # Create Azure OpenAI client
+    llm_options = {}
+    cassette = get_active_cassette()
+    if cassette is not None:
+        # カセット有効時はAzure OpenAIとの通信を記録/再生用トランスポート経由にする
+        import httpx
+        llm_options["http_client"] = httpx.Client(transport=cassette.httpx_transport())
+        if cassette.mode == "replay" and not os.getenv("AZURE_OPENAI_API_KEY"):
+            llm_options["api_key"] = "cassette-replay"
+    
+    llm_cache = llm_cache or get_active_llm_cache()
+    if llm_cache is not None:
+        # キャッシュは非ストリーミングの呼び出し経路でのみ参照されるため、ストリーミングを無効にする
+        llm_options["cache"] = llm_cache
+        llm_options["disable_streaming"] = True
+    
     llm = AzureChatOpenAI(
         azure_endpoint=azure_endpoint,
         azure_deployment=azure_deployment,
         api_version=api_version,
-        temperature=0.7
+        temperature=0.7,
+        **llm_options
     )
     print("✓ Azure OpenAI client created")
     
     # Create tools from C# server
     print("Fetching tool definitions from C# server...")
-    tools = create_tools_from_csharp_server(csharp_server_url)
+    tools = create_tools_from_csharp_server(csharp_server_url, descriptions=tool_descriptions)
     print(f"✓ Loaded {len(tools)} tools from C# server:")
     for tool in tools:
         print(f"  - {tool.name}: {tool.description}")
@@ -57,59 +104,100 @@ def create_langchain_agent(
     
     # Create prompt template
     prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a helpful assistant that can perform mathematical calculations using available tools. When asked to perform calculations, use the appropriate tools to get accurate results."),
+        ("system", SYSTEM_PROMPT + (PARALLEL_TOOLS_PROMPT if parallel_tool_calls else "")),
         MessagesPlaceholder(variable_name="chat_history"),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
     ])
     
     # Create the agent
-    agent = create_openai_functions_agent(
+    # functions API は1ターン1呼び出し、tools API は1ターンで複数の呼び出しを返せる
+    create_agent_runnable = create_openai_tools_agent if parallel_tool_calls else create_openai_functions_agent
+    agent = create_agent_runnable(
         llm=llm,
         tools=tools,
         prompt=prompt
     )
     
     # Create agent executor
-    agent_executor = AgentExecutor(
+    executor_class = ParallelToolAgentExecutor if parallel_tool_calls else AgentExecutor
+    agent_executor = executor_class(
         agent=agent,
         tools=tools,
         memory=memory,
-        verbose=True,
+        verbose=verbose,
         max_iterations=100
     )
     
+    if max_tools:
+        from tool_selector import ToolSelector, ToolSubsettingAgent
+        
+        def build_executor(selected_tools):
+            # モデルには選んだツールだけを渡し、実行はすべてのツールを受け付ける（会話履歴は共有）
+            return executor_class(
+                agent=create_agent_runnable(llm=llm, tools=selected_tools, prompt=prompt),
+                tools=tools,
+                memory=memory,
+                verbose=verbose,
+                max_iterations=100
+            )
+        
+        agent_executor = ToolSubsettingAgent(agent_executor, ToolSelector(tools, max_tools=max_tools), build_executor)
+    
     print("✓ LangChain agent created successfully")
+    
+    trajectory_cache = trajectory_cache or get_active_trajectory_cache()
+    if trajectory_cache is not None:
+        return TrajectoryCachingAgent(agent_executor, trajectory_cache)
     return agent_executor
 
 
-def create_agent():
+def create_agent(parallel_tool_calls: bool = False, server_url: str = "http://localhost:8080",
+                 tool_descriptions: Optional[Dict[str, str]] = None, max_tools: Optional[int] = None):
     """
     デフォルト設定でLangChainエージェントを作成（テスト用）。
     
+    Args:
+        parallel_tool_calls: 1ターン内の複数ツール呼び出しを並行実行するモードで作成する
+        server_url: ツールを提供する関数サーバー（C#サーバーまたはローカル代替サーバー）のURL
+        tool_descriptions: ツール名 -> モデルに渡す説明（省略時はサーバーの説明）
+        max_tools: プロンプトごとに選んでモデルに渡すツールの最大数（省略時は全ツール）
+        
     Returns:
         設定済みAgentExecutorインスタンス
     """
     # デフォルト設定値
     AZURE_ENDPOINT = "https://weida-mbw67lla-swedencentral.cognitiveservices.azure.com/"
     AZURE_DEPLOYMENT = "gpt-4.1"
-    CSHARP_SERVER_URL = "http://localhost:8080"
     
-    # API キーの確認
+    from cassette import get_active_cassette
+    
+    # API キーの確認（カセット再生時は不要）
     api_key = os.getenv("AZURE_OPENAI_GPT4.1_API_KEY") or os.getenv("AZURE_OPENAI_API_KEY")
-    if not api_key:
+    cassette = get_active_cassette()
+    if not api_key and not (cassette is not None and cassette.mode == "replay"):
         raise Exception("AZURE_OPENAI_API_KEY environment variable not set")
     
     return create_langchain_agent(
         azure_endpoint=AZURE_ENDPOINT,
         azure_deployment=AZURE_DEPLOYMENT,
-        csharp_server_url=CSHARP_SERVER_URL
+        csharp_server_url=server_url,
+        parallel_tool_calls=parallel_tool_calls,
+        tool_descriptions=tool_descriptions,
+        max_tools=max_tools
     )
 
 
 def main():
     """インタラクティブチャットを実行するメイン関数。"""
     
+    parser = argparse.ArgumentParser(description="Interactive LangChain client for the C# function server")
+    parser.add_argument("--stream", action="store_true",
+                        help="Show tool steps and answer tokens as they arrive, with first-token timings")
+    parser.add_argument("--max-tools", type=int, metavar="N",
+                        help="Pass the model only the N tools most relevant to each prompt (default: all tools)")
+    args = parser.parse_args()
+    
     # 設定
     AZURE_ENDPOINT = "https://weida-mbw67lla-swedencentral.cognitiveservices.azure.com/"
     AZURE_DEPLOYMENT = "gpt-4.1"
@@ -129,7 +217,9 @@ def main():
         agent_executor = create_langchain_agent(
             azure_endpoint=AZURE_ENDPOINT,
             azure_deployment=AZURE_DEPLOYMENT,
-            csharp_server_url=CSHARP_SERVER_URL
+            csharp_server_url=CSHARP_SERVER_URL,
+            verbose=not args.stream,
+            max_tools=args.max_tools
         )
         
         print("\n" + "="*60)
@@ -154,8 +244,17 @@ def main():
                     break
                 
                 print("\n回答:")
-                response = agent_executor.invoke({"input": user_input})
-                print(f"\n{response['output']}")
+                if args.stream:
+                    from agent_callbacks import StreamingConsoleHandler
+                    handler = StreamingConsoleHandler()
+                    response = agent_executor.invoke({"input": user_input}, config={"callbacks": [handler]})
+                    # キャッシュ応答などトークンが流れなかった場合は回答全体を表示する
+                    if not handler.streamed_tokens:
+                        print(f"\n{response['output']}")
+                    handler.print_timings()
+                else:
+                    response = agent_executor.invoke({"input": user_input})
+                    print(f"\n{response['output']}")
                 
             except KeyboardInterrupt:
                 print("\n\n終了します。")
@@ -0,0 +1,313 @@
+"""
+LLM応答の永続キャッシュ（完全一致）
+
+同じプロンプト・会話履歴・ツール定義に対して、AgentExecutor はテストの再実行やベンチマークの反復のたびに
+同じ問い合わせをモデルへ送る。このモジュールはチャット補完の応答をディスクに保存し、
+デプロイメント名・メッセージ・ツール定義・サンプリングパラメータが完全に一致する呼び出しには
+保存済みの応答を返す（LangChain の BaseCache として AzureChatOpenAI に渡す）。
+
+- キー: LangChain の llm_string（デプロイメント・temperature 等のモデル設定と functions/tools 引数）と
+  正規化したメッセージ列（実行ごとに変わる id やメタデータを除外）の SHA-256
+- TTL: 保存から ttl_seconds を過ぎたエントリはミス扱いにして削除する
+- サイズ: 合計サイズを書き込みごとに加算して保持し、max_bytes を超えたときだけディレクトリを走査して
+  最終使用が古い順に max_bytes の 90% まで削除する
+- 統計: ヒット・ミス数と、ヒットにより省略された元の呼び出し時間の合計。record_cache_usage() で
+  1回のエージェント呼び出し（同じコンテキスト）分だけを数えられる（並行実行でも他のテストと混ざらない）
+
+使用方法:
+    from llm_cache import use_llm_cache
+    use_llm_cache(".llm_cache", ttl_seconds=7 * 24 * 3600, max_mb=256)   # 以降に作成するエージェントで有効
+
+    python test_comprehensive.py --quick --llm-cache .llm_cache
+    python llm_cache.py --info .llm_cache
+    python llm_cache.py --clear .llm_cache
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+CACHE_VERSION = 1
+
+# メッセージの正規化時に除外するフィールド（実行ごとに変わる値）
+VOLATILE_MESSAGE_FIELDS = {"id", "response_metadata", "usage_metadata"}
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_MB = 256
+# 上限を超えたら上限のこの割合まで削除する（満杯の状態で書き込むたびに走査しないよう余裕を空ける）
+EVICT_TARGET_RATIO = 0.9
+
+
+def _canonical_messages(prompt: str) -> Any:
+    """LangChain がシリアライズしたメッセージ列から揮発フィールドを除いた構造を返す"""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+
+    def strip(node):
+        if isinstance(node, dict):
+            return {key: strip(value) for key, value in node.items() if key not in VOLATILE_MESSAGE_FIELDS}
+        if isinstance(node, list):
+            return [strip(item) for item in node]
+        return node
+
+    return strip(messages)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """モデル設定・ツール定義（llm_string）とメッセージ列から決まるキャッシュキー"""
+    payload = json.dumps({"version": CACHE_VERSION, "llm": llm_string, "messages": _canonical_messages(prompt)},
+                         sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CacheUsage:
+    """1回のエージェント呼び出しでのキャッシュのヒット・ミス数"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+
+# 実行中のエージェント呼び出しの集計先
+_cache_usage: ContextVar[Optional[CacheUsage]] = ContextVar("llm_cache_usage", default=None)
+
+
+@contextmanager
+def record_cache_usage() -> Iterator[CacheUsage]:
+    """ブロック内（同じコンテキスト）のキャッシュのヒット・ミスを数える"""
+    usage = CacheUsage()
+    token = _cache_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _cache_usage.reset(token)
+
+
+class LLMResponseCache(BaseCache):
+    """ディスク上のチャット補完応答キャッシュ（TTL・サイズ上限付き）"""
+
+    def __init__(self, cache_dir: str = ".llm_cache", ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_bytes: Optional[int] = DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        # ミスしたキー -> 問い合わせ開始時刻（update までの時間を元の呼び出し時間として保存する）
+        self._pending: Dict[str, float] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        # 保存済みエントリの合計サイズ（初回のみ走査し、以降は書き込み・削除のたびに増減する）
+        self._total_bytes = sum(size for _, _, size in self._entries()) if max_bytes is not None else 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        key = cache_key(prompt, llm_string)
+        path = self._path(key)
+        entry = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if entry is not None and self.ttl_seconds is not None and time.time() - entry["created_at"] > self.ttl_seconds:
+            self._remove(path)
+            entry = None
+            with self._lock:
+                self.expired += 1
+
+        usage = _cache_usage.get()
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                self._pending[key] = time.perf_counter()
+                if usage is not None:
+                    usage.misses += 1
+                return None
+            latency = entry.get("latency_seconds", 0.0)
+            self.hits += 1
+            self.saved_seconds += latency
+        if usage is not None:
+            usage.hits += 1
+            usage.saved_seconds += latency
+
+        # 最終使用時刻を更新（サイズ超過時の削除順に使用）
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return [loads(generation) for generation in entry["generations"]]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            started = self._pending.pop(key, None)
+        entry = {
+            "version": CACHE_VERSION,
+            "created_at": time.time(),
+            "latency_seconds": time.perf_counter() - started if started is not None else 0.0,
+            "generations": [dumps(generation) for generation in return_val],
+        }
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        replaced = self._file_size(path)
+        os.replace(tmp_path, path)
+
+        if self.max_bytes is not None:
+            with self._lock:
+                self._total_bytes += self._file_size(path) - replaced
+                over_limit = self._total_bytes > self.max_bytes
+            if over_limit:
+                self._evict()
+
+    def clear(self, **kwargs: Any) -> None:
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def _entries(self) -> List[tuple]:
+        """(パス, 最終使用時刻, サイズ) の一覧"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        """上限を超えたときのみ呼ばれる。実際のサイズを走査し直して古い順に削除する"""
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * EVICT_TARGET_RATIO if total > self.max_bytes else self.max_bytes
+        evicted = 0
+        for path, _, size in sorted(entries, key=lambda entry: entry[1]):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._total_bytes = total
+            self.evicted += evicted
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _remove(self, path: str):
+        size = self._file_size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes = max(0, self._total_bytes - size)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_dir": self.cache_dir,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups * 100) if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+# 以降に作成されるエージェントが使用するキャッシュ
+_active_llm_cache: Optional[LLMResponseCache] = None
+
+
+def use_llm_cache(cache_dir: str = ".llm_cache", ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                  max_mb: Optional[float] = DEFAULT_MAX_MB) -> LLMResponseCache:
+    """LLM応答キャッシュを有効にする（create_agent で作成するエージェントに適用される）"""
+    global _active_llm_cache
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+    _active_llm_cache = LLMResponseCache(cache_dir, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+    print(f"💾 LLM response cache: {cache_dir}")
+    return _active_llm_cache
+
+
+def get_active_llm_cache() -> Optional[LLMResponseCache]:
+    return _active_llm_cache
+
+
+def print_llm_cache_stats(cache: Optional[LLMResponseCache] = None):
+    cache = cache or _active_llm_cache
+    if cache is None:
+        return
+    stats = cache.get_stats()
+    print(f"💾 LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.1f}% hit rate), {stats['saved_seconds']:.2f}s of model latency saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--info", type=str, metavar="DIR", help="Show cache size and saved latency")
+    group.add_argument("--clear", type=str, metavar="DIR", help="Delete all cached responses")
+    args = parser.parse_args()
+
+    cache_dir = args.info or args.clear
+    if not os.path.isdir(cache_dir):
+        print(f"❌ Cache directory not found: {cache_dir}")
+        return 1
+
+    cache = LLMResponseCache(cache_dir, ttl_seconds=None, max_bytes=None)
+    entries = cache._entries()
+    if args.clear:
+        cache.clear()
+        print(f"🗑️  Removed {len(entries)} cached responses from {cache_dir}")
+        return 0
+
+    latency = 0.0
+    for path, _, _ in entries:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                latency += json.load(f).get("latency_seconds", 0.0)
+        except (OSError, ValueError):
+            continue
+    print(f"Entries: {len(entries)}")
+    print(f"Size: {sum(size for _, _, size in entries) / 1024 / 1024:.2f} MB")
+    print(f"Model latency per full replay: {latency:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
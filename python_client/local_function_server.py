@@ -0,0 +1,498 @@
+"""
+C#関数サーバー (FunctionServer.cs) のローカル代替サーバー
+
+.NET Framework 環境がなくてもエージェントやテストを実行できるよう、C#サーバーと同じ HTTP API
+（GET /tools, POST /execute, OPTIONS, 404 応答）を Python で提供する。
+
+- /tools: FunctionServer.cs の GetToolDefinitions() からツール定義を読み取って返す
+  （ソースが見つからない場合は math_reference の関数表から最小限の定義を生成する）
+- /execute: math_reference.execute と同じ意味論で計算する。prime_factorization と is_prime は
+  メモリマップした最小素因数テーブル（spf_table）で計算するため、複数のサーバープロセスで
+  テーブルファイルを共有できる（numpy がない場合は試し割り）
+- factorial は接頭辞テーブルと10進文字列キャッシュを持つ階乗エンジン（factorial_engine）で計算する
+- バッチ版のツール（is_prime_batch など、batch_kernels）を /tools に追加して公開する（numpy が必要）
+- map ツール: 任意の関数を引数のリストの各要素に適用し、全結果を1回の応答で返す（スレッドプールで並列実行）。
+  「1から100までの素数」のような要求で、値ごとのツール呼び出し（モデルターンとHTTP往復）を1回にまとめる
+- compose ツール: 前のステップの結果を "$id" で参照する関数呼び出しのデータフローを1回のリクエストで実行し、
+  各ステップの中間結果を返す（依存のないステップは並列実行）。N段の依存チェーンがN回のモデルターンから1回になる
+- 障害注入（--fault-*）: /execute の一部を 503 応答・接続切断・遅延にする（tool_transport.py の
+  リトライ・サーキットブレーカー・ヘッジリクエストのベンチマーク用）
+
+使用方法:
+    python local_function_server.py                        # http://localhost:8080
+    python local_function_server.py --port 8081 --spf-limit 10000000
+    python local_function_server.py --no-spf               # 試し割りのみ（C#と同じアルゴリズム）
+    python local_function_server.py --no-batch             # C#サーバーと同じツールのみ公開
+    python local_function_server.py --no-map               # map ツールを公開しない
+    python local_function_server.py --no-compose           # compose ツールを公開しない
+    python local_function_server.py --fault-error-rate 0.2 --fault-delay-rate 0.05 --fault-delay 2
+"""
+
+import os
+import re
+import json
+import time
+import random
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Callable
+
+import math_reference as ref
+from factorial_engine import get_factorial_engine
+
+FUNCTION_SERVER_SOURCE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "AzureOpenAI_Net481_FunctionCalling",
+    "AzureOpenAI_Net481_FunctionCalling", "FunctionServer.cs")
+
+# C# の文字列リテラル（逐語的 @"..." と通常の "..."）
+_CSHARP_STRING = r'(@"(?:[^"]|"")*"|"(?:[^"\\]|\\.)*")'
+_TOOL_NAME_PATTERN = re.compile(r'Name\s*=\s*"(\w+)"')
+_TOOL_DESCRIPTION_PATTERN = re.compile(r'Description\s*=\s*' + _CSHARP_STRING)
+_PROPERTY_PATTERN = re.compile(
+    r'"(\w+)"\s*,\s*new PropertySchema\s*\{\s*Type\s*=\s*"(\w+)"\s*,\s*Description\s*=\s*' + _CSHARP_STRING +
+    r'(?:\s*,\s*Items\s*=\s*new PropertySchema\s*\{\s*Type\s*=\s*"(\w+)"\s*\})?')
+_REQUIRED_PATTERN = re.compile(r'Required\s*=\s*new\[\]\s*\{([^}]*)\}')
+
+MAP_FUNCTION_ALIASES = ("function", "function_name", "name", "func")
+MAP_ARGUMENTS_ALIASES = ("arguments", "arguments_list", "args", "items", "list", "values")
+MAP_MAX_ITEMS = 1000
+
+MAP_TOOL_DEFINITION: Dict[str, Any] = {
+    "name": "map",
+    "description": ("指定した関数を引数リストの各要素に適用し、すべての結果を1回の呼び出しで返す。\n\n"
+                    "重要:\n"
+                    "- 同じ関数を複数の値に対して呼び出す場合は、関数を個別に何度も呼び出さずにこの関数を1回呼び出してください\n"
+                    "- arguments の各要素は、その関数を直接呼び出すときと同じ引数オブジェクトです\n"
+                    "- 引数が1つの関数では、値のリストをそのまま渡すこともできます\n"
+                    f"- 最大 {MAP_MAX_ITEMS} 要素、map 自体は指定できません\n\n"
+                    "結果は入力と同じ順序のリストです（失敗した要素は {\"error\": メッセージ}）。\n\n"
+                    "使用例:\n"
+                    "- map(\"is_prime\", [{\"number\": 2}, {\"number\": 4}]) → [true, false]\n"
+                    "- map(\"is_prime\", [2, 3, 4, 5]) → [true, true, false, true]\n"
+                    "- map(\"gcd\", [{\"a\": 12, \"b\": 18}, {\"a\": 7, \"b\": 5}]) → [6, 1]"),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "function": {"type": "string", "description": "各要素に適用する関数名 (例: is_prime)", "items": None},
+            "arguments": {"type": "array", "description": "各呼び出しの引数オブジェクト（または値）のリスト",
+                          "items": {"type": "object", "description": None, "items": None}},
+        },
+        "required": ["function", "arguments"],
+    },
+}
+
+
+COMPOSE_STEPS_ALIASES = ("steps", "graph", "pipeline", "calls")
+COMPOSE_MAX_STEPS = 50
+# ステップの結果の参照（"$id" または "$id[添字]"）
+COMPOSE_REFERENCE_PATTERN = re.compile(r"^\$([\w-]+)(?:\[(-?\d+)\])?$")
+
+COMPOSE_TOOL_DEFINITION: Dict[str, Any] = {
+    "name": "compose",
+    "description": ("前の関数の結果を次の関数の引数に使う、依存する一連の関数呼び出しを1回でまとめて実行する。\n\n"
+                    "重要:\n"
+                    "- ある関数の結果を別の関数に渡す場合は、1つずつ呼び出さずにこの関数で全ステップを1回で実行してください\n"
+                    "- 各ステップは {\"id\": 名前, \"function\": 関数名, \"arguments\": 引数オブジェクト} です\n"
+                    "- 引数の値に \"$名前\" と書くと、そのステップの結果に置き換えられます（\"$名前[0]\" で結果のリストの要素）\n"
+                    "- 互いに依存しないステップは並列に実行されます\n"
+                    f"- 最大 {COMPOSE_MAX_STEPS} ステップ、compose 自体は指定できません（map は指定可能）\n\n"
+                    "結果は各ステップの結果（steps）と最後のステップの結果（output）です。\n\n"
+                    "使用例（234を素因数分解し、その因数の合計を求める）:\n"
+                    "- compose([{\"id\": \"f\", \"function\": \"prime_factorization\", \"arguments\": {\"number\": 234}}, "
+                    "{\"id\": \"s\", \"function\": \"sum\", \"arguments\": {\"list\": \"$f\"}}])\n"
+                    "  → {\"steps\": {\"f\": [2, 3, 3, 13], \"s\": 21}, \"output\": 21}"),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "steps": {"type": "array", "description": "実行するステップ ({id, function, arguments}) のリスト",
+                      "items": {"type": "object", "description": None, "items": None}},
+        },
+        "required": ["steps"],
+    },
+}
+
+
+class FaultProfile:
+    """/execute に注入する障害（error: 503 応答、drop: 応答せずに接続を切る、delay: delay_seconds 待ってから応答）"""
+
+    def __init__(self, error_rate: float = 0.0, drop_rate: float = 0.0, delay_rate: float = 0.0,
+                 delay_seconds: float = 1.0, seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.delay_rate = delay_rate
+        self.delay_seconds = delay_seconds
+        self._random = random.Random(seed)
+
+    def pick(self) -> Optional[str]:
+        roll = self._random.random()
+        for fault, rate in (("error", self.error_rate), ("drop", self.drop_rate), ("delay", self.delay_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    def __bool__(self) -> bool:
+        return bool(self.error_rate or self.drop_rate or self.delay_rate)
+
+
+def _compose_references(value: Any) -> List[str]:
+    """引数に含まれるステップ参照の id"""
+    if isinstance(value, str):
+        match = COMPOSE_REFERENCE_PATTERN.match(value)
+        return [match.group(1)] if match else []
+    if isinstance(value, dict):
+        return [ref_id for item in value.values() for ref_id in _compose_references(item)]
+    if isinstance(value, list):
+        return [ref_id for item in value for ref_id in _compose_references(item)]
+    return []
+
+
+def _resolve_compose_references(value: Any, results: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        match = COMPOSE_REFERENCE_PATTERN.match(value)
+        if not match:
+            return value
+        result = results[match.group(1)]
+        if match.group(2) is not None:
+            if not isinstance(result, list):
+                raise ValueError(f"{value}: the result is not a list")
+            index = int(match.group(2))
+            if not -len(result) <= index < len(result):
+                raise ValueError(f"{value}: index out of range")
+            return result[index]
+        return result
+    if isinstance(value, dict):
+        return {key: _resolve_compose_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve_compose_references(item, results) for item in value]
+    return value
+
+
+def _csharp_string_value(literal: str) -> str:
+    if literal.startswith('@'):
+        return literal[2:-1].replace('""', '"')
+    return json.loads(literal)
+
+
+def parse_tool_definitions(source: str) -> List[Dict[str, Any]]:
+    """FunctionServer.cs の GetToolDefinitions() から /tools と同じ形式のツール定義を取り出す"""
+    start = source.index("GetToolDefinitions()")
+    tools = []
+    for block in source[start:].split("new ToolDefinition")[1:]:
+        name = _TOOL_NAME_PATTERN.search(block).group(1)
+        description = _csharp_string_value(_TOOL_DESCRIPTION_PATTERN.search(block).group(1))
+        properties = {}
+        for match in _PROPERTY_PATTERN.finditer(block):
+            prop_name, prop_type, prop_description, items_type = match.groups()
+            properties[prop_name] = {
+                "type": prop_type,
+                "description": _csharp_string_value(prop_description),
+                "items": {"type": items_type, "description": None, "items": None} if items_type else None,
+            }
+        required = re.findall(r'"(\w+)"', _REQUIRED_PATTERN.search(block).group(1))
+        tools.append({"name": name, "description": description,
+                      "parameters": {"type": "object", "properties": properties, "required": required}})
+    return tools
+
+
+def generate_tool_definitions() -> List[Dict[str, Any]]:
+    """ソースがない場合の最小限のツール定義（引数名は各エイリアスの先頭）"""
+    types = {ref.to_int32: "integer", ref.to_double: "number", None: "array"}
+    tools = []
+    for name, (params, _, _) in ref.FUNCTION_TABLE.items():
+        properties = {}
+        for aliases, convert in params:
+            properties[aliases[0]] = {
+                "type": types[convert],
+                "description": aliases[0],
+                "items": {"type": "integer", "description": None, "items": None} if convert is None else None,
+            }
+        tools.append({"name": name, "description": name,
+                      "parameters": {"type": "object", "properties": properties, "required": list(properties)}})
+    return tools
+
+
+def load_tool_definitions(source_path: str = FUNCTION_SERVER_SOURCE) -> List[Dict[str, Any]]:
+    try:
+        with open(source_path, 'r', encoding='utf-8-sig') as f:
+            return parse_tool_definitions(f.read())
+    except OSError:
+        print(f"⚠️  {source_path} not found, using generated tool definitions")
+        return generate_tool_definitions()
+
+
+def spf_functions(limit: int) -> Dict[str, Callable[..., Any]]:
+    """最小素因数テーブルで計算する prime_factorization / is_prime（numpy がなければ空）"""
+    import spf_table
+    if spf_table.np is None:
+        print("⚠️  numpy is not installed, prime_factorization/is_prime use trial division")
+        return {}
+    table = spf_table.get_spf_table(limit)
+    print(f"🧮 SPF table: {table.path} (n <= {table.limit:,})")
+    return {"prime_factorization": table.prime_factorization, "is_prime": table.is_prime}
+
+
+def batch_functions(spf_limit: Optional[int]) -> Dict[str, Callable[..., Any]]:
+    """バッチ版の関数（numpy がなければ空）。spf_limit の最小素因数テーブルを使用する"""
+    import batch_kernels
+    if batch_kernels.np is None:
+        print("⚠️  numpy is not installed, batch tools are disabled")
+        return {}
+    import spf_table
+    table = spf_table.get_spf_table(spf_limit or spf_table.DEFAULT_LIMIT)
+    return {
+        "is_prime_batch": lambda numbers: batch_kernels.is_prime_batch(numbers, table),
+        "prime_factorization_batch": lambda numbers: batch_kernels.prime_factorization_batch(numbers, table),
+        "gcd_batch": batch_kernels.gcd_batch,
+        "lcm_batch": batch_kernels.lcm_batch,
+    }
+
+
+class FunctionRequestHandler(BaseHTTPRequestHandler):
+    # HttpListener と同様に接続を維持する（応答には常に Content-Length を付ける）
+    protocol_version = "HTTP/1.1"
+    # ヘッダーと本文の書き込みが遅延ACKで待たされないようにする
+    disable_nagle_algorithm = True
+    tools_json: bytes = b""
+    functions: Dict[str, Callable[..., Any]] = {}
+    batch_functions: Dict[str, Callable[..., Any]] = {}
+    map_pool: Optional[ThreadPoolExecutor] = None
+    compose_pool: Optional[ThreadPoolExecutor] = None
+    faults: Optional[FaultProfile] = None
+
+    def _send(self, status: int, body: bytes = b""):
+        self.send_response(status)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        if body:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # クライアントがタイムアウト等で先に接続を閉じた
+            self.close_connection = True
+
+    def _send_json(self, status: int, data: Any):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def do_OPTIONS(self):
+        self._send(200)
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/tools":
+            self._send(200, self.tools_json)
+        else:
+            self._send_json(404, {"error": "Not Found"})
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/execute":
+            self._send_json(404, {"error": "Not Found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            # 本文を読み切ってから障害を注入する（読み残しがあると同じ接続の次のリクエストが壊れる）
+            fault = self.faults.pick() if self.faults else None
+            if fault == "drop":
+                self.close_connection = True
+                return
+            if fault == "error":
+                self._send_json(503, {"error": "Service Unavailable (injected fault)"})
+                return
+            if fault == "delay":
+                time.sleep(self.faults.delay_seconds)
+            request = json.loads(body.decode('utf-8'))
+            function_name = request.get("function_name")
+            request_id = request.get("request_id") or ""
+            if (function_name or "").lower() == "compose" and self.compose_pool is not None:
+                response = self._execute_compose(request.get("arguments") or {}, request_id)
+            else:
+                response = self._dispatch(function_name, request.get("arguments"), request_id)
+            self._send_json(200, response)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def _dispatch(self, function_name: str, arguments: Dict[str, Any], request_id: str = "") -> Dict[str, Any]:
+        if (function_name or "").lower() == "map" and self.map_pool is not None:
+            return self._execute_map(arguments or {}, request_id)
+        return self._execute(function_name, arguments, request_id)
+
+    def _execute(self, function_name: str, arguments: Dict[str, Any], request_id: str = "") -> Dict[str, Any]:
+        if (function_name or "").lower() in self.batch_functions:
+            import batch_kernels
+            return batch_kernels.execute_batch(function_name, arguments, request_id, functions=self.batch_functions)
+        return ref.execute(function_name, arguments, request_id, functions=self.functions)
+
+    def _execute_map(self, arguments: Dict[str, Any], request_id: str) -> Dict[str, Any]:
+        """関数を各引数に並列に適用する（要素ごとのエラーは結果の該当位置に {"error": ...} として返す）"""
+        function_name = ref.get_argument_value(arguments, *MAP_FUNCTION_ALIASES)
+        items = ref.get_argument_value(arguments, *MAP_ARGUMENTS_ALIASES)
+        if not isinstance(function_name, str) or items is None:
+            return ref._response(request_id, error="Missing function or arguments argument. Received: "
+                                                   + ", ".join(arguments.keys()))
+        name = function_name.lower()
+        if name == "map":
+            return ref._response(request_id, error="map cannot be nested")
+        if name not in ref.FUNCTION_TABLE and name not in self.batch_functions:
+            return ref._response(request_id, error=f"Unknown function: {function_name}")
+        if not isinstance(items, list):
+            return ref._response(request_id, error="Invalid arguments format")
+        if len(items) > MAP_MAX_ITEMS:
+            return ref._response(request_id, error=f"Too many items (maximum: {MAP_MAX_ITEMS})")
+
+        # 値だけが渡された場合は、引数が1つの関数の最初の引数名に割り当てる
+        params = ref.FUNCTION_TABLE[name][0] if name in ref.FUNCTION_TABLE else None
+        single_name = params[0][0][0] if params is not None and len(params) == 1 else "list"
+
+        def apply(item: Any) -> Any:
+            call_arguments = item if isinstance(item, dict) else {single_name: item}
+            response = self._execute(name, call_arguments)
+            return response["result"] if response["success"] else {"error": response["error"]}
+
+        return ref._response(request_id, result=list(self.map_pool.map(apply, items)))
+
+    def _execute_compose(self, arguments: Dict[str, Any], request_id: str) -> Dict[str, Any]:
+        """
+        ステップのデータフローを実行する。参照先がすべて完了したステップから順に（同じ段は並列に）実行し、
+        いずれかのステップが失敗した時点で、完了したステップの結果を含むエラーを返す。
+        """
+        steps = ref.get_argument_value(arguments, *COMPOSE_STEPS_ALIASES)
+        if not isinstance(steps, list) or not steps:
+            return ref._response(request_id, error="Missing steps argument. Received: " + ", ".join(arguments.keys()))
+        if len(steps) > COMPOSE_MAX_STEPS:
+            return ref._response(request_id, error=f"Too many steps (maximum: {COMPOSE_MAX_STEPS})")
+
+        nodes = []
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict):
+                return ref._response(request_id, error=f"Invalid step format at index {index}")
+            step_id = str(step.get("id") or f"step{index + 1}")
+            function_name = ref.get_argument_value(step, *MAP_FUNCTION_ALIASES)
+            if not isinstance(function_name, str):
+                return ref._response(request_id, error=f"Missing function for step '{step_id}'")
+            if function_name.lower() == "compose":
+                return ref._response(request_id, error="compose cannot be nested")
+            step_arguments = step.get("arguments", step.get("args", {}))
+            nodes.append((step_id, function_name, step_arguments, set(_compose_references(step_arguments))))
+
+        ids = [node[0] for node in nodes]
+        if len(set(ids)) != len(ids):
+            return ref._response(request_id, error="Step ids must be unique")
+        for step_id, _, _, dependencies in nodes:
+            unknown = dependencies - set(ids)
+            if unknown:
+                return ref._response(request_id, error=f"Unknown step reference in '{step_id}': ${sorted(unknown)[0]}")
+
+        results: Dict[str, Any] = {}
+
+        def run(node) -> Dict[str, Any]:
+            step_id, function_name, step_arguments, _ = node
+            try:
+                resolved = _resolve_compose_references(step_arguments, results)
+            except ValueError as e:
+                return ref._response("", error=str(e))
+            return self._dispatch(function_name, resolved)
+
+        pending = list(nodes)
+        while pending:
+            ready = [node for node in pending if node[3] <= results.keys()]
+            if not ready:
+                return ref._response(request_id, error="Circular step references: "
+                                                       + ", ".join(node[0] for node in pending))
+            responses = list(self.compose_pool.map(run, ready)) if len(ready) > 1 else [run(ready[0])]
+            for node, response in zip(ready, responses):
+                if not response["success"]:
+                    completed = json.dumps({step_id: results[step_id] for step_id in ids if step_id in results},
+                                           ensure_ascii=False)
+                    return ref._response(request_id, error=f"Step '{node[0]}' ({node[1]}) failed: {response['error']}. "
+                                                           f"Completed steps: {completed}")
+                results[node[0]] = response["result"]
+            pending = [node for node in pending if node[0] not in results]
+
+        return ref._response(request_id, result={"steps": {step_id: results[step_id] for step_id in ids},
+                                                 "output": results[ids[-1]]})
+
+    def log_message(self, format, *args):
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {self.command} {self.path} - {args[1] if len(args) > 1 else ''}")
+
+
+def create_server(port: int = 8080, spf_limit: Optional[int] = None, host: str = "localhost",
+                  source_path: str = FUNCTION_SERVER_SOURCE, batch: bool = True,
+                  map_tool: bool = True, map_workers: Optional[int] = None,
+                  compose_tool: bool = True, faults: Optional[FaultProfile] = None) -> ThreadingHTTPServer:
+    """
+    ローカル代替サーバーを作成する（spf_limit が None なら試し割りで計算、
+    batch でバッチ版ツール、map_tool で map ツール、compose_tool で compose ツールを公開、
+    faults で /execute に障害を注入）
+    """
+    tools = load_tool_definitions(source_path)
+    batch_table = batch_functions(spf_limit) if batch else {}
+    if batch_table:
+        import batch_kernels
+        tools += batch_kernels.BATCH_TOOL_DEFINITIONS
+    if map_tool:
+        tools.append(MAP_TOOL_DEFINITION)
+    if compose_tool:
+        tools.append(COMPOSE_TOOL_DEFINITION)
+    handler = type("Handler", (FunctionRequestHandler,), {
+        "tools_json": json.dumps({"tools": tools}, ensure_ascii=False, indent=2).encode('utf-8'),
+        "functions": {**(spf_functions(spf_limit) if spf_limit else {}),
+                      "factorial": get_factorial_engine().factorial},
+        "batch_functions": batch_table,
+        "map_pool": ThreadPoolExecutor(max_workers=map_workers or min(32, (os.cpu_count() or 1) + 4),
+                                       thread_name_prefix="map") if map_tool else None,
+        # compose の各段から map を呼ぶため、map とは別のプールで実行する
+        "compose_pool": ThreadPoolExecutor(max_workers=8, thread_name_prefix="compose") if compose_tool else None,
+        "faults": faults if faults else None,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    import spf_table
+    parser = argparse.ArgumentParser(description="Local stand-in for the C# function server")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--host", type=str, default="localhost", help="Host to bind (default: localhost)")
+    parser.add_argument("--spf-limit", type=int, default=spf_table.DEFAULT_LIMIT,
+                        help=f"Upper bound of the smallest-prime-factor table (default: {spf_table.DEFAULT_LIMIT})")
+    parser.add_argument("--no-spf", action="store_true", help="Use trial division like the C# server")
+    parser.add_argument("--no-batch", action="store_true", help="Do not expose the batch tools")
+    parser.add_argument("--no-map", action="store_true", help="Do not expose the map tool")
+    parser.add_argument("--map-workers", type=int, help="Threads used by the map tool")
+    parser.add_argument("--no-compose", action="store_true", help="Do not expose the compose tool")
+    parser.add_argument("--fault-error-rate", type=float, default=0.0, metavar="P",
+                        help="Fraction of /execute requests answered with 503")
+    parser.add_argument("--fault-drop-rate", type=float, default=0.0, metavar="P",
+                        help="Fraction of /execute requests whose connection is closed without a response")
+    parser.add_argument("--fault-delay-rate", type=float, default=0.0, metavar="P",
+                        help="Fraction of /execute requests delayed by --fault-delay seconds")
+    parser.add_argument("--fault-delay", type=float, default=1.0, metavar="SECONDS", help="Injected delay (default: 1.0)")
+    parser.add_argument("--fault-seed", type=int, help="Random seed for fault injection")
+    args = parser.parse_args()
+
+    faults = FaultProfile(args.fault_error_rate, args.fault_drop_rate, args.fault_delay_rate, args.fault_delay,
+                          args.fault_seed)
+    server = create_server(args.port, None if args.no_spf else args.spf_limit, args.host, batch=not args.no_batch,
+                           map_tool=not args.no_map, map_workers=args.map_workers, compose_tool=not args.no_compose,
+                           faults=faults)
+    print(f"🚀 Local function server listening on http://{args.host}:{args.port}/")
+    if faults:
+        print(f"💥 Fault injection: {args.fault_error_rate:.0%} errors, {args.fault_drop_rate:.0%} drops, "
+              f"{args.fault_delay_rate:.0%} delayed by {args.fault_delay}s")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Server stopped")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+C#関数サーバー (MathFunctions.cs / FunctionServer.cs) のPython参照実装
+
+C#側と同じ意味論（int32の範囲・ラップアラウンド、丸め、例外メッセージ、引数名のエイリアス）で
+各関数を計算する。テストケース生成時の期待値計算や、サーバーを起動せずに
+/execute と同じ形式の応答を得る用途に使用する。
+
+使用方法:
+    from math_reference import execute, prime_factorization
+    prime_factorization(234)                          # [2, 3, 3, 13]
+    execute("sum", {"numbers": [1, 2, 3]})            # {"request_id": "", "result": 6, "success": True, "error": None}
+"""
+
+import math
+from typing import Dict, Any, List, Optional, Callable
+
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+# C# の例外メッセージ
+INT32_OVERFLOW_MESSAGE = "Value was either too large or too small for an Int32."
+ARITHMETIC_OVERFLOW_MESSAGE = "Arithmetic operation resulted in an overflow."
+NEGATE_MIN_VALUE_MESSAGE = "Negating the minimum value of a twos complement number is invalid."
+
+
+def _wrap_int32(value: int) -> int:
+    """unchecked な int 演算のラップアラウンド"""
+    return (value + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+def _checked_int32(value: int) -> int:
+    """checked な int 演算（LINQ の Sum など）のオーバーフロー検出"""
+    if value < INT32_MIN or value > INT32_MAX:
+        raise OverflowError(ARITHMETIC_OVERFLOW_MESSAGE)
+    return value
+
+
+def to_int32(value: Any) -> int:
+    """Convert.ToInt32 相当の変換（浮動小数点は偶数丸め、範囲外は OverflowError）"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            raise OverflowError(INT32_OVERFLOW_MESSAGE)
+        value = round(value)
+    elif isinstance(value, str):
+        value = int(value.strip())
+    else:
+        value = int(value)
+    if value < INT32_MIN or value > INT32_MAX:
+        raise OverflowError(INT32_OVERFLOW_MESSAGE)
+    return value
+
+
+def to_double(value: Any) -> float:
+    """Convert.ToDouble 相当の変換"""
+    return float(value)
+
+
+def _abs_int32(value: int) -> int:
+    """Math.Abs(int) 相当（int.MinValue は OverflowError）"""
+    if value == INT32_MIN:
+        raise OverflowError(NEGATE_MIN_VALUE_MESSAGE)
+    return abs(value)
+
+
+# --- MathFunctions.cs と同じ意味論の関数群 ---
+
+def prime_factorization(n: int) -> List[int]:
+    if n <= 1:
+        raise ValueError("Number must be greater than 1")
+    factors = []
+    i = 2
+    while i * i <= n:
+        while n % i == 0:
+            factors.append(i)
+            n //= i
+        i += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def sum_(numbers: List[int]) -> int:
+    return _checked_int32(sum(numbers))
+
+
+def multiply(numbers: List[int]) -> int:
+    if len(numbers) == 0:
+        return 0
+    result = 1
+    for num in numbers:
+        result = _wrap_int32(result * num)
+    return result
+
+
+def divide(dividend: float, divisor: float) -> float:
+    if divisor == 0:
+        raise ValueError("Cannot divide by zero")
+    return dividend / divisor
+
+
+def power(base: float, exponent: float) -> float:
+    # Math.Pow はオーバーフロー時に Infinity、定義域外で NaN を返す
+    try:
+        return math.pow(base, exponent)
+    except OverflowError:
+        if base < 0 and float(exponent).is_integer() and int(exponent) % 2 == 1:
+            return -math.inf
+        return math.inf
+    except ValueError:
+        return math.nan
+
+
+def factorial(n: int) -> str:
+    if n < 0:
+        raise ValueError("Factorial is not defined for negative numbers")
+    if n > 1000:
+        raise ValueError("Factorial calculation limit exceeded (maximum: 1000)")
+    return str(math.factorial(n))
+
+
+def gcd(a: int, b: int) -> int:
+    return math.gcd(_abs_int32(a), _abs_int32(b))
+
+
+def lcm(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    # Math.Abs(a * b) は乗算が先にラップしてから絶対値を取る
+    return _abs_int32(_wrap_int32(a * b)) // gcd(a, b)
+
+
+def is_prime(n: int) -> bool:
+    if n <= 1:
+        return False
+    if n <= 3:
+        return True
+    if n % 2 == 0 or n % 3 == 0:
+        return False
+    i = 5
+    while i * i <= n:
+        if n % i == 0 or n % (i + 2) == 0:
+            return False
+        i += 6
+    return True
+
+
+def square_root(number: float) -> float:
+    if number < 0:
+        raise ValueError("Cannot calculate square root of negative number")
+    return math.sqrt(number)
+
+
+def absolute(number: float) -> float:
+    return abs(number)
+
+
+def modulo(dividend: int, divisor: int) -> int:
+    if divisor == 0:
+        raise ValueError("Cannot perform modulo with zero divisor")
+    # C# の % は被除数の符号を持つ（ゼロ方向への切り捨て）
+    remainder = abs(dividend) % abs(divisor)
+    return -remainder if dividend < 0 else remainder
+
+
+def maximum(numbers: List[int]) -> int:
+    if len(numbers) == 0:
+        raise ValueError("List cannot be empty")
+    return max(numbers)
+
+
+def minimum(numbers: List[int]) -> int:
+    if len(numbers) == 0:
+        raise ValueError("List cannot be empty")
+    return min(numbers)
+
+
+def average(numbers: List[int]) -> float:
+    if len(numbers) == 0:
+        raise ValueError("List cannot be empty")
+    return sum(numbers) / len(numbers)
+
+
+# --- FunctionServer.cs の /execute ディスパッチ ---
+
+LIST_ALIASES = ("list", "numbers", "values", "arr", "data", "items")
+
+# function_name -> (引数ごとの (エイリアス, 変換関数), 関数, 引数不足時のエラーメッセージ)
+FUNCTION_TABLE: Dict[str, Any] = {
+    "prime_factorization": (
+        [(("number", "n", "num", "value", "integer"), to_int32)], prime_factorization,
+        "Missing number argument. Expected: 'number', 'n', 'num', 'value', or 'integer'. Received: {received}"),
+    "sum": (
+        [(LIST_ALIASES, None)], sum_,
+        "Missing list argument. Expected: 'list', 'numbers', 'values', 'arr', 'data', or 'items'. Received: {received}"),
+    "multiply": (
+        [(LIST_ALIASES, None)], multiply,
+        "Missing list argument. Expected: 'list', 'numbers', 'values', 'arr', 'data', or 'items'. Received: {received}"),
+    "divide": (
+        [(("dividend", "numerator", "a", "first"), to_double), (("divisor", "denominator", "b", "second"), to_double)],
+        divide, "Missing dividend or divisor argument"),
+    "power": (
+        [(("base", "number", "n", "x"), to_double), (("exponent", "exp", "power", "p"), to_double)],
+        power, "Missing base or exponent argument"),
+    "factorial": ([(("n", "number", "num", "value"), to_int32)], factorial, "Missing n argument"),
+    "gcd": (
+        [(("a", "first", "x", "num1"), to_int32), (("b", "second", "y", "num2"), to_int32)],
+        gcd, "Missing a or b argument"),
+    "lcm": (
+        [(("a", "first", "x", "num1"), to_int32), (("b", "second", "y", "num2"), to_int32)],
+        lcm, "Missing a or b argument"),
+    "is_prime": ([(("number", "n", "num", "value"), to_int32)], is_prime, "Missing number argument"),
+    "square_root": ([(("number", "n", "num", "value"), to_double)], square_root, "Missing number argument"),
+    "abs": ([(("number", "n", "num", "value"), to_double)], absolute, "Missing number argument"),
+    "modulo": (
+        [(("dividend", "a", "first", "num1"), to_int32), (("divisor", "b", "second", "num2"), to_int32)],
+        modulo, "Missing dividend or divisor argument"),
+    "max": ([(LIST_ALIASES, None)], maximum, "Missing list argument"),
+    "min": ([(LIST_ALIASES, None)], minimum, "Missing list argument"),
+    "average": ([(LIST_ALIASES, None)], average, "Missing list argument"),
+}
+
+
+def get_argument_value(arguments: Dict[str, Any], *possible_names: str) -> Any:
+    """GetArgumentValue 相当: 最初に見つかったエイリアスの値を返す"""
+    for name in possible_names:
+        if name in arguments:
+            return arguments[name]
+    return None
+
+
+def parse_integer_list(value: Any) -> Optional[List[int]]:
+    """ParseIntegerList 相当: 整数リストに変換できなければ None"""
+    if not isinstance(value, (list, tuple)):
+        return None
+    # JSON由来の整数リストは要素ごとの変換を省略する
+    if all(type(item) is int for item in value):
+        if value and (min(value) < INT32_MIN or max(value) > INT32_MAX):
+            return None
+        return list(value)
+    try:
+        numbers = []
+        for item in value:
+            if isinstance(item, float) and not item.is_integer():
+                return None
+            numbers.append(to_int32(item))
+        return numbers
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _response(request_id: str, result: Any = None, error: Optional[str] = None) -> Dict[str, Any]:
+    return {"request_id": request_id, "result": result, "success": error is None, "error": error}
+
+
+def execute(function_name: str, arguments: Dict[str, Any], request_id: str = "",
+            functions: Optional[Dict[str, Callable[..., Any]]] = None,
+            function_table: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    /execute と同じ形式の応答 {request_id, result, success, error} を返す
+    functions を指定すると、引数の解釈はそのままで計算だけを同名の関数に置き換える（高速な実装の差し替え用）
+    function_table を指定すると、FUNCTION_TABLE と同じ形式の別の関数表でディスパッチする
+    """
+    try:
+        name = (function_name or "").lower()
+        entry = (function_table if function_table is not None else FUNCTION_TABLE).get(name)
+        if entry is None:
+            return _response(request_id, error=f"Unknown function: {function_name}")
+        params, func, missing_message = entry
+        if functions and name in functions:
+            func = functions[name]
+        arguments = arguments or {}
+
+        values = []
+        for aliases, convert in params:
+            raw = get_argument_value(arguments, *aliases)
+            if raw is None:
+                return _response(request_id, error=missing_message.format(received=", ".join(arguments.keys())))
+            if convert is None:
+                convert = parse_integer_list
+            value = convert(raw)
+            # リストの変換（parse_integer_list、batch_kernels.to_int32_array）は変換できなければ None を返す
+            if value is None:
+                return _response(request_id, error="Invalid list format")
+            values.append(value)
+
+        return _response(request_id, result=func(*values))
+
+    except Exception as e:
+        # サーバーの catch 節と同様、request_id は空になる
+        return _response("", error=f"Function execution error: {e}")
+
+
+def compute(function_name: str, **arguments: Any) -> Any:
+    """execute の結果値を返し、エラー時は ValueError を送出する"""
+    response = execute(function_name, arguments)
+    if not response["success"]:
+        raise ValueError(response["error"])
+    return response["result"]
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {name: entry[1] for name, entry in FUNCTION_TABLE.items()}
@@ -0,0 +1,69 @@
+"""
+1ターン内の複数ツール呼び出しを並行実行する AgentExecutor
+
+create_langchain_agent(parallel_tool_calls=True) で使用される。
+"""
+
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pydantic import PrivateAttr
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction
+from langchain_core.tools import BaseTool
+
+
+class _PrefetchedToolResult(BaseTool):
+    """並行実行済みのツール結果を返すだけのツール（ログ・コールバックを元の順序で発生させるため）"""
+    
+    future: Any = None
+    
+    def _run(self, *args: Any, **kwargs: Any) -> str:
+        return self.future.result()
+
+
+class ParallelToolAgentExecutor(AgentExecutor):
+    """
+    1回のモデル応答に含まれる複数のツール呼び出しをC#サーバーへ並行して送るAgentExecutor。
+    
+    AgentExecutor は1ステップ分のアクションをすべて yield してから順に _perform_agent_action を呼ぶため、
+    最初の実行要求の時点で同じステップの全アクションのツール実行をスレッドプールに投入する。
+    コールバックとverboseログは従来どおり元の順序で1件ずつ発生させ、結果は実行済みの値を返す。
+    """
+    
+    max_parallel_tools: int = 8
+    
+    _pool: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _step_actions: List[AgentAction] = PrivateAttr(default_factory=list)
+    _step_futures: Dict[int, Future] = PrivateAttr(default_factory=dict)
+    
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        self._step_actions = []
+        self._step_futures = {}
+        for item in super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager):
+            if isinstance(item, AgentAction):
+                self._step_actions.append(item)
+            yield item
+    
+    def _submit_step_actions(self, name_to_tool_map):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_parallel_tools, thread_name_prefix="tool-call")
+        for action in self._step_actions:
+            tool = name_to_tool_map.get(action.tool)
+            if tool is not None:
+                # 呼び出し元のコンテキスト（csharp_tools.record_payloads の記録先など）を引き継ぐ
+                self._step_futures[id(action)] = self._pool.submit(contextvars.copy_context().run,
+                                                                   tool.run, action.tool_input, verbose=False)
+    
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        if len(self._step_actions) > 1 and not self._step_futures:
+            self._submit_step_actions(name_to_tool_map)
+        
+        future = self._step_futures.pop(id(agent_action), None)
+        if future is not None:
+            tool = name_to_tool_map[agent_action.tool]
+            prefetched = _PrefetchedToolResult(name=tool.name, description=tool.description,
+                                               return_direct=tool.return_direct, future=future)
+            name_to_tool_map = {**name_to_tool_map, tool.name: prefetched}
+        return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
@@ -0,0 +1,363 @@
+"""
+テスト結果・パフォーマンス結果のための列指向ストア
+
+TestSession / PerformanceMetrics の結果を実行 (run) ごとのディレクトリに
+NumPy配列（.npy、列ごとに1ファイル）として保存し、複数実行をまたいだ集計を高速に行う。
+文字列列は辞書エンコード（整数コード + meta.json の辞書）で保持し、
+読み込み時はメモリマップで開くため、大量の実行でもJSONの再パースが不要。
+
+ディレクトリ構成:
+    results_store/
+        <run_id>/
+            meta.json                 # 辞書、件数、作成日時
+            results/<column>.npy      # テスト単位の列 (success, execution_time, category, ...)
+            tools/<column>.npy        # actual_functions を展開した (result_index, tool) の列
+            performance/<benchmark>/<column>.npy   # response_times, memory_usage, cpu_usage
+
+使用方法:
+    python results_store.py --import test_results.json                # 既存JSON/JSONLの取り込み
+    python results_store.py --query success --by category             # カテゴリ別成功率（全実行）
+    python results_store.py --query latency --by complexity --runs run_a run_b
+    python results_store.py --query performance                       # ベンチマーク別レイテンシ分位点
+"""
+
+import os
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 辞書エンコードする文字列列
+CATEGORICAL_COLUMNS = ["test_id", "perspective", "subcategory", "category", "complexity", "language"]
+# 集計キーとして指定できる列（tool は actual_functions の展開、run は実行ID）
+GROUP_FIELDS = ["perspective", "subcategory", "category", "complexity", "language", "tool", "run"]
+
+
+def _require_numpy():
+    if np is None:
+        raise Exception("numpy is required for the columnar results store (pip install numpy)")
+
+
+def _session_records(sessions: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """perspective -> [subcategory ->] TestSession/dict をテスト単位のレコードに展開"""
+    from test_reporter import flatten_session_results
+
+    serializable = {}
+    for key, value in sessions.items():
+        if hasattr(value, "to_dict"):
+            serializable[key] = value.to_dict()
+        elif isinstance(value, dict):
+            serializable[key] = {k: v.to_dict() if hasattr(v, "to_dict") else v for k, v in value.items()}
+    return flatten_session_results(serializable)
+
+
+class ColumnarResultsStore:
+    """実行ごとの列指向結果ストアと、複数実行をまたぐクエリヘルパー"""
+
+    def __init__(self, root: str = "results_store"):
+        _require_numpy()
+        self.root = root
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+    def _new_run_dir(self, run_id: Optional[str]) -> str:
+        """
+        新しい実行ディレクトリを作成する。同じIDの実行が既にある場合は上書きせず、
+        "<run_id>_2", "<run_id>_3", ... と連番を付けたIDで作成する。
+        """
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        os.makedirs(self.root, exist_ok=True)
+        candidate, suffix = run_id, 1
+        while True:
+            run_dir = os.path.join(self.root, candidate)
+            try:
+                os.makedirs(run_dir)
+                return run_dir
+            except FileExistsError:
+                suffix += 1
+                candidate = f"{run_id}_{suffix}"
+
+    def _read_meta(self, run_dir: str) -> Dict[str, Any]:
+        meta_file = os.path.join(run_dir, "meta.json")
+        if os.path.exists(meta_file):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"run_id": os.path.basename(run_dir), "created": datetime.now().isoformat()}
+
+    def _write_meta(self, run_dir: str, meta: Dict[str, Any]):
+        with open(os.path.join(run_dir, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @staticmethod
+    def _save_columns(directory: str, columns: Dict[str, Any]):
+        os.makedirs(directory, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(directory, f"{name}.npy"), values)
+
+    def write_records(self, records: Iterable[Dict[str, Any]], run_id: Optional[str] = None) -> str:
+        """Write test result records (TestResult.to_dict() + perspective) as one run"""
+        run_dir = self._new_run_dir(run_id)
+
+        dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL_COLUMNS + ["tool"]}
+        codes: Dict[str, List[int]] = {name: [] for name in CATEGORICAL_COLUMNS}
+        success: List[bool] = []
+        execution_time: List[float] = []
+        tool_result_index: List[int] = []
+        tool_codes: List[int] = []
+
+        def encode(column: str, value: Any) -> int:
+            mapping = dictionaries[column]
+            value = "" if value is None else str(value)
+            if value not in mapping:
+                mapping[value] = len(mapping)
+            return mapping[value]
+
+        for index, record in enumerate(records):
+            for column in CATEGORICAL_COLUMNS:
+                codes[column].append(encode(column, record.get(column)))
+            success.append(bool(record.get("success")))
+            execution_time.append(float(record.get("execution_time") or 0.0))
+            for tool in record.get("actual_functions") or []:
+                tool_result_index.append(index)
+                tool_codes.append(encode("tool", tool))
+
+        columns = {column: np.asarray(values, dtype=np.int32) for column, values in codes.items()}
+        columns["success"] = np.asarray(success, dtype=np.bool_)
+        columns["execution_time"] = np.asarray(execution_time, dtype=np.float64)
+        self._save_columns(os.path.join(run_dir, "results"), columns)
+        self._save_columns(os.path.join(run_dir, "tools"), {
+            "result_index": np.asarray(tool_result_index, dtype=np.int32),
+            "tool": np.asarray(tool_codes, dtype=np.int32)
+        })
+
+        meta = self._read_meta(run_dir)
+        meta["result_count"] = len(success)
+        meta["dictionaries"] = {column: list(mapping.keys()) for column, mapping in dictionaries.items()}
+        self._write_meta(run_dir, meta)
+        return os.path.basename(run_dir)
+
+    def write_sessions(self, sessions: Dict[str, Any], run_id: Optional[str] = None) -> str:
+        """Export perspective -> [subcategory ->] TestSession results as one run"""
+        return self.write_records(_session_records(sessions), run_id)
+
+    def write_performance(self, metrics: Dict[str, Any], run_id: Optional[str] = None,
+                          append: bool = False) -> str:
+        """
+        Export benchmark name -> PerformanceMetrics as one run
+
+        append=True の場合は既存の実行 run_id にベンチマークを追加する
+        （1回のベンチマーク実行で複数のベンチマークを順に書き込む場合）。
+        """
+        if append and run_id and os.path.isdir(os.path.join(self.root, run_id)):
+            run_dir = os.path.join(self.root, run_id)
+        else:
+            run_dir = self._new_run_dir(run_id)
+        meta = self._read_meta(run_dir)
+        benchmarks = meta.setdefault("benchmarks", {})
+
+        for name, benchmark_metrics in metrics.items():
+            self._save_columns(os.path.join(run_dir, "performance", name), {
+                "response_times": np.asarray(benchmark_metrics.response_times, dtype=np.float64),
+                "memory_usage": np.asarray(benchmark_metrics.memory_usage, dtype=np.float64),
+                "cpu_usage": np.asarray(benchmark_metrics.cpu_usage, dtype=np.float64)
+            })
+            benchmarks[name] = {
+                "success_count": benchmark_metrics.success_count,
+                "failure_count": benchmark_metrics.failure_count,
+                "duration_seconds": benchmark_metrics.end_time - benchmark_metrics.start_time
+            }
+
+        self._write_meta(run_dir, meta)
+        return os.path.basename(run_dir)
+
+    def import_file(self, input_file: str, run_id: Optional[str] = None) -> str:
+        """Import an existing JSON/JSONL test results file as one run"""
+        from test_reporter import iter_result_records
+        run_id = run_id or os.path.splitext(os.path.basename(input_file))[0]
+        return self.write_records(iter_result_records(input_file), run_id)
+
+    # ------------------------------------------------------------------
+    # 読み込み
+    # ------------------------------------------------------------------
+    def list_runs(self) -> List[str]:
+        """Return run IDs in creation order"""
+        if not os.path.isdir(self.root):
+            return []
+        runs = [name for name in os.listdir(self.root)
+                if os.path.exists(os.path.join(self.root, name, "meta.json"))]
+        return sorted(runs, key=lambda name: self._read_meta(os.path.join(self.root, name)).get("created", ""))
+
+    @staticmethod
+    def _load_column(directory: str, name: str):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+    def load_results(self, run_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        指定した実行の結果列を連結して返す。
+
+        文字列列は全実行共通の辞書に再マップした整数コードとして返し、
+        辞書は "dictionaries" キーに格納する。
+        """
+        run_ids = list(run_ids) if run_ids else self.list_runs()
+        global_dicts: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL_COLUMNS + ["tool", "run"]}
+        parts: Dict[str, List[Any]] = {name: [] for name in
+                                       CATEGORICAL_COLUMNS + ["run", "success", "execution_time", "tool", "tool_result_index"]}
+        offset = 0
+
+        def remap(column: str, local_values: List[str]):
+            mapping = global_dicts[column]
+            for value in local_values:
+                if value not in mapping:
+                    mapping[value] = len(mapping)
+            return np.asarray([mapping[value] for value in local_values], dtype=np.int32)
+
+        for run_id in run_ids:
+            run_dir = os.path.join(self.root, run_id)
+            meta = self._read_meta(run_dir)
+            results_dir = os.path.join(run_dir, "results")
+            if "dictionaries" not in meta or not os.path.isdir(results_dir):
+                continue
+
+            count = meta["result_count"]
+            for column in CATEGORICAL_COLUMNS:
+                lookup = remap(column, meta["dictionaries"][column])
+                local_codes = self._load_column(results_dir, column)
+                parts[column].append(lookup[local_codes] if len(lookup) else np.zeros(count, dtype=np.int32))
+
+            run_code = remap("run", [run_id])[0]
+            parts["run"].append(np.full(count, run_code, dtype=np.int32))
+            parts["success"].append(self._load_column(results_dir, "success"))
+            parts["execution_time"].append(self._load_column(results_dir, "execution_time"))
+
+            tools_dir = os.path.join(run_dir, "tools")
+            tool_lookup = remap("tool", meta["dictionaries"]["tool"])
+            local_tools = self._load_column(tools_dir, "tool")
+            parts["tool"].append(tool_lookup[local_tools] if len(tool_lookup) else np.zeros(0, dtype=np.int32))
+            parts["tool_result_index"].append(self._load_column(tools_dir, "result_index") + offset)
+            offset += count
+
+        empty_types = {"success": np.bool_, "execution_time": np.float64}
+        columns = {name: np.concatenate(values) if values else np.zeros(0, dtype=empty_types.get(name, np.int32))
+                   for name, values in parts.items()}
+        columns["dictionaries"] = {column: list(mapping.keys()) for column, mapping in global_dicts.items()}
+        return columns
+
+    def _group_codes(self, columns: Dict[str, Any], field: str):
+        """Return (codes, success, times, labels) for grouping by field"""
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"Unknown group field '{field}'. Available: {GROUP_FIELDS}")
+        if field == "tool":
+            index = columns["tool_result_index"]
+            return (columns["tool"], columns["success"][index], columns["execution_time"][index],
+                    columns["dictionaries"]["tool"])
+        return columns[field], columns["success"], columns["execution_time"], columns["dictionaries"][field]
+
+    def success_rate_by(self, field: str, run_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Success rate grouped by category/complexity/language/tool/... over the given runs"""
+        codes, success, _, labels = self._group_codes(self.load_results(run_ids), field)
+        totals = np.bincount(codes, minlength=len(labels))
+        passed = np.bincount(codes, weights=success.astype(np.float64), minlength=len(labels))
+
+        return {
+            label: {
+                "total": int(totals[code]),
+                "passed": int(passed[code]),
+                "success_rate": float(passed[code] / totals[code] * 100) if totals[code] else 0.0
+            }
+            for code, label in enumerate(labels) if totals[code]
+        }
+
+    def latency_percentiles_by(self, field: str, percentiles: Sequence[float] = (50, 95, 99),
+                               run_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Execution time percentiles grouped by field over the given runs"""
+        codes, _, times, labels = self._group_codes(self.load_results(run_ids), field)
+        if len(codes) == 0:
+            return {}
+
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        sorted_times = np.asarray(times)[order]
+        boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+
+        summary = {}
+        for group_codes, group_times in zip(np.split(sorted_codes, boundaries), np.split(sorted_times, boundaries)):
+            values = np.percentile(group_times, percentiles)
+            entry = {f"p{p:g}": float(v) for p, v in zip(percentiles, values)}
+            entry["count"] = int(len(group_times))
+            entry["mean"] = float(group_times.mean())
+            summary[labels[group_codes[0]]] = entry
+        return summary
+
+    def performance_percentiles(self, percentiles: Sequence[float] = (50, 95, 99),
+                                run_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Response time percentiles per benchmark, pooled over the given runs"""
+        run_ids = list(run_ids) if run_ids else self.list_runs()
+        pooled: Dict[str, List[Any]] = {}
+        for run_id in run_ids:
+            perf_dir = os.path.join(self.root, run_id, "performance")
+            if not os.path.isdir(perf_dir):
+                continue
+            for name in os.listdir(perf_dir):
+                pooled.setdefault(name, []).append(
+                    self._load_column(os.path.join(perf_dir, name), "response_times"))
+
+        summary = {}
+        for name, arrays in pooled.items():
+            times = np.concatenate(arrays)
+            if len(times) == 0:
+                continue
+            values = np.percentile(times, percentiles)
+            summary[name] = {f"p{p:g}": float(v) for p, v in zip(percentiles, values)}
+            summary[name]["count"] = int(len(times))
+            summary[name]["runs"] = len(arrays)
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar store for test and performance results")
+
+    parser.add_argument("--root", type=str, default="results_store", help="Store directory")
+    parser.add_argument("--import", dest="import_files", nargs="+", metavar="FILE",
+                        help="Import JSON/JSONL test result files (one run per file)")
+    parser.add_argument("--query", choices=["success", "latency", "performance"], help="Query to run")
+    parser.add_argument("--by", choices=GROUP_FIELDS, default="category", help="Group field")
+    parser.add_argument("--runs", nargs="+", help="Restrict to these run IDs (default: all)")
+    parser.add_argument("--list", action="store_true", help="List stored runs")
+
+    args = parser.parse_args()
+
+    store = ColumnarResultsStore(args.root)
+
+    if args.import_files:
+        for input_file in args.import_files:
+            run_id = store.import_file(input_file)
+            print(f"📥 Imported {input_file} as run '{run_id}'")
+
+    if args.list:
+        for run_id in store.list_runs():
+            print(f"  {run_id}")
+
+    if args.query == "success":
+        for label, stats in sorted(store.success_rate_by(args.by, args.runs).items()):
+            print(f"  {label or '-'}: {stats['passed']}/{stats['total']} ({stats['success_rate']:.1f}%)")
+    elif args.query == "latency":
+        for label, stats in sorted(store.latency_percentiles_by(args.by, run_ids=args.runs).items()):
+            print(f"  {label or '-'}: n={stats['count']} P50={stats['p50']:.3f}s "
+                  f"P95={stats['p95']:.3f}s P99={stats['p99']:.3f}s")
+    elif args.query == "performance":
+        for name, stats in sorted(store.performance_percentiles(run_ids=args.runs).items()):
+            print(f"  {name}: n={stats['count']} runs={stats['runs']} P50={stats['p50']:.3f}s "
+                  f"P95={stats['p95']:.3f}s P99={stats['p99']:.3f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+ツール引数のクライアント側検証（ネットワークに送る前に不正な呼び出しを拒否する）
+
+モデルが prime_factorization にリストを渡したり、factorial に 1000 を超える値を渡したりすると、
+C#サーバーへの往復の後にエラーが返る。このモジュールはツール作成時に各ツールの
+JSONスキーマ（型・必須引数）とサーバーが実際に拒否する範囲を検証関数にコンパイルし、不正な呼び出しを
+サーバーと同じエラーメッセージでローカルに（マイクロ秒単位で）失敗させる。
+
+- 引数名のエイリアスと引数不足時のメッセージは math_reference.FUNCTION_TABLE（FunctionServer.cs と同じ）に従う
+- 型変換のエラーは Convert.ToInt32 / Convert.ToDouble / ParseIntegerList と同じメッセージにする
+- 範囲は MathFunctions.cs が例外を送出する範囲（SERVER_BOUNDS）のみを既定で検証する。説明の「(X以上Y以下)」は
+  モデルへの目安でありサーバーはその外の値も計算するため、enforce_documented_bounds=True の場合のみ拒否する
+- FUNCTION_TABLE にないツール（バッチ・map・compose など）は検証しない（サーバー側の引数解釈に任せる）
+- record_validation() で1回のエージェント呼び出し（同じコンテキスト）で拒否した呼び出し数を数えられる
+
+使用方法:
+    from schema_validator import compile_validator
+    validate = compile_validator("prime_factorization", tool_def["parameters"])
+    validate({"number": [12, 15]})       # "Function execution error: Unable to cast object of type ..."
+    validate({"number": 12})             # None（有効）
+"""
+
+import re
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple
+
+import math_reference as ref
+
+# 検証関数: 引数を受け取り、不正ならサーバーと同じエラーメッセージ、有効なら None を返す
+Validator = Callable[[Dict[str, Any]], Optional[str]]
+
+# スキーマの型 -> FunctionServer.cs の変換（None は ParseIntegerList）
+SCHEMA_CONVERTERS: Dict[str, Optional[Callable[[Any], Any]]] = {
+    "integer": ref.to_int32,
+    "number": ref.to_double,
+    "array": None,
+}
+
+# 説明に記載された範囲: 「(2以上1,000,000以下)」「(0以上1000以下)」
+DOCUMENTED_BOUNDS_PATTERN = re.compile(r"\(\s*(-?[\d,]+)\s*以上(?:\s*(-?[\d,]+)\s*以下)?\s*\)")
+
+# C# の例外メッセージ（Newtonsoft.Json がデシリアライズした配列・オブジェクトを Convert.ToXxx に渡した場合など）
+CAST_MESSAGE = "Unable to cast object of type 'Newtonsoft.Json.Linq.{json_type}' to type 'System.IConvertible'."
+FORMAT_MESSAGE = "Input string was not in a correct format."
+
+# MathFunctions.cs が例外を送出する範囲: 関数名 -> (最小値, 最大値)（いずれも引数が1つの関数）
+SERVER_BOUNDS: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "prime_factorization": (2, None),
+    "factorial": (0, 1000),
+}
+
+# SERVER_BOUNDS の範囲外の値に対して MathFunctions.cs が送出するメッセージ（説明の範囲の外は汎用メッセージ）
+BOUND_MESSAGES: Dict[Tuple[str, str], str] = {
+    ("prime_factorization", "minimum"): "Number must be greater than 1",
+    ("factorial", "minimum"): "Factorial is not defined for negative numbers",
+    ("factorial", "maximum"): "Factorial calculation limit exceeded (maximum: 1000)",
+}
+
+
+def documented_bounds(schema: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """プロパティのスキーマから (最小値, 最大値) を取得する（minimum / maximum、なければ説明の記載）"""
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    match = DOCUMENTED_BOUNDS_PATTERN.search(schema.get("description") or "")
+    if match:
+        low, high = match.groups()
+        if minimum is None:
+            minimum = int(low.replace(",", ""))
+        if maximum is None and high is not None:
+            maximum = int(high.replace(",", ""))
+    return minimum, maximum
+
+
+def _bound_message(function_name: str, parameter: str, bound: str, minimum, maximum, server_bound: bool) -> str:
+    message = BOUND_MESSAGES.get((function_name, bound)) if server_bound else None
+    if message is None:
+        low = f"{minimum:,}" if minimum is not None else "-∞"
+        high = f"{maximum:,}" if maximum is not None else "∞"
+        message = f"Value of '{parameter}' is outside the supported range ({low} to {high})"
+    return f"Function execution error: {message}"
+
+
+def compile_validator(function_name: str, parameters_schema: Dict[str, Any],
+                      enforce_documented_bounds: bool = False) -> Optional[Validator]:
+    """
+    ツールのJSONスキーマを検証関数にコンパイルする
+
+    Args:
+        function_name: ツール名
+        parameters_schema: /tools の parameters（{type, properties, required}）
+        enforce_documented_bounds: サーバーが拒否する範囲に加えて、スキーマ・説明に記載された範囲の外の値も拒否する
+
+    Returns:
+        検証関数（検証できないツールの場合は None）
+    """
+    name = (function_name or "").lower()
+    entry = ref.FUNCTION_TABLE.get(name)
+    if entry is None:
+        return None
+    params, _, missing_message = entry
+    properties = (parameters_schema or {}).get("properties") or {}
+
+    server_minimum, server_maximum = SERVER_BOUNDS.get(name, (None, None)) if len(params) == 1 else (None, None)
+    checks = []
+    for aliases, _ in params:
+        parameter = next((prop for prop in properties if prop in aliases), None)
+        schema = properties.get(parameter) or {}
+        if schema.get("type") not in SCHEMA_CONVERTERS:
+            return None
+        minimum, maximum = server_minimum, server_maximum
+        if enforce_documented_bounds:
+            # より狭い方の範囲を使う
+            documented_minimum, documented_maximum = documented_bounds(schema)
+            if documented_minimum is not None and (minimum is None or documented_minimum > minimum):
+                minimum = documented_minimum
+            if documented_maximum is not None and (maximum is None or documented_maximum < maximum):
+                maximum = documented_maximum
+        checks.append((aliases, SCHEMA_CONVERTERS[schema["type"]], minimum, maximum,
+                       _bound_message(name, parameter, "minimum", minimum, maximum,
+                                      minimum is not None and minimum == server_minimum),
+                       _bound_message(name, parameter, "maximum", minimum, maximum,
+                                      maximum is not None and maximum == server_maximum)))
+
+    def validate(arguments: Dict[str, Any]) -> Optional[str]:
+        arguments = arguments or {}
+        values = [ref.get_argument_value(arguments, *check[0]) for check in checks]
+        if any(value is None for value in values):
+            return missing_message.format(received=", ".join(arguments.keys()))
+
+        for value, (_, convert, minimum, maximum, below_message, above_message) in zip(values, checks):
+            if convert is None:
+                if ref.parse_integer_list(value) is None:
+                    return "Invalid list format"
+                continue
+            if isinstance(value, (list, tuple, dict)):
+                json_type = "JObject" if isinstance(value, dict) else "JArray"
+                return f"Function execution error: {CAST_MESSAGE.format(json_type=json_type)}"
+            try:
+                number = convert(value)
+            except ValueError:
+                return f"Function execution error: {FORMAT_MESSAGE}"
+            except OverflowError as e:
+                return f"Function execution error: {e}"
+            except TypeError:
+                # JSON に現れない型はサーバー側の判断に任せる
+                continue
+            if minimum is not None and number < minimum:
+                return below_message
+            if maximum is not None and number > maximum:
+                return above_message
+        return None
+
+    return validate
+
+
+# プロセス内の検証統計（拒否した呼び出し = 省略したサーバーへの往復）
+_stats: Dict[str, Any] = {"validated": 0, "rejected": 0, "validation_seconds": 0.0, "rejected_by_function": {}}
+_stats_lock = threading.Lock()
+
+
+class ValidationUsage:
+    """1回のエージェント呼び出しでの検証・拒否の件数"""
+
+    def __init__(self):
+        self.validated = 0
+        self.rejected = 0
+
+
+# 実行中のエージェント呼び出しの集計先（並列ツール呼び出しにはコンテキストごとに引き継がれる）
+_validation_usage: ContextVar[Optional[ValidationUsage]] = ContextVar("validation_usage", default=None)
+
+
+@contextmanager
+def record_validation() -> Iterator[ValidationUsage]:
+    """ブロック内（同じコンテキスト）のツール呼び出しの検証・拒否を数える"""
+    usage = ValidationUsage()
+    token = _validation_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _validation_usage.reset(token)
+
+
+def validate_call(function_name: str, validator: Optional[Validator], arguments: Dict[str, Any]) -> Optional[str]:
+    """検証を実行して統計に記録する（validator が None なら常に有効）"""
+    if validator is None:
+        return None
+    start = time.perf_counter()
+    error = validator(arguments)
+    elapsed = time.perf_counter() - start
+    usage = _validation_usage.get()
+    with _stats_lock:
+        _stats["validated"] += 1
+        _stats["validation_seconds"] += elapsed
+        if usage is not None:
+            usage.validated += 1
+        if error is not None:
+            _stats["rejected"] += 1
+            by_function = _stats["rejected_by_function"]
+            by_function[function_name] = by_function.get(function_name, 0) + 1
+            if usage is not None:
+                usage.rejected += 1
+    return error
+
+
+def get_validation_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats, rejected_by_function=dict(_stats["rejected_by_function"]))
+    stats["saved_round_trips"] = stats["rejected"]
+    stats["average_validation_us"] = (stats["validation_seconds"] / stats["validated"] * 1e6
+                                      if stats["validated"] else 0.0)
+    return stats
+
+
+def print_validation_stats():
+    stats = get_validation_stats()
+    if not stats["validated"]:
+        return
+    print(f"🛡️  Schema validation: {stats['rejected']}/{stats['validated']} tool calls rejected locally "
+          f"({stats['saved_round_trips']} server round-trips saved, "
+          f"{stats['average_validation_us']:.1f}µs per validation)")
+    for function_name, count in sorted(stats["rejected_by_function"].items(), key=lambda item: -item[1]):
+        print(f"    {function_name:<24} {count:>6}")
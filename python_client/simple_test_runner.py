@@ -8,52 +8,42 @@
   python simple_test_runner.py --category basic
   python simple_test_runner.py --all
   python simple_test_runner.py --interactive
+  python simple_test_runner.py --corpus test_corpus.jsonl --test gen_sum_00000004
+  python simple_test_runner.py --batch --all --workers 8 --output simple_results.jsonl   # 非対話・並列実行
+  python simple_test_runner.py --batch --corpus test_corpus.jsonl --where group=basic --limit 1000
+  python simple_test_runner.py --batch --corpus test_corpus.jsonl --limit 1000 --append   # 既存の結果ファイルに追記
 """
 
 import os
 import sys
+import json
 import argparse
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Callable
 from langchain_client import create_agent
-from test_data import (
-    BASIC_TESTS, INTERMEDIATE_TESTS, ADVANCED_TESTS, EXPERT_TESTS,
-    EDGE_CASE_TESTS, JAPANESE_TESTS, ENGLISH_TESTS, MIXED_LANGUAGE_TESTS,
-    LARGE_NUMBER_TESTS, MULTIPLE_OPERATIONS_TESTS, PRECISION_TESTS
-)
+from test_catalog import TestCatalog, load_catalog, parse_where
+
+# シンプル実行ツールで扱う test_data.py のグループ
+SIMPLE_TEST_GROUPS = [
+    "basic", "intermediate", "advanced", "expert",
+    "edge_case_tests", "japanese_tests", "english_tests", "mixed_language_tests",
+    "large_number_tests", "multiple_operations_tests", "precision_tests"
+]
 
 class SimpleTestRunner:
     """評価なしのシンプルテスト実行"""
     
-    def __init__(self):
+    def __init__(self, catalog: Optional[TestCatalog] = None):
         self.agent = None
-        self.all_tests = self._load_all_tests()
-        
-    def _load_all_tests(self) -> List[Dict[str, Any]]:
-        """全テストケースを読み込み"""
-        all_tests = []
-        test_collections = [
-            ("basic", BASIC_TESTS),
-            ("intermediate", INTERMEDIATE_TESTS),
-            ("advanced", ADVANCED_TESTS),
-            ("expert", EXPERT_TESTS),
-            ("edge_case", EDGE_CASE_TESTS),
-            ("japanese", JAPANESE_TESTS),
-            ("english", ENGLISH_TESTS),
-            ("mixed_language", MIXED_LANGUAGE_TESTS),
-            ("large_number", LARGE_NUMBER_TESTS),
-            ("multiple_operations", MULTIPLE_OPERATIONS_TESTS),
-            ("precision", PRECISION_TESTS)
-        ]
+        self.catalog = catalog or load_catalog(groups=SIMPLE_TEST_GROUPS)
         
-        for category_name, tests in test_collections:
-            for test in tests:
-                test_copy = test.copy()
-                if 'category' not in test_copy:
-                    test_copy['category'] = category_name
-                all_tests.append(test_copy)
-                
-        return all_tests
+    @property
+    def all_tests(self) -> List[Dict[str, Any]]:
+        """全テストケース"""
+        return self.catalog.select()
     
     def initialize_agent(self) -> bool:
         """LangChainエージェントを初期化"""
@@ -68,14 +58,11 @@ class SimpleTestRunner:
     
     def find_test_by_id(self, test_id: str) -> Optional[Dict[str, Any]]:
         """IDでテストケースを検索"""
-        for test in self.all_tests:
-            if test.get('id') == test_id:
-                return test
-        return None
+        return self.catalog.get(test_id)
     
     def find_tests_by_category(self, category: str) -> List[Dict[str, Any]]:
         """カテゴリでテストケースを検索"""
-        return [test for test in self.all_tests if test.get('category') == category]
+        return self.catalog.select(category=category)
     
     def display_test_info(self, test: Dict[str, Any]):
         """テスト情報を表示"""
@@ -101,6 +88,16 @@ class SimpleTestRunner:
                 print(f"   期待結果: {expected_result}")
             print()
     
+    @staticmethod
+    def _invoke_agent(agent, prompt: str) -> str:
+        """エージェントを実行して出力文字列を返す"""
+        response = agent.invoke({"input": prompt})
+        
+        # レスポンスから出力を抽出
+        if isinstance(response, dict):
+            return response.get("output", str(response))
+        return str(response)
+    
     def execute_test(self, test: Dict[str, Any]) -> str:
         """テストを実行して結果を返す"""
         if not self.agent:
@@ -115,13 +112,7 @@ class SimpleTestRunner:
         
         try:
             # LangChainエージェントでテスト実行
-            response = self.agent.invoke({"input": prompt})
-            
-            # レスポンスから出力を抽出
-            if isinstance(response, dict):
-                output = response.get("output", str(response))
-            else:
-                output = str(response)
+            output = self._invoke_agent(self.agent, prompt)
                 
             execution_time = time.time() - start_time
             
@@ -138,6 +129,107 @@ class SimpleTestRunner:
             print()
             return f"エラー: {e}"
     
+    def run_batch(self, tests: Iterable[Dict[str, Any]], output_file: str, workers: int = 4,
+                  total: Optional[int] = None, agent_factory: Callable[[], Any] = create_agent,
+                  append: bool = False) -> Dict[str, Any]:
+        """
+        テストを非対話・並列に実行し、完了した順に1行1結果のJSONLへ書き出す。
+        
+        エージェントはワーカースレッドごとに1つ作成し、テスト間で会話履歴を持ち越さないよう
+        実行前にメモリをクリアする。投入中のテスト数は workers * 2 までに制限するため、
+        コーパスのような大きなイテラブルもメモリ使用量一定で流せる。
+        結果ファイルは上書きする（append=True なら既存の結果に追記する）。
+        """
+        local = threading.local()
+        write_lock = threading.Lock()
+        counts = {"completed": 0, "errors": 0}
+        start_time = time.time()
+        last_progress = [0.0]
+        
+        def get_agent():
+            if getattr(local, "agent", None) is None:
+                agent = agent_factory()
+                # 並列実行ではエージェントの逐次ログを抑止する
+                agent.verbose = False
+                local.agent = agent
+            return local.agent
+        
+        def run(test: Dict[str, Any]) -> Dict[str, Any]:
+            test_start = time.time()
+            output, error = None, None
+            try:
+                agent = get_agent()
+                if getattr(agent, "memory", None) is not None:
+                    agent.memory.clear()
+                output = self._invoke_agent(agent, test.get('prompt', ''))
+            except Exception as e:
+                error = str(e)
+            return {
+                "test_id": test.get('id', 'unknown'),
+                "category": test.get('category', 'unknown'),
+                "complexity": test.get('complexity'),
+                "language": test.get('language'),
+                "prompt": test.get('prompt', ''),
+                "expected_functions": test.get('expected_functions', []),
+                "expected_result": test.get('expected_result'),
+                "output": output,
+                "error": error,
+                "execution_time": time.time() - test_start,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        def record_result(f, record: Dict[str, Any]):
+            with write_lock:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                counts["completed"] += 1
+                if record["error"]:
+                    counts["errors"] += 1
+                # 表示の更新は0.1秒に1回まで
+                now = time.time()
+                if now - last_progress[0] >= 0.1 or counts["completed"] == total:
+                    last_progress[0] = now
+                    self._print_progress(counts, total, start_time)
+        
+        print(f"🚀 バッチ実行開始 (ワーカー: {workers}, 出力: {output_file})")
+        
+        with open(output_file, 'a' if append else 'w', encoding='utf-8') as f, ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            try:
+                for test in tests:
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            record_result(f, future.result())
+                    pending.add(pool.submit(run, test))
+                    
+                for future in wait(pending).done:
+                    record_result(f, future.result())
+            except KeyboardInterrupt:
+                # 未着手のテストは破棄し、実行中のものだけ完了を待つ
+                for future in pending:
+                    future.cancel()
+                print("\n\n⏹️  バッチ実行を中断しました")
+                for future in pending:
+                    if not future.cancelled():
+                        record_result(f, future.result())
+                
+        self._print_progress(counts, total, start_time)
+        elapsed = time.time() - start_time
+        print(f"\n✅ バッチ実行完了: {counts['completed']}件 (エラー {counts['errors']}件, {elapsed:.1f}秒)")
+        return {"completed": counts["completed"], "errors": counts["errors"], "duration_seconds": elapsed}
+    
+    @staticmethod
+    def _print_progress(counts: Dict[str, int], total: Optional[int], start_time: float):
+        """1行で上書きする進捗表示"""
+        completed = counts["completed"]
+        elapsed = time.time() - start_time
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        line = f"\r📊 {completed}" + (f"/{total}" if total else "") + f" 完了 | ❌ {counts['errors']} | {rate:.2f}件/秒"
+        if total and rate > 0:
+            line += f" | 残り約{(total - completed) / rate:.0f}秒"
+        print(line, end="", flush=True)
+    
     def display_result(self, result: str):
         """結果をクリーンに表示"""
         print("📄 実行結果:")
@@ -220,9 +312,7 @@ class SimpleTestRunner:
                     
             elif choice == "2":
                 print("\n利用可能なカテゴリ:")
-                categories = set(test.get('category', 'unknown') for test in self.all_tests)
-                for cat in sorted(categories):
-                    count = len([t for t in self.all_tests if t.get('category') == cat])
+                for cat, count in sorted(self.catalog.values('category').items(), key=lambda item: str(item[0])):
                     print(f"  - {cat} ({count}件)")
                 
                 category = input("\nカテゴリ名を入力: ").strip()
@@ -270,11 +360,18 @@ def main():
     parser.add_argument("--all", action="store_true", help="全テストを実行")
     parser.add_argument("--interactive", action="store_true", help="インタラクティブモード")
     parser.add_argument("--list", action="store_true", help="テスト一覧を表示")
+    parser.add_argument("--corpus", help="test_generator.py で生成したコーパスからテストを読み込む")
+    parser.add_argument("--batch", action="store_true", help="非対話・並列で実行し結果をファイルに書き出す")
+    parser.add_argument("--workers", type=int, default=4, help="バッチ実行の並列数")
+    parser.add_argument("--output", default="simple_results.jsonl", help="バッチ実行の結果ファイル (JSONL)")
+    parser.add_argument("--append", action="store_true", help="バッチ実行の結果を上書きせずに結果ファイルへ追記する")
+    parser.add_argument("--where", nargs="+", metavar="FIELD=VALUE", help="バッチ実行するテストの条件")
+    parser.add_argument("--limit", type=int, help="バッチ実行するテストの最大件数")
     
     args = parser.parse_args()
     
     # 引数なしの場合はインタラクティブモード
-    if not any([args.test, args.category, args.all, args.interactive, args.list]):
+    if not any([args.test, args.category, args.all, args.interactive, args.list, args.batch]):
         args.interactive = True
     
     print("🧪 シンプルテスト実行ツール")
@@ -287,13 +384,32 @@ def main():
         print("   export AZURE_OPENAI_API_KEY='your_api_key' を実行してください")
         sys.exit(1)
     
-    runner = SimpleTestRunner()
+    runner = SimpleTestRunner(load_catalog(args.corpus) if args.corpus else None)
     
     # テスト一覧表示のみの場合
     if args.list:
         runner.show_test_list()
         return
     
+    # バッチ実行（エージェントはワーカーごとに初期化）
+    if args.batch:
+        if args.test:
+            criteria = {"id": args.test.split(",")}
+        elif args.category:
+            criteria = {"category": args.category}
+        else:
+            criteria = parse_where(args.where)
+        total = runner.catalog.count(**criteria)
+        if args.limit is not None:
+            total = min(total, args.limit)
+        try:
+            runner.run_batch(runner.catalog.iter_select(limit=args.limit, **criteria), args.output,
+                             workers=args.workers, total=total, append=args.append)
+        except Exception as e:
+            print(f"\n❌ エラーが発生しました: {e}")
+            sys.exit(1)
+        return
+    
     # エージェント初期化
     if not runner.initialize_agent():
         print("❌ エージェントの初期化に失敗しました")
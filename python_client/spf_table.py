@@ -0,0 +1,208 @@
+"""
+最小素因数（SPF: smallest prime factor）テーブル
+
+n 以下の各整数の最小素因数をあらかじめ篩で求め、メモリマップ可能な .npy ファイルとして保存する。
+素因数分解は SPF をたどるだけの O(log n)、素数判定は1回の参照の O(1) になる。
+ファイルは読み取り専用でメモリマップするため、ローカル代替サーバーや Python 実行バックエンドを
+複数プロセスで起動してもOSのページキャッシュを共有する（プロセスごとの構築・コピーは不要）。
+
+格納形式:
+- uint16 の1次元配列（1要素2バイト、1,000,000 までで約2MB）
+- 合成数 n には最小素因数（常に sqrt(上限) 以下なので uint16 に収まる）、素数と 0, 1 には 0 を格納する
+
+結果は math_reference（MathFunctions.cs の意味論）と同一で、テーブル範囲外の値は試し割りにフォールバックする。
+
+使用方法:
+    from spf_table import get_spf_table
+    table = get_spf_table()               # <モジュールのディレクトリ>/.spf_cache/spf_uint16_1000000.npy を読み込み（なければ構築）
+    table.prime_factorization(360360)     # [2, 2, 2, 3, 3, 5, 7, 11, 13]
+    table.is_prime(999983)                # True
+
+    python spf_table.py --build --limit 10000000
+    python spf_table.py --benchmark
+"""
+
+import os
+import math
+import time
+import random
+import argparse
+import threading
+from typing import Dict, Any, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import math_reference as ref
+
+DEFAULT_LIMIT = 1_000_000
+# 実行時のカレントディレクトリに依存しないよう、モジュールと同じディレクトリに置く
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".spf_cache")
+
+# uint16 に格納できる最小素因数の上限から決まるテーブルの最大サイズ
+MAX_LIMIT = 65535 ** 2
+
+
+def _require_numpy():
+    if np is None:
+        raise Exception("numpy is required for the smallest-prime-factor table (pip install numpy)")
+
+
+def build_spf_array(limit: int):
+    """limit 以下の最小素因数テーブルを篩で構築する（素数・0・1 は 0）"""
+    _require_numpy()
+    if limit > MAX_LIMIT:
+        raise ValueError(f"limit must be <= {MAX_LIMIT}")
+    spf = np.zeros(limit + 1, dtype=np.uint16)
+    for p in range(2, math.isqrt(limit) + 1):
+        if spf[p] == 0:
+            # まだ最小素因数が決まっていない p の倍数にだけ p を設定する
+            multiples = spf[p * p::p]
+            multiples[multiples == 0] = p
+    return spf
+
+
+def table_path(limit: int = DEFAULT_LIMIT, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"spf_uint16_{limit}.npy")
+
+
+def build_spf_file(limit: int = DEFAULT_LIMIT, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """テーブルを構築して保存する（一時ファイルから置き換えるため、並行して構築しても安全）"""
+    path = table_path(limit, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, build_spf_array(limit))
+    os.replace(tmp_path, path)
+    return path
+
+
+class SPFTable:
+    """メモリマップした最小素因数テーブルによる素因数分解・素数判定"""
+
+    def __init__(self, path: str):
+        _require_numpy()
+        self.path = path
+        self.spf = np.load(path, mmap_mode='r')
+        self.limit = len(self.spf) - 1
+
+    def covers(self, n: int) -> bool:
+        return 0 <= n <= self.limit
+
+    def prime_factorization(self, n: int) -> List[int]:
+        if n <= 1:
+            raise ValueError("Number must be greater than 1")
+        if n > self.limit:
+            return ref.prime_factorization(n)
+        spf = self.spf
+        factors = []
+        while n > 1:
+            p = int(spf[n]) or n
+            factors.append(p)
+            n //= p
+        return factors
+
+    def is_prime(self, n: int) -> bool:
+        if n <= 1:
+            return False
+        if n > self.limit:
+            return ref.is_prime(n)
+        return bool(self.spf[n] == 0)
+
+    def is_prime_many(self, numbers) -> "np.ndarray":
+        """整数配列の素数判定をまとめて行う（範囲外の要素は試し割り）"""
+        values = np.asarray(numbers, dtype=np.int64)
+        result = np.zeros(values.shape, dtype=bool)
+        in_range = (values >= 2) & (values <= self.limit)
+        result[in_range] = self.spf[values[in_range]] == 0
+        for index in np.flatnonzero(values > self.limit):
+            result[index] = ref.is_prime(int(values[index]))
+        return result
+
+
+# プロセス内で共有するテーブル（上限・ディレクトリごと）
+_tables: Dict[str, SPFTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_spf_table(limit: int = DEFAULT_LIMIT, cache_dir: str = DEFAULT_CACHE_DIR, build: bool = True) -> SPFTable:
+    """保存済みのテーブルをメモリマップで開く（なければ構築して保存する）"""
+    path = table_path(limit, cache_dir)
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            if not os.path.exists(path):
+                if not build:
+                    raise FileNotFoundError(f"SPF table not found: {path} (run: python spf_table.py --build)")
+                build_spf_file(limit, cache_dir)
+            table = _tables[path] = SPFTable(path)
+    return table
+
+
+def benchmark(table: SPFTable, count: int = 20000, seed: int = 0) -> Dict[str, Any]:
+    """試し割り（math_reference）と SPF テーブルの処理時間を比較する"""
+    rng = random.Random(seed)
+    numbers = [rng.randint(2, table.limit) for _ in range(count)]
+    # 素数は試し割りの最悪ケースになるため、テーブル上の大きな素数を混ぜる
+    primes = np.flatnonzero(table.spf[max(2, table.limit - 100000):] == 0) + max(2, table.limit - 100000)
+    numbers[::10] = [int(p) for p in rng.choices(list(primes), k=len(numbers[::10]))]
+
+    def measure(func) -> float:
+        start = time.perf_counter()
+        for n in numbers:
+            func(n)
+        return time.perf_counter() - start
+
+    results = {"count": count, "limit": table.limit}
+    for name, trial, fast in (("prime_factorization", ref.prime_factorization, table.prime_factorization),
+                              ("is_prime", ref.is_prime, table.is_prime)):
+        assert all(trial(n) == fast(n) for n in numbers[:2000]), f"{name} mismatch"
+        trial_seconds, spf_seconds = measure(trial), measure(fast)
+        results[name] = {
+            "trial_division_us": trial_seconds / count * 1e6,
+            "spf_table_us": spf_seconds / count * 1e6,
+            "speedup": trial_seconds / spf_seconds if spf_seconds else 0.0,
+        }
+
+    start = time.perf_counter()
+    table.is_prime_many(numbers)
+    results["is_prime_many_us"] = (time.perf_counter() - start) / count * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smallest-prime-factor table for factorization and primality")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Table upper bound (default: {DEFAULT_LIMIT})")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory for the table file")
+    parser.add_argument("--build", action="store_true", help="Build (or rebuild) the table file")
+    parser.add_argument("--benchmark", action="store_true", help="Compare against trial division")
+    parser.add_argument("--count", type=int, default=20000, help="Numbers per benchmark")
+    args = parser.parse_args()
+
+    try:
+        if args.build:
+            start = time.perf_counter()
+            path = build_spf_file(args.limit, args.cache_dir)
+            print(f"✅ Built {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB) "
+                  f"in {time.perf_counter() - start:.2f}s")
+
+        table = get_spf_table(args.limit, args.cache_dir)
+        if args.benchmark or not args.build:
+            results = benchmark(table, args.count)
+            print(f"\n📊 SPF table vs trial division ({results['count']} numbers up to {results['limit']:,})")
+            for name in ("prime_factorization", "is_prime"):
+                stats = results[name]
+                print(f"  {name:<20} trial {stats['trial_division_us']:>8.2f}µs   "
+                      f"spf {stats['spf_table_us']:>6.2f}µs   ({stats['speedup']:.1f}x)")
+            print(f"  {'is_prime (batch)':<20} spf {results['is_prime_many_us']:>6.3f}µs per number")
+        return 0
+
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+起動時間（インポート時間・コールドスタート）のベンチマーク
+
+各エントリーポイントを新しいPythonプロセスで起動し（コールドスタート）、壁時計時間の中央値と
+`python -X importtime` によるモジュール別のインポート時間を計測する。
+LangChain・OpenAI SDK はエージェント作成時まで読み込まない設計のため、
+エントリーポイントの起動でそれらが読み込まれていないかもあわせて確認する。
+
+使用方法:
+    python startup_benchmark.py                             # 全エントリーポイントを計測
+    python startup_benchmark.py --repeat 10 --top 15        # 反復回数・表示するモジュール数
+    python startup_benchmark.py --save startup_baseline.json
+    python startup_benchmark.py --compare startup_baseline.json --tolerance 0.25   # 退行があれば終了コード1
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+# 名前 -> 実行する引数（python の後に続く）
+ENTRY_POINTS: Dict[str, List[str]] = {
+    "python": ["-c", "pass"],
+    "import langchain_client": ["-c", "import langchain_client"],
+    "import test_utils": ["-c", "import test_utils"],
+    "import test_reporter": ["-c", "import test_reporter"],
+    "test_comprehensive.py --help": ["test_comprehensive.py", "--help"],
+    "test_performance.py --help": ["test_performance.py", "--help"],
+    "simple_test_runner.py --help": ["simple_test_runner.py", "--help"],
+    "langchain_client.py --help": ["langchain_client.py", "--help"],
+    # 参考値: エージェント作成時に遅延して読み込まれるモジュール群
+    "agent stack (deferred)": ["-c", "import langchain_openai, langchain.agents, langchain.memory, "
+                                     "csharp_tools, parallel_agent, agent_callbacks, llm_cache"],
+}
+
+# 起動時に読み込まれてはならないパッケージ（エージェント作成時の LangChain・HTTPクライアント、コーパス索引の NumPy）
+DEFERRED_PACKAGES = ("langchain", "langchain_core", "langchain_openai", "openai", "langsmith",
+                     "requests", "httpx", "numpy")
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """-X importtime の出力を (モジュール, 自身のμs, 累積μs, 深さ) のリストにする"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def measure_entry_point(args: List[str], repeat: int = 5) -> Dict[str, Any]:
+    """新しいプロセスで repeat 回起動し、壁時計時間とモジュール別インポート時間を返す"""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    wall_times = []
+    rows: List[Tuple[str, int, int, int]] = []
+
+    for iteration in range(repeat):
+        command = [sys.executable, "-X", "importtime", *args]
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+            return {"error": error}
+        if iteration == 0:
+            rows = parse_importtime(completed.stderr)
+
+    # トップレベルパッケージごとに自身の時間を合算
+    by_package: Dict[str, int] = {}
+    for module, self_us, _, _ in rows:
+        package = module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    return {
+        "wall_seconds": statistics.median(wall_times),
+        "wall_min_seconds": min(wall_times),
+        "import_seconds": sum(self_us for _, self_us, _, _ in rows) / 1e6,
+        "module_count": len(rows),
+        "packages": {package: us / 1e6 for package, us in sorted(by_package.items(), key=lambda item: -item[1])},
+        "deferred_loaded": sorted({module.split(".")[0] for module, _, _, _ in rows
+                                   if module.split(".")[0] in DEFERRED_PACKAGES}),
+    }
+
+
+def run_startup_benchmark(repeat: int = 5, entry_points: Dict[str, List[str]] = None) -> Dict[str, Any]:
+    entry_points = entry_points or ENTRY_POINTS
+    results = {}
+    for name, args in entry_points.items():
+        print(f"  measuring {name}...", flush=True)
+        results[name] = measure_entry_point(args, repeat)
+    return results
+
+
+def print_startup_report(results: Dict[str, Any], top: int = 8):
+    print("\n" + "=" * 80)
+    print("STARTUP BENCHMARK REPORT")
+    print("=" * 80)
+    print(f"{'Entry point':<36} {'Wall (median)':>14} {'Imports':>10} {'Modules':>8}")
+    for name, stats in results.items():
+        if "error" in stats:
+            print(f"{name:<36} ❌ {stats['error']}")
+            continue
+        print(f"{name:<36} {stats['wall_seconds'] * 1000:>12.0f}ms {stats['import_seconds'] * 1000:>8.0f}ms "
+              f"{stats['module_count']:>8}")
+
+    for name, stats in results.items():
+        if "error" in stats or name == "python":
+            continue
+        print(f"\n📦 {name}")
+        for package, seconds in list(stats["packages"].items())[:top]:
+            print(f"    {package:<32} {seconds * 1000:>8.1f}ms")
+        if stats["deferred_loaded"] and "deferred" not in name:
+            print(f"    ⚠️  loads deferred packages at startup: {', '.join(stats['deferred_loaded'])}")
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25,
+                          min_delta: float = 0.1) -> List[str]:
+    """基準より tolerance（割合）かつ min_delta 秒以上遅くなったエントリーポイントを返す（ノイズの少ない最小値で比較）"""
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if "error" in stats or not previous or "error" in previous:
+            continue
+        current, before = stats["wall_min_seconds"], previous["wall_min_seconds"]
+        if current - before > min_delta and current > before * (1 + tolerance):
+            regressions.append(f"{name}: {before * 1000:.0f}ms -> {current * 1000:.0f}ms")
+        elif stats["deferred_loaded"] and not previous.get("deferred_loaded") and "deferred" not in name:
+            regressions.append(f"{name}: now loads {', '.join(stats['deferred_loaded'])} at startup")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and cold start of the entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts per entry point (median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="Packages to list per entry point")
+    parser.add_argument("--save", type=str, metavar="FILE", help="Save results as a baseline JSON file")
+    parser.add_argument("--compare", type=str, metavar="FILE", help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before reporting a regression (default: 0.25)")
+    args = parser.parse_args()
+
+    print(f"⏱️  Startup benchmark ({args.repeat} cold starts per entry point)")
+    results = run_startup_benchmark(args.repeat)
+    print_startup_report(results, args.top)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "python_version": sys.version,
+                       "results": results}, f, indent=2)
+        print(f"\n📁 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Startup regressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n✅ No startup regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+"""
+テストケースカタログ
+
+test_data.py の ALL_TESTS、または test_generator.py で生成したコーパスを索引付きで扱う。
+ID・グループ・カテゴリ・複雑度・言語・期待関数で索引を作り、複合条件（フィールド間はAND、
+同一フィールド内の複数値はOR）で即座に絞り込める。
+
+- test_data.py: 初回アクセス時に読み込み、メモリ上の転置リストで検索
+- コーパス: 初回のみ1パスで索引ディレクトリ（<corpus>.index/）を作成し、以降は列をメモリマップで開く。
+  検索はNumPyのマスク演算で行い、ケース本体は選択された行だけをオフセットから読み出す
+
+使用方法:
+    from test_catalog import load_catalog
+    catalog = load_catalog()                                   # test_data.py
+    catalog = load_catalog("test_corpus.jsonl")                # 生成コーパス
+    catalog.get("basic_001")
+    catalog.select(limit=1000, complexity="advanced", language=["english", "mixed"], function="sum")
+    for case in catalog.iter_select(group="basic"): ...        # 1件ずつ読み出す（大きなコーパス向け）
+
+    python test_catalog.py --corpus test_corpus.jsonl --where complexity=advanced function=sum --limit 10
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import argparse
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Callable, Tuple
+
+# NumPy はコーパスの索引にのみ使うため、CorpusCatalog の作成時に読み込む（起動を遅くしない）
+np = None
+
+# 単一値で索引を作るフィールド
+INDEXED_FIELDS = ["group", "category", "complexity", "language"]
+# expected_functions の各要素で検索するための多値フィールド名
+FUNCTION_FIELD = "function"
+QUERY_FIELDS = ["id"] + INDEXED_FIELDS + [FUNCTION_FIELD]
+
+# test_data.py の多言語グループは language キーを持たないため、グループ名から補う
+LANGUAGE_BY_GROUP = {
+    "japanese_tests": "japanese",
+    "english_tests": "english",
+    "mixed_language_tests": "mixed",
+}
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("numpy is required for indexing generated corpora (pip install numpy)")
+        np = numpy
+
+
+def _as_values(value: Any) -> List[Any]:
+    """クエリ値を候補のリストに正規化（文字列・None は単一値）"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    return [value]
+
+
+def parse_where(conditions: Optional[List[str]]) -> Dict[str, List[str]]:
+    """CLIの FIELD=VALUE[,VALUE...] 形式の条件を select() の引数に変換"""
+    criteria: Dict[str, List[str]] = {}
+    for condition in conditions or []:
+        field, sep, values = condition.partition("=")
+        if not sep or field not in QUERY_FIELDS:
+            raise ValueError(f"Invalid condition '{condition}'. Expected FIELD=VALUE with FIELD in {QUERY_FIELDS}")
+        criteria.setdefault(field, []).extend(v for v in values.split(",") if v)
+    return criteria
+
+
+class TestCatalog:
+    """メモリ上の転置リストによるテストケースカタログ"""
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]]):
+        # loader は (group, test) を返すイテラブルを生成する。読み込みは最初の検索まで遅延する
+        self._loader = loader
+        self._cases: Optional[List[Dict[str, Any]]] = None
+        self._by_id: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[Any, List[int]]] = {}
+
+    @classmethod
+    def from_test_data(cls, groups: Optional[Iterable[str]] = None) -> "TestCatalog":
+        """test_data.ALL_TESTS（groups 指定時はそのグループのみ）のカタログ"""
+        selected = list(groups) if groups is not None else None
+
+        def load():
+            from test_data import ALL_TESTS
+            for group in (selected if selected is not None else ALL_TESTS.keys()):
+                for test in ALL_TESTS.get(group, []):
+                    yield group, test
+
+        return cls(load)
+
+    def _ensure_loaded(self):
+        if self._cases is not None:
+            return
+
+        cases: List[Dict[str, Any]] = []
+        postings: Dict[str, Dict[Any, List[int]]] = {field: {} for field in INDEXED_FIELDS + [FUNCTION_FIELD]}
+
+        for group, test in self._loader():
+            case = dict(test)
+            case.setdefault("group", group)
+            if "language" not in case and group in LANGUAGE_BY_GROUP:
+                case["language"] = LANGUAGE_BY_GROUP[group]
+
+            row = len(cases)
+            cases.append(case)
+            self._by_id.setdefault(case.get("id"), row)
+            for field in INDEXED_FIELDS:
+                postings[field].setdefault(case.get(field), []).append(row)
+            for function in set(case.get("expected_functions") or []):
+                postings[FUNCTION_FIELD].setdefault(function, []).append(row)
+
+        self._postings = postings
+        self._cases = cases
+
+    def _match_rows(self, criteria: Dict[str, Any]) -> List[int]:
+        """条件に一致する行番号（昇順）"""
+        self._ensure_loaded()
+        if not criteria:
+            return list(range(len(self._cases)))
+
+        candidates = []
+        for field, value in criteria.items():
+            values = _as_values(value)
+            if field == "id":
+                rows = {self._by_id[v] for v in values if v in self._by_id}
+            elif field in self._postings:
+                index = self._postings[field]
+                rows = set()
+                for v in values:
+                    rows.update(index.get(v, ()))
+            else:
+                raise ValueError(f"Unknown catalog field '{field}'. Expected one of {QUERY_FIELDS}")
+            candidates.append(rows)
+
+        # 最も小さい候補集合から積集合を取る
+        candidates.sort(key=len)
+        return sorted(candidates[0].intersection(*candidates[1:]))
+
+    def _iter_rows(self, rows: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        for row in rows:
+            yield self._cases[row]
+
+    def _load_rows(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        return list(self._iter_rows(rows))
+
+    def select(self, limit: Optional[int] = None, **criteria: Any) -> List[Dict[str, Any]]:
+        """条件に一致するテストケース（元の順序、最大 limit 件）"""
+        return list(self.iter_select(limit=limit, **criteria))
+
+    def iter_select(self, limit: Optional[int] = None, **criteria: Any) -> Iterator[Dict[str, Any]]:
+        """select と同じ条件で、テストケースを1件ずつ読み出すイテレータ（選択全体をメモリに持たない）"""
+        rows = self._match_rows(criteria)
+        if limit is not None:
+            rows = rows[:limit]
+        return self._iter_rows(rows)
+
+    def count(self, **criteria: Any) -> int:
+        return len(self._match_rows(criteria))
+
+    def get(self, test_id: str) -> Optional[Dict[str, Any]]:
+        """IDでテストケースを取得"""
+        for case in self._load_rows(self._match_rows({"id": test_id})):
+            if case.get("id") == test_id:
+                return case
+        return None
+
+    def group(self, name: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """ALL_TESTS のキーに相当するグループのテストケース"""
+        return self.select(limit=limit, group=name)
+
+    def groups(self) -> List[str]:
+        return list(self.values("group").keys())
+
+    def values(self, field: str) -> Dict[Any, int]:
+        """フィールドの値ごとの件数"""
+        self._ensure_loaded()
+        if field not in self._postings:
+            raise ValueError(f"Unknown catalog field '{field}'. Expected one of {QUERY_FIELDS[1:]}")
+        return {value: len(rows) for value, rows in self._postings[field].items()}
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._cases)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self._ensure_loaded()
+        return iter(self._cases)
+
+
+def _id_hash(test_id: Any) -> int:
+    digest = hashlib.blake2b(str(test_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class CorpusCatalog(TestCatalog):
+    """
+    生成コーパス（JSONL / JSONL.gz）のカタログ。
+
+    索引ディレクトリ構成:
+        <corpus>.index/
+            meta.json         # 件数、各フィールドの辞書、元ファイルのサイズと更新時刻
+            offsets.npy       # 各行の（展開後の）バイトオフセット
+            id_hash.npy       # IDの64bitハッシュ（get 用、読み出し後にIDを照合）
+            <field>.npy       # INDEXED_FIELDS の辞書コード
+            function.npy      # expected_functions のビットマスク（関数は最大64種）
+    """
+
+    def __init__(self, path: str, index_dir: Optional[str] = None):
+        _require_numpy()
+        super().__init__(loader=None)
+        self.path = path
+        self.index_dir = index_dir or f"{path}.index"
+        self._meta: Optional[Dict[str, Any]] = None
+        self._columns: Dict[str, Any] = {}
+        self._codes: Dict[str, Dict[Any, int]] = {}
+
+    def _open(self):
+        return gzip.open(self.path, 'rb') if self.path.endswith(".gz") else open(self.path, 'rb')
+
+    def _source_signature(self) -> Dict[str, Any]:
+        stat = os.stat(self.path)
+        return {"source_size": stat.st_size, "source_mtime": stat.st_mtime}
+
+    def _index_is_fresh(self) -> bool:
+        meta_file = os.path.join(self.index_dir, "meta.json")
+        if not os.path.exists(meta_file):
+            return False
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        signature = self._source_signature()
+        return all(meta.get(key) == value for key, value in signature.items())
+
+    def build_index(self):
+        """コーパスを1回走査して索引ディレクトリを作成"""
+        dictionaries: Dict[str, Dict[Any, int]] = {field: {} for field in INDEXED_FIELDS + [FUNCTION_FIELD]}
+        codes: Dict[str, List[int]] = {field: [] for field in INDEXED_FIELDS}
+        offsets: List[int] = []
+        id_hashes: List[int] = []
+        function_masks: List[int] = []
+
+        def encode(field: str, value: Any) -> int:
+            mapping = dictionaries[field]
+            if value not in mapping:
+                mapping[value] = len(mapping)
+            return mapping[value]
+
+        offset = 0
+        with self._open() as f:
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                case = json.loads(line)
+
+                offsets.append(line_offset)
+                id_hashes.append(_id_hash(case.get("id")))
+                for field in INDEXED_FIELDS:
+                    codes[field].append(encode(field, case.get(field)))
+                mask = 0
+                for function in case.get("expected_functions") or []:
+                    mask |= 1 << encode(FUNCTION_FIELD, function)
+                function_masks.append(mask)
+
+        if len(dictionaries[FUNCTION_FIELD]) > 64:
+            raise ValueError("Corpus index supports at most 64 distinct expected functions")
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        np.save(os.path.join(self.index_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(self.index_dir, "id_hash.npy"), np.asarray(id_hashes, dtype=np.int64))
+        np.save(os.path.join(self.index_dir, f"{FUNCTION_FIELD}.npy"), np.asarray(function_masks, dtype=np.uint64))
+        for field in INDEXED_FIELDS:
+            np.save(os.path.join(self.index_dir, f"{field}.npy"), np.asarray(codes[field], dtype=np.int32))
+
+        meta = {
+            "count": len(offsets),
+            "dictionaries": {field: list(mapping.keys()) for field, mapping in dictionaries.items()},
+        }
+        meta.update(self._source_signature())
+        # meta.json は最後に書き、途中で失敗した索引が新しいものとして扱われないようにする
+        with open(os.path.join(self.index_dir, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def _ensure_loaded(self):
+        if self._meta is not None:
+            return
+        if not self._index_is_fresh():
+            print(f"🔧 Building catalog index for {self.path}...")
+            self.build_index()
+
+        with open(os.path.join(self.index_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        for name in ["offsets", "id_hash", FUNCTION_FIELD] + INDEXED_FIELDS:
+            self._columns[name] = np.load(os.path.join(self.index_dir, f"{name}.npy"), mmap_mode='r')
+        self._codes = {field: {value: code for code, value in enumerate(values)}
+                       for field, values in meta["dictionaries"].items()}
+        self._meta = meta
+
+    def _match_rows(self, criteria: Dict[str, Any]):
+        self._ensure_loaded()
+        count = self._meta["count"]
+        if not criteria:
+            return np.arange(count)
+
+        mask = np.ones(count, dtype=np.bool_)
+        for field, value in criteria.items():
+            values = _as_values(value)
+            if field == "id":
+                mask &= np.isin(self._columns["id_hash"], [_id_hash(v) for v in values])
+            elif field == FUNCTION_FIELD:
+                bits = 0
+                for v in values:
+                    if v in self._codes[FUNCTION_FIELD]:
+                        bits |= 1 << self._codes[FUNCTION_FIELD][v]
+                mask &= (self._columns[FUNCTION_FIELD] & np.uint64(bits)) != 0
+            elif field in INDEXED_FIELDS:
+                wanted = [self._codes[field][v] for v in values if v in self._codes[field]]
+                mask &= np.isin(self._columns[field], wanted)
+            else:
+                raise ValueError(f"Unknown catalog field '{field}'. Expected one of {QUERY_FIELDS}")
+        return np.flatnonzero(mask)
+
+    def _iter_rows(self, rows: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        """選択された行だけをオフセットから読み出す（昇順に読むため .gz でも前方シークのみ）"""
+        offsets = self._columns["offsets"]
+        with self._open() as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                yield json.loads(f.readline())
+
+    def values(self, field: str) -> Dict[Any, int]:
+        self._ensure_loaded()
+        if field == FUNCTION_FIELD:
+            masks = self._columns[FUNCTION_FIELD]
+            return {value: int(np.count_nonzero(masks & np.uint64(1 << code)))
+                    for value, code in self._codes[FUNCTION_FIELD].items()}
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Unknown catalog field '{field}'. Expected one of {QUERY_FIELDS[1:]}")
+        counts = np.bincount(self._columns[field], minlength=len(self._codes[field]))
+        return {value: int(counts[code]) for value, code in self._codes[field].items()}
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return self._meta["count"]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        from test_generator import iter_corpus
+        return iter_corpus(self.path)
+
+
+def load_catalog(corpus: Optional[str] = None, groups: Optional[Iterable[str]] = None) -> TestCatalog:
+    """corpus 指定時は生成コーパス、それ以外は test_data.py のカタログを返す"""
+    if corpus:
+        return CorpusCatalog(corpus)
+    return TestCatalog.from_test_data(groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the test case catalog")
+
+    parser.add_argument("--corpus", type=str, help="Generated corpus file (default: test_data.py)")
+    parser.add_argument("--where", nargs="*", metavar="FIELD=VALUE",
+                       help=f"Conditions (AND across fields, comma-separated values are OR). Fields: {QUERY_FIELDS}")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of cases to print")
+    parser.add_argument("--values", type=str, metavar="FIELD", help="Show value counts of a field")
+    parser.add_argument("--build-index", action="store_true", help="(Re)build the corpus index and exit")
+
+    args = parser.parse_args()
+
+    try:
+        catalog = load_catalog(args.corpus)
+
+        if args.build_index:
+            if not isinstance(catalog, CorpusCatalog):
+                print("❌ --build-index requires --corpus")
+                return 1
+            catalog.build_index()
+            print(f"📁 Index written to {catalog.index_dir}")
+            return 0
+
+        if args.values:
+            for value, count in sorted(catalog.values(args.values).items(), key=lambda item: -item[1]):
+                print(f"{str(value):<30} {count:>10}")
+            return 0
+
+        criteria = parse_where(args.where)
+        total = catalog.count(**criteria)
+        for case in catalog.select(limit=args.limit, **criteria):
+            print(f"{case.get('id', 'unknown')}: {case.get('prompt', '')[:80]}")
+        print(f"\n{total} matching cases ({len(catalog)} total)")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Catalog query failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
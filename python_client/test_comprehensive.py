@@ -18,6 +18,15 @@ LangChain関数呼び出し評価のための包括的テストスイート
     python test_comprehensive.py --category basic         # 特定カテゴリ
     python test_comprehensive.py --max-tests 20          # テスト数制限
     python test_comprehensive.py --report-html           # HTMLレポート生成
+    python test_comprehensive.py --all --output results.jsonl  # 1行1結果のJSONL出力（ストリーミングレポート用）
+    python test_comprehensive.py --all --store results_store   # 列指向ストアへ保存（複数実行の横断集計用）
+    python test_comprehensive.py --corpus test_corpus.jsonl --scalability --max-tests 1000  # 生成コーパスを使用
+    python test_comprehensive.py --where complexity=advanced language=english,mixed   # 複合条件で選択
+    python test_comprehensive.py --quick --record-cassette cassettes/quick.jsonl   # LLM・ツール通信を記録
+    python test_comprehensive.py --quick --replay-cassette cassettes/quick.jsonl   # 記録した通信で再生（ネットワーク不要）
+    python test_comprehensive.py --quick --llm-cache .llm_cache                    # 同一のチャット補完をディスクキャッシュから応答
+    python test_comprehensive.py --quick --trajectory-cache .trajectory_cache      # 同一プロンプトはツールのみ再実行（LLM不要）
+    python test_comprehensive.py --quick --tool-retries 3 --circuit-breaker 5        # ツール呼び出しのリトライ・即時失敗
 """
 
 import argparse
@@ -26,14 +35,19 @@ import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from test_data import ALL_TESTS, get_test_statistics
-from test_utils import TestExecutor, TestSession, save_test_results, print_test_summary
+from test_data import get_test_statistics
+from test_catalog import TestCatalog, load_catalog, parse_where
+from test_utils import (
+    TestExecutor, TestSession, save_test_results, save_test_results_jsonl, print_test_summary,
+    add_runtime_arguments, apply_runtime_arguments, print_runtime_stats
+)
 
 class ComprehensiveTestRunner:
     """包括的評価のためのメインテストランナー"""
     
-    def __init__(self):
+    def __init__(self, catalog: Optional[TestCatalog] = None):
         self.executor = TestExecutor()
+        self.catalog = catalog or load_catalog()
         self.results: Dict[str, TestSession] = {}
         
     def run_perspective_tests(self, perspective_name: str, tests: List[Dict[str, Any]], 
@@ -62,10 +76,10 @@ class ComprehensiveTestRunner:
         complexity_results = {}
         
         complexity_levels = {
-            "basic": ALL_TESTS["basic"],
-            "intermediate": ALL_TESTS["intermediate"],
-            "advanced": ALL_TESTS["advanced"],
-            "expert": ALL_TESTS["expert"]
+            "basic": self.catalog.group("basic", max_tests_per_level),
+            "intermediate": self.catalog.group("intermediate", max_tests_per_level),
+            "advanced": self.catalog.group("advanced", max_tests_per_level),
+            "expert": self.catalog.group("expert", max_tests_per_level)
         }
         
         for level, tests in complexity_levels.items():
@@ -79,11 +93,11 @@ class ComprehensiveTestRunner:
         ambiguity_results = {}
         
         # Clear prompts
-        clear_session = self.run_perspective_tests("clear_prompts", ALL_TESTS["clear_prompts"], max_tests)
+        clear_session = self.run_perspective_tests("clear_prompts", self.catalog.group("clear_prompts", max_tests), max_tests)
         ambiguity_results["clear"] = clear_session
         
         # Ambiguous prompts  
-        ambiguous_session = self.run_perspective_tests("ambiguous_prompts", ALL_TESTS["ambiguous_prompts"], max_tests)
+        ambiguous_session = self.run_perspective_tests("ambiguous_prompts", self.catalog.group("ambiguous_prompts", max_tests), max_tests)
         ambiguity_results["ambiguous"] = ambiguous_session
         
         return ambiguity_results
@@ -93,11 +107,11 @@ class ComprehensiveTestRunner:
         context_results = {}
         
         # Sequential operations
-        sequential_session = self.run_perspective_tests("sequential_operations", ALL_TESTS["sequential_operations"], max_tests)
+        sequential_session = self.run_perspective_tests("sequential_operations", self.catalog.group("sequential_operations", max_tests), max_tests)
         context_results["sequential"] = sequential_session
         
         # Conditional operations
-        conditional_session = self.run_perspective_tests("conditional_operations", ALL_TESTS["conditional_operations"], max_tests)
+        conditional_session = self.run_perspective_tests("conditional_operations", self.catalog.group("conditional_operations", max_tests), max_tests)
         context_results["conditional"] = conditional_session
         
         return context_results
@@ -107,11 +121,11 @@ class ComprehensiveTestRunner:
         error_results = {}
         
         # Invalid input tests
-        invalid_session = self.run_perspective_tests("invalid_input_tests", ALL_TESTS["invalid_input_tests"], max_tests)
+        invalid_session = self.run_perspective_tests("invalid_input_tests", self.catalog.group("invalid_input_tests", max_tests), max_tests)
         error_results["invalid_input"] = invalid_session
         
         # Edge case tests
-        edge_session = self.run_perspective_tests("edge_case_tests", ALL_TESTS["edge_case_tests"], max_tests)
+        edge_session = self.run_perspective_tests("edge_case_tests", self.catalog.group("edge_case_tests", max_tests), max_tests)
         error_results["edge_cases"] = edge_session
         
         return error_results
@@ -121,11 +135,11 @@ class ComprehensiveTestRunner:
         scalability_results = {}
         
         # Large number tests
-        large_session = self.run_perspective_tests("large_number_tests", ALL_TESTS["large_number_tests"], max_tests)
+        large_session = self.run_perspective_tests("large_number_tests", self.catalog.group("large_number_tests", max_tests), max_tests)
         scalability_results["large_numbers"] = large_session
         
         # Multiple operations tests
-        multi_session = self.run_perspective_tests("multiple_operations_tests", ALL_TESTS["multiple_operations_tests"], max_tests)
+        multi_session = self.run_perspective_tests("multiple_operations_tests", self.catalog.group("multiple_operations_tests", max_tests), max_tests)
         scalability_results["multiple_operations"] = multi_session
         
         return scalability_results
@@ -135,15 +149,15 @@ class ComprehensiveTestRunner:
         multilingual_results = {}
         
         # Japanese tests
-        japanese_session = self.run_perspective_tests("japanese_tests", ALL_TESTS["japanese_tests"], max_tests)
+        japanese_session = self.run_perspective_tests("japanese_tests", self.catalog.group("japanese_tests", max_tests), max_tests)
         multilingual_results["japanese"] = japanese_session
         
         # English tests
-        english_session = self.run_perspective_tests("english_tests", ALL_TESTS["english_tests"], max_tests)
+        english_session = self.run_perspective_tests("english_tests", self.catalog.group("english_tests", max_tests), max_tests)
         multilingual_results["english"] = english_session
         
         # Mixed language tests
-        mixed_session = self.run_perspective_tests("mixed_language_tests", ALL_TESTS["mixed_language_tests"], max_tests)
+        mixed_session = self.run_perspective_tests("mixed_language_tests", self.catalog.group("mixed_language_tests", max_tests), max_tests)
         multilingual_results["mixed"] = mixed_session
         
         return multilingual_results
@@ -153,11 +167,11 @@ class ComprehensiveTestRunner:
         accuracy_results = {}
         
         # Precision tests
-        precision_session = self.run_perspective_tests("precision_tests", ALL_TESTS["precision_tests"], max_tests)
+        precision_session = self.run_perspective_tests("precision_tests", self.catalog.group("precision_tests", max_tests), max_tests)
         accuracy_results["precision"] = precision_session
         
         # Verification tests
-        verification_session = self.run_perspective_tests("verification_tests", ALL_TESTS["verification_tests"], max_tests)
+        verification_session = self.run_perspective_tests("verification_tests", self.catalog.group("verification_tests", max_tests), max_tests)
         accuracy_results["verification"] = verification_session
         
         return accuracy_results
@@ -215,10 +229,10 @@ class ComprehensiveTestRunner:
         
         # Select a few tests from each category
         quick_tests = {
-            "basic_sample": ALL_TESTS["basic"][:2],
-            "intermediate_sample": ALL_TESTS["intermediate"][:2],
-            "error_sample": ALL_TESTS["invalid_input_tests"][:1],
-            "multilingual_sample": ALL_TESTS["japanese_tests"][:1]
+            "basic_sample": self.catalog.group("basic", 2),
+            "intermediate_sample": self.catalog.group("intermediate", 2),
+            "error_sample": self.catalog.group("invalid_input_tests", 1),
+            "multilingual_sample": self.catalog.group("japanese_tests", 1)
         }
         
         for category, tests in quick_tests.items():
@@ -313,11 +327,18 @@ def main():
     
     parser.add_argument("--category", type=str, help="Run specific test category")
     parser.add_argument("--max-tests", type=int, help="Maximum number of tests per perspective")
+    parser.add_argument("--corpus", type=str, help="Load tests from a generated corpus instead of test_data.py")
+    parser.add_argument("--where", nargs="+", metavar="FIELD=VALUE",
+                       help="Run tests matching all conditions (comma-separated values match any)")
     
     # Output arguments
     parser.add_argument("--output", type=str, default="test_results.json", help="Output file for results")
     parser.add_argument("--report", type=str, help="Generate text report file")
     parser.add_argument("--report-html", action="store_true", help="Generate HTML report")
+    parser.add_argument("--store", type=str, metavar="DIR", help="Also export results to a columnar results store")
+    
+    # Record/replay, caching and tool transport arguments
+    add_runtime_arguments(parser)
     
     # Debugging arguments
     parser.add_argument("--verbose", action="store_true", help="Verbose output")
@@ -334,7 +355,9 @@ def main():
         print(f"Categories: {list(stats['by_category'].keys())}")
         return
         
-    runner = ComprehensiveTestRunner()
+    apply_runtime_arguments(args)
+        
+    runner = ComprehensiveTestRunner(load_catalog(args.corpus) if args.corpus else None)
     results = {}
     
     try:
@@ -357,13 +380,17 @@ def main():
         elif args.accuracy:
             results["accuracy"] = runner.run_accuracy_tests(args.max_tests)
         elif args.category:
-            if args.category in ALL_TESTS:
-                session = runner.run_perspective_tests(args.category, ALL_TESTS[args.category], args.max_tests)
+            if args.category in runner.catalog.groups():
+                session = runner.run_perspective_tests(args.category, runner.catalog.group(args.category, args.max_tests),
+                                                       args.max_tests)
                 results[args.category] = session
             else:
                 print(f"Error: Unknown category '{args.category}'")
-                print(f"Available categories: {list(ALL_TESTS.keys())}")
+                print(f"Available categories: {runner.catalog.groups()}")
                 return 1
+        elif args.where:
+            tests = runner.catalog.select(limit=args.max_tests, **parse_where(args.where))
+            results["selection"] = runner.run_perspective_tests("selection", tests, args.max_tests)
         else:
             # Default to quick test
             results = runner.run_quick_test()
@@ -371,9 +398,19 @@ def main():
         # Generate summary report
         summary = runner.generate_summary_report(results)
         print(f"\n{summary}")
+        print_runtime_stats(args)
         
         # Save results
-        if args.output:
+        if args.output and args.output.endswith(".jsonl"):
+            open(args.output, 'w').close()
+            for key, value in results.items():
+                if isinstance(value, dict):
+                    for sub_name, session in value.items():
+                        save_test_results_jsonl(session, args.output, key, sub_name)
+                else:
+                    save_test_results_jsonl(value, args.output, key)
+            print(f"📁 Results saved to {args.output}")
+        elif args.output:
             # Convert results to serializable format
             serializable_results = {}
             for key, value in results.items():
@@ -391,6 +428,12 @@ def main():
                 }, f, ensure_ascii=False, indent=2)
             print(f"📁 Results saved to {args.output}")
             
+        # Export to columnar store
+        if args.store:
+            from results_store import ColumnarResultsStore
+            run_id = ColumnarResultsStore(args.store).write_sessions(results)
+            print(f"🗄️  Results exported to {args.store} (run '{run_id}')")
+            
         # Generate text report
         if args.report:
             with open(args.report, 'w', encoding='utf-8') as f:
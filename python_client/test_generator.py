@@ -0,0 +1,341 @@
+"""
+合成テストケースジェネレーター
+
+カテゴリごとのテンプレートを日本語・英語・混合の3言語で展開し、数千〜数百万件のテストケースを生成する。
+期待値は math_reference（C# MathFunctions と同じ意味論の参照実装）で計算するため、手書きの期待値は不要。
+生成結果は1行1ケースのJSONL（拡張子 .gz でgzip圧縮）のコーパスとして保存し、
+ベンチマークや TestExecutor.run_test_suite から逐次読み込みできる。
+
+生成されるケースは test_data.py と同じキー (id, prompt, expected_functions, expected_result,
+complexity, category) に加え、group（ALL_TESTS のキーに相当）、language、input_values を持つ。
+
+使用方法:
+    python test_generator.py --count 100000 --output corpus.jsonl.gz
+    python test_generator.py --count 1000000 --groups large_number_tests multiple_operations_tests --seed 7
+    python test_generator.py --count 10 --languages en --print       # 標準出力に表示
+"""
+
+import gzip
+import json
+import random
+import argparse
+from itertools import islice
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Callable
+
+import math_reference as ref
+
+LANGUAGES = ["japanese", "english", "mixed"]
+
+# 素因数分解の期待値計算を軽く保つため、大きな数は小さな素数の積として作る
+SMALL_PRIMES = [p for p in range(2, 1000) if ref.is_prime(p)]
+
+
+def _smooth_number(rng: random.Random, upper: int, max_prime: int = 997) -> int:
+    """upper 以下で、全ての素因数が max_prime 以下になる数"""
+    primes = [p for p in SMALL_PRIMES if p <= max_prime]
+    n = rng.choice(primes)
+    while True:
+        p = rng.choice(primes)
+        if n * p > upper:
+            return n
+        n *= p
+
+
+def _random_list(rng: random.Random, size: int, low: int = 1, high: int = 100) -> List[int]:
+    return [rng.randint(low, high) for _ in range(size)]
+
+
+class CaseTemplate:
+    """1種類のテストケースのテンプレート（引数の生成、言語別プロンプト、期待値の計算）"""
+
+    def __init__(self, name: str, group: str, complexity: str, category: str,
+                 functions: List[str], sample: Callable[[random.Random], Dict[str, Any]],
+                 prompts: Dict[str, str], expected: Callable[[Dict[str, Any]], Any]):
+        self.name = name
+        self.group = group
+        self.complexity = complexity
+        self.category = category
+        self.functions = functions
+        self.sample = sample
+        self.prompts = prompts
+        self.expected = expected
+
+    def build(self, rng: random.Random, language: str, case_id: str) -> Dict[str, Any]:
+        params = self.sample(rng)
+        case = {
+            "id": case_id,
+            "prompt": self.prompts[language].format(**params),
+            "expected_functions": list(self.functions),
+            "complexity": self.complexity,
+            "category": self.category,
+            "group": self.group,
+            "language": language,
+            "input_values": params,
+        }
+        try:
+            case["expected_result"] = self.expected(params)
+        except ValueError as e:
+            # 参照実装がエラーになるケースは INVALID_INPUT_TESTS と同じ形式で期待エラーを記録
+            case["expected_error"] = "ArgumentException"
+            case["expected_message"] = str(e).replace("Function execution error: ", "")
+        return case
+
+
+def _factor_sum(n: int) -> int:
+    return ref.compute("sum", numbers=ref.compute("prime_factorization", number=n))
+
+
+def _batch_statistics(numbers: List[int]) -> Dict[str, Any]:
+    sums = [_factor_sum(n) for n in numbers]
+    return {
+        "max": ref.compute("max", numbers=sums),
+        "min": ref.compute("min", numbers=sums),
+        "average": ref.compute("average", numbers=sums),
+    }
+
+
+def _int_result(value: str) -> int:
+    """factorial は文字列で返るため、test_data.py と同じく整数の期待値に変換"""
+    return int(value)
+
+
+DEFAULT_TEMPLATES: List[CaseTemplate] = [
+    # 1. 複雑度レベル
+    CaseTemplate(
+        "prime_factorization", "basic", "basic", "single_function", ["prime_factorization"],
+        lambda rng: {"n": rng.randint(2, 10000)},
+        {"japanese": "{n}を素因数分解してください",
+         "english": "Find the prime factorization of {n}",
+         "mixed": "{n} の prime factorization を求めてください"},
+        lambda p: ref.compute("prime_factorization", number=p["n"])),
+    CaseTemplate(
+        "sum", "basic", "basic", "single_function", ["sum"],
+        lambda rng: {"numbers": _random_list(rng, rng.randint(2, 8))},
+        {"japanese": "{numbers}の合計を計算してください",
+         "english": "Calculate the sum of {numbers}",
+         "mixed": "{numbers} の sum を計算してください"},
+        lambda p: ref.compute("sum", numbers=p["numbers"])),
+    CaseTemplate(
+        "is_prime", "basic", "basic", "single_function", ["is_prime"],
+        lambda rng: {"n": rng.randint(2, 100000)},
+        {"japanese": "{n}は素数ですか？",
+         "english": "Is {n} a prime number?",
+         "mixed": "{n} は prime number ですか？"},
+        lambda p: ref.compute("is_prime", number=p["n"])),
+    CaseTemplate(
+        "factorial", "basic", "basic", "single_function", ["factorial"],
+        lambda rng: {"n": rng.randint(0, 20)},
+        {"japanese": "{n}の階乗を計算してください",
+         "english": "Calculate the factorial of {n}",
+         "mixed": "{n} の factorial を計算してください"},
+        lambda p: _int_result(ref.compute("factorial", n=p["n"]))),
+    CaseTemplate(
+        "square_root", "basic", "basic", "single_function", ["square_root"],
+        lambda rng: {"n": rng.randint(1, 1000) ** 2},
+        {"japanese": "{n}の平方根を求めてください",
+         "english": "What is the square root of {n}?",
+         "mixed": "{n} の square root を求めてください"},
+        lambda p: ref.compute("square_root", number=p["n"])),
+    CaseTemplate(
+        "power", "basic", "basic", "single_function", ["power"],
+        lambda rng: {"base": rng.randint(2, 12), "exponent": rng.randint(2, 10)},
+        {"japanese": "{base}の{exponent}乗を計算してください",
+         "english": "Calculate {base} to the power of {exponent}",
+         "mixed": "{base} の {exponent} 乗 (power) を計算してください"},
+        lambda p: ref.compute("power", base=p["base"], exponent=p["exponent"])),
+    CaseTemplate(
+        "modulo", "basic", "basic", "single_function", ["modulo"],
+        lambda rng: {"a": rng.randint(1, 100000), "b": rng.randint(2, 97)},
+        {"japanese": "{a}を{b}で割った余りを求めてください",
+         "english": "What is {a} modulo {b}?",
+         "mixed": "{a} mod {b} の余りを求めてください"},
+        lambda p: ref.compute("modulo", dividend=p["a"], divisor=p["b"])),
+    CaseTemplate(
+        "factor_sum", "intermediate", "intermediate", "two_step_sequential", ["prime_factorization", "sum"],
+        lambda rng: {"n": rng.randint(4, 10000)},
+        {"japanese": "{n}を素因数分解し、その因数の総和を返してください",
+         "english": "Factorize {n} into primes and return the sum of the factors",
+         "mixed": "{n} を prime factorization して、factors の sum を返してください"},
+        lambda p: _factor_sum(p["n"])),
+    CaseTemplate(
+        "gcd_lcm", "intermediate", "intermediate", "parallel_operations", ["gcd", "lcm"],
+        lambda rng: {"a": rng.randint(2, 500), "b": rng.randint(2, 500)},
+        {"japanese": "{a}と{b}の最大公約数と最小公倍数を求めてください",
+         "english": "Find the greatest common divisor and least common multiple of {a} and {b}",
+         "mixed": "{a} と {b} の GCD と LCM を求めてください"},
+        lambda p: {"gcd": ref.compute("gcd", a=p["a"], b=p["b"]),
+                   "lcm": ref.compute("lcm", a=p["a"], b=p["b"])}),
+    CaseTemplate(
+        "power_is_prime", "intermediate", "intermediate", "conditional_check", ["power", "is_prime"],
+        lambda rng: {"base": rng.randint(2, 9), "exponent": rng.randint(1, 8)},
+        {"japanese": "{base}の{exponent}乗を計算し、その結果が素数かどうか判定してください",
+         "english": "Compute {base} to the power of {exponent} and check whether the result is prime",
+         "mixed": "{base} の {exponent} 乗を計算して、それが prime かどうか check してください"},
+        lambda p: {"power": ref.compute("power", base=p["base"], exponent=p["exponent"]),
+                   "is_prime": ref.compute("is_prime", number=int(p["base"] ** p["exponent"]))}),
+    CaseTemplate(
+        "factor_sum_is_prime", "advanced", "advanced", "three_step_chain",
+        ["prime_factorization", "sum", "is_prime"],
+        lambda rng: {"n": rng.randint(4, 10000)},
+        {"japanese": "{n}を素因数分解し、因数の合計を求め、その合計が素数かどうか判定してください",
+         "english": "Factorize {n}, add up its prime factors, and tell me whether that sum is prime",
+         "mixed": "{n} を素因数分解して factors を sum し、その結果が prime か判定してください"},
+        lambda p: ref.compute("is_prime", number=_factor_sum(p["n"]))),
+    CaseTemplate(
+        "list_statistics", "advanced", "advanced", "statistical_analysis", ["max", "min", "average"],
+        lambda rng: {"numbers": _random_list(rng, rng.randint(3, 10), 1, 1000)},
+        {"japanese": "{numbers}の最大値、最小値、平均値を求めてください",
+         "english": "Find the maximum, minimum and average of {numbers}",
+         "mixed": "{numbers} の max、min、average を求めてください"},
+        lambda p: {"max": ref.compute("max", numbers=p["numbers"]),
+                   "min": ref.compute("min", numbers=p["numbers"]),
+                   "average": ref.compute("average", numbers=p["numbers"])}),
+
+    # 4. エラーハンドリング
+    CaseTemplate(
+        "negative_factorial", "invalid_input_tests", "basic", "negative_input_error", ["factorial"],
+        lambda rng: {"n": -rng.randint(1, 100)},
+        {"japanese": "負の数 {n} の階乗を計算してください",
+         "english": "Calculate the factorial of the negative number {n}",
+         "mixed": "負の数 {n} の factorial を計算してください"},
+        lambda p: ref.compute("factorial", n=p["n"])),
+    CaseTemplate(
+        "division_by_zero", "invalid_input_tests", "basic", "division_by_zero", ["divide"],
+        lambda rng: {"a": rng.randint(1, 1000)},
+        {"japanese": "0で割り算をしてください: {a} ÷ 0",
+         "english": "Divide {a} by 0",
+         "mixed": "{a} を 0 で divide してください"},
+        lambda p: ref.compute("divide", dividend=p["a"], divisor=0)),
+    CaseTemplate(
+        "negative_sqrt", "invalid_input_tests", "basic", "invalid_sqrt", ["square_root"],
+        lambda rng: {"n": -rng.randint(1, 10000)},
+        {"japanese": "負の数 {n} の平方根を計算してください",
+         "english": "Calculate the square root of {n}",
+         "mixed": "負の数 {n} の square root を計算してください"},
+        lambda p: ref.compute("square_root", number=p["n"])),
+
+    # 5. スケーラビリティ
+    CaseTemplate(
+        "large_prime_factorization", "large_number_tests", "advanced", "large_input", ["prime_factorization"],
+        lambda rng: {"n": _smooth_number(rng, ref.INT32_MAX)},
+        {"japanese": "{n}を素因数分解してください",
+         "english": "Find the prime factorization of {n}",
+         "mixed": "Large number {n} を prime factorization してください"},
+        lambda p: ref.compute("prime_factorization", number=p["n"])),
+    CaseTemplate(
+        "range_sum", "large_number_tests", "intermediate", "large_range", ["sum"],
+        lambda rng: {"n": rng.randint(100, 60000)},
+        {"japanese": "1から{n}までの数の合計を計算してください",
+         "english": "Calculate the sum of all integers from 1 to {n}",
+         "mixed": "1 から {n} までの numbers の sum を計算してください"},
+        lambda p: ref.sum_(range(1, p["n"] + 1))),
+    CaseTemplate(
+        "large_factorial", "large_number_tests", "advanced", "boundary_performance", ["factorial"],
+        lambda rng: {"n": rng.randint(21, 300)},
+        {"japanese": "{n}の階乗を計算してください",
+         "english": "Calculate the factorial of {n}",
+         "mixed": "{n} の factorial を計算してください"},
+        lambda p: _int_result(ref.compute("factorial", n=p["n"]))),
+    CaseTemplate(
+        "batch_factor_statistics", "multiple_operations_tests", "expert", "batch_processing",
+        ["prime_factorization", "sum", "max", "min", "average"],
+        lambda rng: {"numbers": _random_list(rng, rng.randint(5, 20), 4, 10000)},
+        {"japanese": "次の数を処理してください: {numbers} - 各数を素因数分解し、それぞれの因数の合計を求め、"
+                     "全体の統計（最大、最小、平均）を出してください",
+         "english": "Process these numbers: {numbers} - factorize each one, sum its prime factors, "
+                    "and report the maximum, minimum and average of those sums",
+         "mixed": "Numbers {numbers} をそれぞれ prime factorization して factors の sum を求め、"
+                  "max / min / average を出してください"},
+        lambda p: _batch_statistics(p["numbers"])),
+]
+
+
+class TestCaseGenerator:
+    """テンプレートを決定的な乱数で展開し、テストケースを逐次生成する"""
+
+    def __init__(self, seed: int = 0, templates: Optional[List[CaseTemplate]] = None,
+                 languages: Optional[List[str]] = None):
+        self.seed = seed
+        self.templates = templates if templates is not None else DEFAULT_TEMPLATES
+        self.languages = languages or LANGUAGES
+
+    def generate(self, count: int, groups: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """count 件のケースを生成（テンプレート × 言語を巡回、同じ seed なら同じ結果）"""
+        templates = self.templates
+        if groups:
+            groups = set(groups)
+            templates = [t for t in templates if t.group in groups]
+        if not templates:
+            raise ValueError("No templates match the requested groups")
+
+        rng = random.Random(self.seed)
+        variants = [(t, lang) for t in templates for lang in self.languages]
+        for index in range(count):
+            template, language = variants[index % len(variants)]
+            yield template.build(rng, language, f"gen_{template.name}_{index:08d}")
+
+
+def write_corpus(cases: Iterable[Dict[str, Any]], path: str) -> int:
+    """ケースをJSONLコーパスとして書き出し、件数を返す（.gz なら圧縮）"""
+    opener = gzip.open if path.endswith(".gz") else open
+    count = 0
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for case in cases:
+            f.write(json.dumps(case, ensure_ascii=False, separators=(',', ':')))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def iter_corpus(path: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """コーパスを1件ずつ読み出す（メモリ使用量は件数に依存しない）"""
+    opener = gzip.open if path.endswith(".gz") else open
+
+    def cases():
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return islice(cases(), limit) if limit is not None else cases()
+
+
+def load_corpus(path: str, limit: int) -> List[Dict[str, Any]]:
+    """先頭 limit 件をリストとして読み込む（ベンチマークのようにインデックスで巡回する用途向け）"""
+    return list(iter_corpus(path, limit))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic test cases with reference results")
+
+    parser.add_argument("--count", type=int, default=1000, help="Number of cases to generate")
+    parser.add_argument("--output", type=str, default="test_corpus.jsonl.gz",
+                       help="Corpus file (.jsonl, or .jsonl.gz for gzip)")
+    parser.add_argument("--groups", nargs="+", help="Only expand templates of these groups")
+    parser.add_argument("--languages", nargs="+", choices=LANGUAGES, help="Prompt languages")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--print", action="store_true", help="Print cases to stdout instead of writing a corpus")
+
+    args = parser.parse_args()
+
+    try:
+        generator = TestCaseGenerator(seed=args.seed, languages=args.languages)
+        cases = generator.generate(args.count, args.groups)
+
+        if args.print:
+            for case in cases:
+                print(json.dumps(case, ensure_ascii=False))
+            return 0
+
+        count = write_corpus(cases, args.output)
+        print(f"📁 {count} test cases written to {args.output}")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Test case generation failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
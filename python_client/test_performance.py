@@ -12,9 +12,21 @@ LangChain関数呼び出しシステムのためのパフォーマンスベン
 使用方法:
     python test_performance.py --benchmark-basic        # 基本パフォーマンステスト
     python test_performance.py --benchmark-stress       # ストレステスト
-    python test_performance.py --benchmark-memory       # メモリ使用量分析
+    python test_performance.py --benchmark-memory       # メモリ使用量分析（tracemalloc 割り当て追跡付き）
     python test_performance.py --benchmark-all          # 全パフォーマンステスト
     python test_performance.py --load-test 100          # N回リクエストの負荷テスト
+    python test_performance.py --benchmark-parallel-tools  # 逐次/並行ツール呼び出しのモデルターン数と実行時間を比較
+    python test_performance.py --benchmark-map-tool     # map ツールなし/ありのモデルターン数と実行時間を比較（advanced/expert）
+    python test_performance.py --benchmark-compose-tool  # compose ツールなし/ありで比較（依存チェーンのプロンプト）
+    python test_performance.py --benchmark-tool-descriptions compact minimal   # ツール説明の短縮版を A/B 比較
+    python test_performance.py --benchmark-tool-subsetting  # 全ツール/プロンプトごとに選んだツールを A/B 比較
+    python test_performance.py --benchmark-basic --profile  # プロファイル付き実行（フレームグラフ出力）
+    python test_performance.py --benchmark-basic --store results_store  # 列指向ストアへ生データを保存
+    python test_performance.py --benchmark-stress --corpus test_corpus.jsonl.gz --corpus-size 5000  # 生成コーパスを使用
+    python test_performance.py --benchmark-basic --replay-cassette cassettes/basic.jsonl --profile  # 記録した通信でPython側のみ計測
+    python test_performance.py --benchmark-basic --llm-cache .llm_cache   # 同一のチャット補完はディスクキャッシュから応答
+    python test_performance.py --benchmark-basic --trajectory-cache .trajectory_cache  # 同一プロンプトはツールのみ再実行
+    python test_performance.py --benchmark-basic --tool-retries 3 --circuit-breaker 5 --hedge-percentile 95  # ツール呼び出しの耐障害性
 """
 
 import time
@@ -28,15 +40,29 @@ import json
 from datetime import datetime
 import argparse
 import sys
+from contextlib import nullcontext
 
-from test_utils import TestExecutor, TestResult
-from test_data import BASIC_TESTS, INTERMEDIATE_TESTS
+from test_utils import (
+    TestExecutor, TestResult, add_runtime_arguments, apply_runtime_arguments, print_runtime_stats
+)
+from benchmark_profiler import (
+    BenchmarkProfiler, AllocationTracker, print_hot_functions, print_allocation_report
+)
+from test_data import (
+    BASIC_TESTS, INTERMEDIATE_TESTS, ADVANCED_TESTS, EXPERT_TESTS, MULTIPLE_OPERATIONS_TESTS,
+    SEQUENTIAL_OPERATIONS, VERIFICATION_TESTS
+)
+from usage_accounting import USAGE_FIELDS, new_usage_totals, add_usage, finalize_usage
 
 class PerformanceMetrics:
     """パフォーマンス測定データのコンテナ"""
     
     def __init__(self):
         self.response_times: List[float] = []
+        self.first_token_times: List[float] = []
+        self.first_tool_call_times: List[float] = []
+        self.usage: Dict[str, Any] = new_usage_totals()
+        self.coalesced_tool_calls: int = 0
         self.memory_usage: List[float] = []
         self.cpu_usage: List[float] = []
         self.success_count: int = 0
@@ -45,11 +71,24 @@ class PerformanceMetrics:
         self.end_time: float = 0
         self.peak_memory: float = 0
         self.avg_cpu: float = 0
+        self.profile: Optional[Dict[str, Any]] = None
+        self.allocations: Optional[Dict[str, Any]] = None
         
     def add_response_time(self, response_time: float):
         """Add a response time measurement"""
         self.response_times.append(response_time)
         
+    def add_latency_markers(self, time_to_first_token: Optional[float], time_to_first_tool_call: Optional[float]):
+        """Add time-to-first-token / time-to-first-tool-call measurements (None when not observed)"""
+        if time_to_first_token is not None:
+            self.first_token_times.append(time_to_first_token)
+        if time_to_first_tool_call is not None:
+            self.first_tool_call_times.append(time_to_first_tool_call)
+        
+    def add_usage(self, record: Dict[str, Any]):
+        """Add the token counts and /execute payload sizes of one request (fields of TestResult.to_dict())"""
+        add_usage(self.usage, record)
+        
     def add_system_metrics(self, memory_mb: float, cpu_percent: float):
         """Add system resource usage metrics"""
         self.memory_usage.append(memory_mb)
@@ -104,8 +143,32 @@ class PerformanceMetrics:
             }
         }
         
+        if self.first_token_times:
+            stats["time_to_first_token"] = self._summarize(self.first_token_times)
+        if self.first_tool_call_times:
+            stats["time_to_first_tool_call"] = self._summarize(self.first_tool_call_times)
+        if self.usage["tests"]:
+            stats["usage"] = finalize_usage(self.usage)
+        if self.coalesced_tool_calls:
+            stats["coalesced_tool_calls"] = self.coalesced_tool_calls
+        if self.profile:
+            stats["profile"] = self.profile
+        if self.allocations:
+            stats["allocations"] = self.allocations
+            
         return stats
         
+    def _summarize(self, data: List[float]) -> Dict[str, float]:
+        """Min/mean/median/percentiles of a latency series"""
+        return {
+            "count": len(data),
+            "min": min(data),
+            "mean": statistics.mean(data),
+            "median": statistics.median(data),
+            "p95": self._percentile(data, 95),
+            "p99": self._percentile(data, 99)
+        }
+        
     def _percentile(self, data: List[float], percentile: float) -> float:
         """Calculate percentile of data"""
         if not data:
@@ -158,9 +221,38 @@ class SystemMonitor:
 class PerformanceBenchmark:
     """Main performance benchmarking class"""
     
-    def __init__(self):
+    def __init__(self, profile: bool = False, profile_dir: str = "profiles",
+                 store_dir: Optional[str] = None, run_id: Optional[str] = None):
         self.executor = TestExecutor()
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.store_dir = store_dir
+        self.run_id = run_id or datetime.now().strftime("perf_%Y%m%d_%H%M%S")
+        self._run_stored = False
+        
+    def _start_profiler(self, name: str) -> Optional[BenchmarkProfiler]:
+        """Start a profiler around the benchmark when profiling is enabled"""
+        if not self.profile:
+            return None
+        profiler = BenchmarkProfiler(name, output_dir=self.profile_dir)
+        profiler.start()
+        return profiler
         
+    def _stop_profiler(self, profiler: Optional[BenchmarkProfiler], metrics: PerformanceMetrics):
+        """Stop the profiler and attach its summary to the metrics"""
+        if profiler:
+            profiler.stop()
+            metrics.profile = profiler.get_summary()
+            
+    def _export_metrics(self, name: str, metrics: PerformanceMetrics):
+        """Append raw measurements to the columnar results store when enabled"""
+        if self.store_dir:
+            from results_store import ColumnarResultsStore
+            # 最初の書き込みで一意な実行IDを確保し（既存IDなら連番付き）、以降のベンチマークはその実行に追加する
+            self.run_id = ColumnarResultsStore(self.store_dir).write_performance(
+                {name: metrics}, self.run_id, append=self._run_stored)
+            self._run_stored = True
+            
     def single_request_benchmark(self, test_cases: List[Dict[str, Any]], 
                                 iterations: int = 100) -> PerformanceMetrics:
         """Benchmark single request performance"""
@@ -178,6 +270,7 @@ class PerformanceBenchmark:
         # Start monitoring
         monitor.start_monitoring()
         metrics.start_time = time.time()
+        profiler = self._start_profiler("single_request")
         
         try:
             for i in range(iterations):
@@ -194,6 +287,8 @@ class PerformanceBenchmark:
                     
                     response_time = end_time - start_time
                     metrics.add_response_time(response_time)
+                    metrics.add_latency_markers(result.time_to_first_token, result.time_to_first_tool_call)
+                    metrics.add_usage(result.to_dict())
                     metrics.record_result(result.success)
                     
                 except Exception as e:
@@ -208,7 +303,9 @@ class PerformanceBenchmark:
         finally:
             metrics.end_time = time.time()
             monitor.stop_monitoring()
+            self._stop_profiler(profiler, metrics)
             
+        self._export_metrics("single_request", metrics)
         return metrics
         
     def concurrent_request_benchmark(self, test_cases: List[Dict[str, Any]],
@@ -231,34 +328,43 @@ class PerformanceBenchmark:
             executor = TestExecutor()  # Each worker gets its own executor
             executor.initialize_agent()
             
-            for request_id in range(requests_per_user):
-                test_case = test_cases[(user_id * requests_per_user + request_id) % len(test_cases)]
-                
-                start_time = time.time()
-                try:
-                    result = executor.execute_test(test_case)
-                    end_time = time.time()
-                    
-                    result_queue.put({
-                        "response_time": end_time - start_time,
-                        "success": result.success,
-                        "user_id": user_id,
-                        "request_id": request_id
-                    })
-                    
-                except Exception as e:
-                    end_time = time.time()
-                    result_queue.put({
-                        "response_time": end_time - start_time,
-                        "success": False,
-                        "user_id": user_id,
-                        "request_id": request_id,
-                        "error": str(e)
-                    })
+            with profiler.thread_profile() if profiler else nullcontext():
+                for request_id in range(requests_per_user):
+                    test_case = test_cases[(user_id * requests_per_user + request_id) % len(test_cases)]
                     
+                    start_time = time.time()
+                    try:
+                        result = executor.execute_test(test_case)
+                        end_time = time.time()
+                        
+                        result_queue.put({
+                            "response_time": end_time - start_time,
+                            "time_to_first_token": result.time_to_first_token,
+                            "time_to_first_tool_call": result.time_to_first_tool_call,
+                            "usage": {field: getattr(result, field) for field in USAGE_FIELDS},
+                            "success": result.success,
+                            "user_id": user_id,
+                            "request_id": request_id
+                        })
+                        
+                    except Exception as e:
+                        end_time = time.time()
+                        result_queue.put({
+                            "response_time": end_time - start_time,
+                            "success": False,
+                            "user_id": user_id,
+                            "request_id": request_id,
+                            "error": str(e)
+                        })
+                        
+        # 同時に同じツール呼び出しをしたワーカーの集約数（サーバーに送らずに結果を共有した呼び出し）
+        from tool_transport import get_single_flight
+        coalesced_before = get_single_flight().get_stats()["coalesced"]
+        
         # Start monitoring
         monitor.start_monitoring()
         metrics.start_time = time.time()
+        profiler = self._start_profiler("concurrent_request")
         
         try:
             result_queue = queue.Queue()
@@ -278,12 +384,18 @@ class PerformanceBenchmark:
             while not result_queue.empty():
                 result = result_queue.get()
                 metrics.add_response_time(result["response_time"])
+                metrics.add_latency_markers(result.get("time_to_first_token"), result.get("time_to_first_tool_call"))
+                if "usage" in result:
+                    metrics.add_usage(result["usage"])
                 metrics.record_result(result["success"])
                 
         finally:
             metrics.end_time = time.time()
+            metrics.coalesced_tool_calls = get_single_flight().get_stats()["coalesced"] - coalesced_before
             monitor.stop_monitoring()
+            self._stop_profiler(profiler, metrics)
             
+        self._export_metrics("concurrent_request", metrics)
         return metrics
         
     def load_test(self, test_cases: List[Dict[str, Any]], 
@@ -306,6 +418,7 @@ class PerformanceBenchmark:
         # Start monitoring
         monitor.start_monitoring()
         metrics.start_time = time.time()
+        profiler = self._start_profiler("load_test")
         
         try:
             end_time = time.time() + duration_seconds
@@ -318,6 +431,8 @@ class PerformanceBenchmark:
                     result = self.executor.execute_test(test_case)
                     response_time = time.time() - start_time
                     metrics.add_response_time(response_time)
+                    metrics.add_latency_markers(result.time_to_first_token, result.time_to_first_tool_call)
+                    metrics.add_usage(result.to_dict())
                     metrics.record_result(result.success)
                     
                 except Exception as e:
@@ -341,16 +456,121 @@ class PerformanceBenchmark:
         finally:
             metrics.end_time = time.time()
             monitor.stop_monitoring()
+            self._stop_profiler(profiler, metrics)
             
+        self._export_metrics("load_test", metrics)
         return metrics
         
+    def parallel_tool_calls_benchmark(self, test_cases: List[Dict[str, Any]],
+                                      iterations: int = 3) -> Dict[str, Any]:
+        """逐次実行（1ターン1呼び出し）と並行ツール呼び出しのモデルターン数・実行時間を比較"""
+        print(f"🔀 Parallel Tool Calls Benchmark - {len(test_cases)} tests x {iterations} iterations")
+        executors = {
+            "sequential": self.executor,
+            "parallel": TestExecutor(self.executor.server_url, parallel_tool_calls=True),
+        }
+        return self._compare_executors("parallel_tool_calls", executors, test_cases, iterations)
+        
+    def server_tool_benchmark(self, test_cases: List[Dict[str, Any]], tool: str, baseline_url: str,
+                              tool_url: str, iterations: int = 1) -> Dict[str, Any]:
+        """サーバー側の複合ツール（map / compose）なし/ありのサーバーで、モデルターン数・実行時間を比較"""
+        print(f"🗺️  Server Tool Benchmark ({tool}) - {len(test_cases)} tests x {iterations} iterations")
+        executors = {
+            f"without_{tool}": TestExecutor(baseline_url),
+            f"with_{tool}": TestExecutor(tool_url),
+        }
+        return self._compare_executors(f"{tool}_tool", executors, test_cases, iterations)
+        
+    def tool_description_benchmark(self, test_cases: List[Dict[str, Any]], variant: str,
+                                   descriptions: Dict[str, str], iterations: int = 1) -> Dict[str, Any]:
+        """サーバーの説明（full）と説明のバリアントで、成功率・モデルターン数・実行時間を比較"""
+        print(f"📏 Tool Description Benchmark (full vs {variant}) - {len(test_cases)} tests x {iterations} iterations")
+        executors = {
+            "full": self.executor,
+            variant: TestExecutor(self.executor.server_url, tool_descriptions=descriptions),
+        }
+        return self._compare_executors(f"tool_descriptions_{variant}", executors, test_cases, iterations)
+        
+    def tool_subsetting_benchmark(self, test_cases: List[Dict[str, Any]], max_tools: int,
+                                  iterations: int = 1) -> Dict[str, Any]:
+        """全ツールとプロンプトごとに選んだツールで、成功率・モデルターン数・実行時間を比較"""
+        from tool_selector import find_subsetting_agent
+        print(f"🎯 Tool Subsetting Benchmark (max {max_tools} tools) - {len(test_cases)} tests x {iterations} iterations")
+        executors = {
+            "all_tools": self.executor,
+            "selected_tools": TestExecutor(self.executor.server_url, max_tools=max_tools),
+        }
+        results = self._compare_executors("tool_subsetting", executors, test_cases, iterations)
+        subsetting_agent = find_subsetting_agent(executors["selected_tools"].agent)
+        if subsetting_agent is not None:
+            results["tool_selection"] = subsetting_agent.get_stats()
+        return results
+        
+    def _compare_executors(self, name: str, executors: Dict[str, TestExecutor],
+                           test_cases: List[Dict[str, Any]], iterations: int) -> Dict[str, Any]:
+        """2つの実行構成（基準, 比較対象の順）で同じテストを実行し、モデルターン数と実行時間を比較"""
+        for mode, executor in executors.items():
+            if not executor.check_server_availability():
+                raise Exception("Server not available")
+            if not executor.initialize_agent():
+                raise Exception(f"Agent initialization failed ({mode})")
+                
+        baseline_mode, candidate_mode = executors
+        comparison = []
+        totals = {mode: {"model_turns": 0, "wall_time": 0.0, "passed": 0} for mode in executors}
+        metrics = PerformanceMetrics()
+        profiler = self._start_profiler(name)
+        
+        try:
+            for test_case in test_cases:
+                row = {"test_id": test_case.get("id", "unknown"),
+                       "expected_functions": test_case.get("expected_functions", [])}
+                for mode, executor in executors.items():
+                    turns, wall_time, passed = 0, 0.0, 0
+                    for _ in range(iterations):
+                        # 前のテストの会話履歴がターン数に影響しないようにする
+                        executor.agent.memory.clear()
+                        result = executor.execute_test(test_case)
+                        turns += result.model_turns
+                        wall_time += result.execution_time
+                        passed += int(result.success)
+                    row[mode] = {"model_turns": turns / iterations, "wall_time": wall_time / iterations,
+                                 "success_rate": passed / iterations * 100}
+                    totals[mode]["model_turns"] += turns / iterations
+                    totals[mode]["wall_time"] += wall_time / iterations
+                    totals[mode]["passed"] += passed
+                comparison.append(row)
+                print(f"  {row['test_id']}: turns {row[baseline_mode]['model_turns']:.1f} -> "
+                      f"{row[candidate_mode]['model_turns']:.1f}, "
+                      f"time {row[baseline_mode]['wall_time']:.2f}s -> {row[candidate_mode]['wall_time']:.2f}s")
+        finally:
+            self._stop_profiler(profiler, metrics)
+            
+        baseline, candidate = totals[baseline_mode], totals[candidate_mode]
+        results = {
+            "comparison": comparison,
+            "modes": [baseline_mode, candidate_mode],
+            "iterations": iterations,
+            baseline_mode: baseline,
+            candidate_mode: candidate,
+            "turn_reduction_percent": (1 - candidate["model_turns"] / baseline["model_turns"]) * 100
+                                      if baseline["model_turns"] else 0.0,
+            "speedup": baseline["wall_time"] / candidate["wall_time"] if candidate["wall_time"] else 0.0,
+        }
+        if metrics.profile:
+            results["profile"] = metrics.profile
+        return results
+        
     def memory_stress_test(self, test_cases: List[Dict[str, Any]], 
-                          max_requests: int = 1000) -> PerformanceMetrics:
-        """Test memory usage under stress"""
+                          max_requests: int = 1000,
+                          snapshot_interval: int = 50) -> PerformanceMetrics:
+        """Test memory usage under stress, tracking Python allocations with tracemalloc"""
         print(f"🧠 Memory Stress Test - {max_requests} requests")
         
         metrics = PerformanceMetrics()
         monitor = SystemMonitor(metrics)
+        tracker = AllocationTracker(snapshot_interval=snapshot_interval)
+        completed = 0
         
         # Initialize system
         if not self.executor.check_server_availability():
@@ -361,6 +581,8 @@ class PerformanceBenchmark:
         # Start monitoring
         monitor.start_monitoring()
         metrics.start_time = time.time()
+        profiler = self._start_profiler("memory_stress")
+        tracker.start()
         
         try:
             for i in range(max_requests):
@@ -374,6 +596,8 @@ class PerformanceBenchmark:
                     result = self.executor.execute_test(test_case)
                     response_time = time.time() - start_time
                     metrics.add_response_time(response_time)
+                    metrics.add_latency_markers(result.time_to_first_token, result.time_to_first_tool_call)
+                    metrics.add_usage(result.to_dict())
                     metrics.record_result(result.success)
                     
                 except Exception as e:
@@ -382,17 +606,24 @@ class PerformanceBenchmark:
                     metrics.record_result(False)
                     
                 # No delay - stress test
+                completed = i + 1
+                tracker.maybe_snapshot(completed)
                 
         finally:
             metrics.end_time = time.time()
             monitor.stop_monitoring()
+            self._stop_profiler(profiler, metrics)
+            tracker.stop(completed)
+            metrics.allocations = tracker.get_report()
             
+        self._export_metrics("memory_stress", metrics)
         return metrics
 
-def run_basic_benchmark():
+def run_basic_benchmark(profile: bool = False, profile_dir: str = "profiles",
+                        store_dir: Optional[str] = None, test_cases: Optional[List[Dict[str, Any]]] = None):
     """Run basic performance benchmarks"""
-    benchmark = PerformanceBenchmark()
-    test_cases = BASIC_TESTS[:5]  # Use first 5 basic tests
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir, store_dir=store_dir)
+    test_cases = test_cases or BASIC_TESTS[:5]  # Use first 5 basic tests
     
     results = {}
     
@@ -417,10 +648,11 @@ def run_basic_benchmark():
         
     return results
 
-def run_stress_benchmark():
+def run_stress_benchmark(profile: bool = False, profile_dir: str = "profiles",
+                         store_dir: Optional[str] = None, test_cases: Optional[List[Dict[str, Any]]] = None):
     """Run stress performance benchmarks"""
-    benchmark = PerformanceBenchmark()
-    test_cases = BASIC_TESTS + INTERMEDIATE_TESTS[:3]
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir, store_dir=store_dir)
+    test_cases = test_cases or BASIC_TESTS + INTERMEDIATE_TESTS[:3]
     
     results = {}
     
@@ -445,6 +677,197 @@ def run_stress_benchmark():
         
     return results
 
+def run_memory_benchmark(max_requests: int = 200, snapshot_interval: int = 20,
+                         profile: bool = False, profile_dir: str = "profiles",
+                         store_dir: Optional[str] = None, test_cases: Optional[List[Dict[str, Any]]] = None):
+    """Run the memory stress benchmark with allocation tracking"""
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir, store_dir=store_dir)
+    test_cases = test_cases or BASIC_TESTS + INTERMEDIATE_TESTS[:3]
+    
+    results = {}
+    
+    print("🧠 Starting Memory Benchmarks")
+    print("="*50)
+    
+    try:
+        metrics = benchmark.memory_stress_test(test_cases, max_requests=max_requests,
+                                               snapshot_interval=snapshot_interval)
+        results["memory_allocation"] = metrics.get_statistics()
+        print("✅ Memory allocation benchmark completed")
+    except Exception as e:
+        print(f"❌ Memory allocation benchmark failed: {e}")
+        
+    return results
+
+def run_parallel_tools_benchmark(profile: bool = False, profile_dir: str = "profiles",
+                                 test_cases: Optional[List[Dict[str, Any]]] = None, iterations: int = 3):
+    """Compare sequential and parallel tool calling on multi-function prompts"""
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir)
+    # 複数の関数を必要とするプロンプトのみが並行実行の対象になる
+    test_cases = test_cases or [test for test in INTERMEDIATE_TESTS + ADVANCED_TESTS + MULTIPLE_OPERATIONS_TESTS
+                                if len(set(test.get("expected_functions", []))) > 1]
+    
+    results = {}
+    
+    print("🔀 Starting Parallel Tool Call Benchmarks")
+    print("="*50)
+    
+    try:
+        results["parallel_tool_calls"] = benchmark.parallel_tool_calls_benchmark(test_cases, iterations=iterations)
+        print("✅ Parallel tool call benchmark completed")
+    except Exception as e:
+        print(f"❌ Parallel tool call benchmark failed: {e}")
+        
+    return results
+
+# サーバー側の複合ツールごとの既定のテストケース
+SERVER_TOOL_TEST_CASES = {
+    # 同じ関数を多数の値に適用するプロンプト
+    "map": ADVANCED_TESTS + EXPERT_TESTS,
+    # 前の結果を次の関数に渡す依存チェーンのプロンプト
+    "compose": INTERMEDIATE_TESTS[:1] + SEQUENTIAL_OPERATIONS + VERIFICATION_TESTS,
+}
+
+def run_server_tool_benchmark(tool: str, profile: bool = False, profile_dir: str = "profiles",
+                              test_cases: Optional[List[Dict[str, Any]]] = None, iterations: int = 1,
+                              baseline_url: Optional[str] = None, tool_url: Optional[str] = None):
+    """Compare model turns and wall time with and without a server-side tool (map or compose)"""
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir)
+    test_cases = test_cases or SERVER_TOOL_TEST_CASES[tool]
+    
+    results = {}
+    servers = []
+    
+    print(f"🗺️  Starting Server Tool Benchmarks ({tool})")
+    print("="*50)
+    
+    try:
+        # URL の指定がなければ、複合ツールなしのサーバーと対象ツールのみを公開するサーバーを
+        # ローカル代替サーバーとして空きポートで起動する（どちらもバッチ版ツールは公開せず、
+        # 値ごとのスカラーツールに対象ツールを加えた効果だけを測る）
+        if not baseline_url or not tool_url:
+            from local_function_server import create_server
+            import spf_table
+            for enabled in (False, True):
+                server = create_server(0, spf_table.DEFAULT_LIMIT if spf_table.np is not None else None,
+                                       batch=False,
+                                       map_tool=enabled and tool == "map",
+                                       compose_tool=enabled and tool == "compose")
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                servers.append(server)
+            baseline_url, tool_url = (f"http://localhost:{server.server_address[1]}" for server in servers)
+            
+        results[f"{tool}_tool"] = benchmark.server_tool_benchmark(test_cases, tool, baseline_url, tool_url,
+                                                                  iterations=iterations)
+        print(f"✅ Server tool benchmark ({tool}) completed")
+    except Exception as e:
+        print(f"❌ Server tool benchmark ({tool}) failed: {e}")
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        
+    return results
+
+def run_tool_description_benchmark(variant_names: List[str], profile: bool = False, profile_dir: str = "profiles",
+                                   test_cases: Optional[List[Dict[str, Any]]] = None, iterations: int = 1,
+                                   variants_file: Optional[str] = None):
+    """A/B the server's tool descriptions against compact variants (success rate, turns, wall time, tokens)"""
+    from tool_descriptions import build_variants, fetch_tool_definitions, load_variants_file, measure_variants
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir)
+    test_cases = test_cases or BASIC_TESTS + INTERMEDIATE_TESTS + ADVANCED_TESTS + EXPERT_TESTS
+    
+    results = {}
+    
+    print("📏 Starting Tool Description Benchmarks")
+    print("="*50)
+    
+    try:
+        tool_defs = fetch_tool_definitions(benchmark.executor.server_url)
+        variants = build_variants(tool_defs, load_variants_file(variants_file) if variants_file else None)
+        tokens = measure_variants(tool_defs, variants)["variants"]
+    except Exception as e:
+        print(f"❌ Tool description benchmark failed: {e}")
+        return results
+        
+    for variant in variant_names:
+        try:
+            if variant not in variants:
+                raise Exception(f"Unknown variant: {variant} (available: {', '.join(variants)})")
+            stats = benchmark.tool_description_benchmark(test_cases, variant, variants[variant], iterations)
+            # ツール定義のトークン数（1ターンあたり）と、実行したターン数に対する合計
+            stats["tool_tokens_per_turn"] = {mode: tokens[mode]["total"] for mode in ("full", variant)}
+            stats["tool_tokens_total"] = {mode: tokens[mode]["total"] * stats[mode]["model_turns"]
+                                          for mode in ("full", variant)}
+            results[f"tool_descriptions_{variant}"] = stats
+            print(f"✅ Tool description benchmark ({variant}) completed")
+        except Exception as e:
+            print(f"❌ Tool description benchmark ({variant}) failed: {e}")
+            
+    return results
+
+def run_tool_subsetting_benchmark(max_tools: int, profile: bool = False, profile_dir: str = "profiles",
+                                  test_cases: Optional[List[Dict[str, Any]]] = None, iterations: int = 1):
+    """A/B passing all tools vs. the tools pre-selected per prompt (success rate, turns, wall time, tokens)"""
+    from tool_descriptions import fetch_tool_definitions, measure_tool_tokens
+    from tool_selector import ToolSelector
+    benchmark = PerformanceBenchmark(profile=profile, profile_dir=profile_dir)
+    test_cases = test_cases or BASIC_TESTS + INTERMEDIATE_TESTS + ADVANCED_TESTS + EXPERT_TESTS
+    
+    results = {}
+    
+    print("🎯 Starting Tool Subsetting Benchmarks")
+    print("="*50)
+    
+    try:
+        tool_defs = fetch_tool_definitions(benchmark.executor.server_url)
+        tokens = measure_tool_tokens(tool_defs)
+        selector = ToolSelector(tool_defs, max_tools=max_tools)
+        stats = benchmark.tool_subsetting_benchmark(test_cases, max_tools, iterations)
+        
+        # テストごとにモデルに渡したツール定義のトークン数（1ターンあたり）とターン数から合計を求める
+        full_tokens = sum(tokens.values())
+        per_turn = {"all_tools": [], "selected_tools": []}
+        totals = {"all_tools": 0.0, "selected_tools": 0.0}
+        for row, test_case in zip(stats["comparison"], test_cases):
+            selected = selector.select(test_case.get("prompt", ""))
+            subset_tokens = sum(tokens[name] for name in selected) if selected is not None else full_tokens
+            for mode, mode_tokens in (("all_tools", full_tokens), ("selected_tools", subset_tokens)):
+                per_turn[mode].append(mode_tokens)
+                totals[mode] += mode_tokens * row[mode]["model_turns"]
+        stats["tool_tokens_per_turn"] = {mode: sum(values) / len(values) if values else 0
+                                         for mode, values in per_turn.items()}
+        stats["tool_tokens_total"] = totals
+        results["tool_subsetting"] = stats
+        print("✅ Tool subsetting benchmark completed")
+    except Exception as e:
+        print(f"❌ Tool subsetting benchmark failed: {e}")
+        
+    return results
+
+def print_comparison_report(stats: Dict[str, Any]):
+    """Print a two-configuration comparison (model turns and wall time per test)"""
+    baseline_mode, candidate_mode = stats.get("modes", ["sequential", "parallel"])
+    print(f"{'Test':<22} {'Turns':>8} {'Turns':>8} {'Time':>10} {'Time':>10}   ({baseline_mode} / {candidate_mode})")
+    for row in stats["comparison"]:
+        print(f"{row['test_id']:<22} {row[baseline_mode]['model_turns']:>8.1f} {row[candidate_mode]['model_turns']:>8.1f} "
+              f"{row[baseline_mode]['wall_time']:>9.2f}s {row[candidate_mode]['wall_time']:>9.2f}s")
+    baseline, candidate = stats[baseline_mode], stats[candidate_mode]
+    print(f"Total model turns: {baseline['model_turns']:.1f} -> {candidate['model_turns']:.1f} "
+          f"({stats['turn_reduction_percent']:.1f}% fewer)")
+    print(f"Total wall time: {baseline['wall_time']:.2f}s -> {candidate['wall_time']:.2f}s "
+          f"({stats['speedup']:.2f}x)")
+    runs = len(stats["comparison"]) * stats.get("iterations", 1)
+    if runs:
+        print(f"Success rate: {baseline['passed'] / runs * 100:.1f}% -> {candidate['passed'] / runs * 100:.1f}%")
+    if "tool_tokens_per_turn" in stats:
+        per_turn, total = stats["tool_tokens_per_turn"], stats["tool_tokens_total"]
+        print(f"Tool definition tokens: {per_turn[baseline_mode]:,.0f} -> {per_turn[candidate_mode]:,.0f} per turn, "
+              f"{total[baseline_mode]:,.0f} -> {total[candidate_mode]:,.0f} in total")
+    if "tool_selection" in stats:
+        from tool_selector import print_tool_selection_stats
+        print_tool_selection_stats(stats["tool_selection"])
+
 def print_performance_report(results: Dict[str, Any]):
     """Print a formatted performance report"""
     print("\n" + "="*80)
@@ -459,6 +882,11 @@ def print_performance_report(results: Dict[str, Any]):
             
         print(f"\n📊 {test_name.upper()}")
         print("-" * 40)
+        if "comparison" in stats:
+            print_comparison_report(stats)
+            if "profile" in stats:
+                print_hot_functions(stats["profile"])
+            continue
         print(f"Duration: {stats['duration_seconds']:.2f}s")
         print(f"Total Requests: {stats['total_requests']}")
         print(f"Success Rate: {stats['success_rate']:.1f}%")
@@ -468,11 +896,33 @@ def print_performance_report(results: Dict[str, Any]):
         print(f"Response Time - Min: {rt['min']:.3f}s, Max: {rt['max']:.3f}s, Mean: {rt['mean']:.3f}s")
         print(f"Response Time - P95: {rt['p95']:.3f}s, P99: {rt['p99']:.3f}s")
         
+        for key, label in (("time_to_first_tool_call", "First Tool Call"), ("time_to_first_token", "First Token")):
+            if key in stats:
+                marker = stats[key]
+                print(f"{label} - Mean: {marker['mean']:.3f}s, Median: {marker['median']:.3f}s, "
+                      f"P95: {marker['p95']:.3f}s ({marker['count']} samples)")
+
+        if "usage" in stats:
+            usage = stats["usage"]
+            print(f"Tokens per Request - Prompt: {usage['prompt_tokens_per_test']:,.0f}, "
+                  f"Completion: {usage['completion_tokens_per_test']:,.0f}, "
+                  f"Tool Definitions: {usage['tool_schema_share']:.1f}% of prompt")
+            print(f"Tool Payloads - {usage['tool_calls_sent']} calls, {usage['tool_request_bytes']:,}B sent, "
+                  f"{usage['tool_response_bytes']:,}B received ({usage['bytes_per_tool_call']:,.0f}B per call)")
+        if "coalesced_tool_calls" in stats:
+            print(f"Coalesced Tool Calls: {stats['coalesced_tool_calls']} (identical in-flight calls shared one request)")
+
         mem = stats['memory']
         print(f"Memory - Peak: {mem['peak_mb']:.1f}MB, Average: {mem['avg_mb']:.1f}MB")
         
         cpu = stats['cpu']
         print(f"CPU - Average: {cpu['avg_percent']:.1f}%, Peak: {cpu['max_percent']:.1f}%")
+        
+        if "allocations" in stats:
+            print_allocation_report(stats["allocations"])
+            
+        if "profile" in stats:
+            print_hot_functions(stats["profile"])
 
 def save_performance_results(results: Dict[str, Any], filename: str):
     """Save performance results to JSON file"""
@@ -497,33 +947,95 @@ def main():
     parser.add_argument("--benchmark-stress", action="store_true", help="Run stress benchmarks")
     parser.add_argument("--benchmark-memory", action="store_true", help="Run memory benchmarks")
     parser.add_argument("--benchmark-all", action="store_true", help="Run all benchmarks")
+    parser.add_argument("--benchmark-parallel-tools", action="store_true",
+                       help="Compare model turns and wall time with and without parallel tool calls")
+    parser.add_argument("--benchmark-map-tool", action="store_true",
+                       help="Compare model turns and wall time with and without the map tool (advanced/expert tests)")
+    parser.add_argument("--benchmark-compose-tool", action="store_true",
+                       help="Compare model turns and wall time with and without the compose tool (dependent chains)")
+    parser.add_argument("--tool-baseline-url", type=str, metavar="URL",
+                       help="Server without the map/compose tools (default: start local stand-in servers)")
+    parser.add_argument("--tool-server-url", type=str, metavar="URL", help="Server exposing the benchmarked tool")
+    parser.add_argument("--benchmark-tool-descriptions", type=str, nargs="+", metavar="VARIANT",
+                       help="A/B the server's tool descriptions against variants "
+                            "(compact, minimal, or from --tool-description-variants)")
+    parser.add_argument("--tool-description-variants", type=str, metavar="FILE",
+                       help="JSON file with hand-written description variants (see tool_descriptions.py)")
+    parser.add_argument("--benchmark-tool-subsetting", type=int, nargs="?", const=6, metavar="MAX_TOOLS",
+                       help="A/B passing all tools vs. the tools pre-selected per prompt (default: up to 6 tools)")
     parser.add_argument("--load-test", type=int, metavar="REQUESTS", help="Run load test with N requests")
     parser.add_argument("--output", type=str, default="performance_results.json", help="Output file")
+    parser.add_argument("--snapshot-interval", type=int, default=20,
+                       help="Iterations between tracemalloc snapshots in memory benchmarks")
+    parser.add_argument("--profile", action="store_true",
+                       help="Profile each benchmark (cProfile + collapsed stacks for flame graphs)")
+    parser.add_argument("--profile-dir", type=str, default="profiles", help="Output directory for profile files")
+    parser.add_argument("--store", type=str, metavar="DIR",
+                       help="Also export raw measurements to a columnar results store")
+    parser.add_argument("--corpus", type=str, metavar="PATH",
+                       help="Use test cases from a generated corpus (see test_generator.py)")
+    parser.add_argument("--corpus-size", type=int, default=1000, help="Number of corpus cases to load")
+    add_runtime_arguments(parser)
     
     args = parser.parse_args()
     
     results = {}
     
     try:
+        apply_runtime_arguments(args)
+            
+        corpus_cases = None
+        if args.corpus:
+            from test_generator import load_corpus
+            corpus_cases = load_corpus(args.corpus, args.corpus_size)
+            print(f"📚 Loaded {len(corpus_cases)} test cases from {args.corpus}")
+            
         if args.benchmark_all or args.benchmark_basic:
-            basic_results = run_basic_benchmark()
+            basic_results = run_basic_benchmark(args.profile, args.profile_dir, args.store, corpus_cases)
             results.update(basic_results)
             
         if args.benchmark_all or args.benchmark_stress:
-            stress_results = run_stress_benchmark()
+            stress_results = run_stress_benchmark(args.profile, args.profile_dir, args.store, corpus_cases)
             results.update(stress_results)
             
+        if args.benchmark_all or args.benchmark_memory:
+            memory_results = run_memory_benchmark(snapshot_interval=args.snapshot_interval,
+                                                  profile=args.profile, profile_dir=args.profile_dir,
+                                                  store_dir=args.store, test_cases=corpus_cases)
+            results.update(memory_results)
+            
+        if args.benchmark_all or args.benchmark_parallel_tools:
+            parallel_results = run_parallel_tools_benchmark(args.profile, args.profile_dir, corpus_cases)
+            results.update(parallel_results)
+            
+        for tool, enabled in (("map", args.benchmark_map_tool), ("compose", args.benchmark_compose_tool)):
+            if enabled:
+                results.update(run_server_tool_benchmark(tool, args.profile, args.profile_dir, corpus_cases,
+                                                         baseline_url=args.tool_baseline_url,
+                                                         tool_url=args.tool_server_url))
+            
+        if args.benchmark_tool_descriptions:
+            results.update(run_tool_description_benchmark(args.benchmark_tool_descriptions, args.profile,
+                                                          args.profile_dir, corpus_cases,
+                                                          variants_file=args.tool_description_variants))
+            
+        if args.benchmark_tool_subsetting:
+            results.update(run_tool_subsetting_benchmark(args.benchmark_tool_subsetting, args.profile,
+                                                         args.profile_dir, corpus_cases))
+            
         if args.load_test:
-            benchmark = PerformanceBenchmark()
-            test_cases = BASIC_TESTS[:3]
+            benchmark = PerformanceBenchmark(profile=args.profile, profile_dir=args.profile_dir,
+                                             store_dir=args.store)
+            test_cases = corpus_cases or BASIC_TESTS[:3]
             metrics = benchmark.load_test(test_cases, target_rps=10, duration_seconds=args.load_test)
             results["custom_load_test"] = metrics.get_statistics()
             
         if not results:
             # Default to basic benchmark
-            results = run_basic_benchmark()
+            results = run_basic_benchmark(args.profile, args.profile_dir, args.store, corpus_cases)
             
         print_performance_report(results)
+        print_runtime_stats(args)
         save_performance_results(results, args.output)
         
         return 0
@@ -11,24 +11,79 @@ LangChain関数呼び出しテスト結果のためのHTMLレポートジェネ
 使用方法:
     python test_reporter.py --input test_results.json --output report.html
     python test_reporter.py --input performance_results.json --type performance
+    python test_reporter.py --input test_results.jsonl --stream --page-size 200   # 大規模結果のストリーミング生成
+    python test_reporter.py --input test_results.json --cache-dir .report_cache   # 変更のない観点を再利用して増分生成
 """
 
 import json
+import html
+import hashlib
 import argparse
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, Callable, TextIO
 import base64
 import os
 
+from usage_accounting import USAGE_DIMENSIONS, UsageAggregator
+
+class ReportFragmentCache:
+    """
+    入力データのハッシュをキーにした描画済みHTML断片のキャッシュ。
+    
+    キーは断片の種類・描画バージョン・入力データ（キー順を正規化したJSON）のSHA-256。
+    入力が変わらない断片はディスクから読み戻し、再描画を省略する。
+    断片の描画ロジックを変更した場合は FRAGMENT_VERSION を上げて既存キャッシュを無効化すること。
+    """
+    
+    FRAGMENT_VERSION = 1
+    
+    def __init__(self, cache_dir: str = ".report_cache"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        
+    def key(self, kind: str, data: Any) -> str:
+        """Content address for a fragment of the given kind"""
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(f"{kind}:{self.FRAGMENT_VERSION}:{payload}".encode('utf-8'))
+        return digest.hexdigest()
+        
+    def get_or_render(self, kind: str, data: Any, render: Callable[[], str]) -> str:
+        """Return the cached fragment for data, rendering and storing it on a miss"""
+        path = os.path.join(self.cache_dir, f"{kind}-{self.key(kind, data)}.html")
+        
+        if os.path.exists(path):
+            self.hits += 1
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+                
+        self.misses += 1
+        fragment = render()
+        
+        # 途中で中断されても壊れた断片が残らないよう一時ファイル経由で置き換える
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(fragment)
+        os.replace(tmp_path, path)
+        
+        return fragment
+
+
 class HTMLReportGenerator:
     """テスト結果の包括的なHTMLレポートを生成"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
         self.template = self._get_html_template()
+        # cache_dir を指定すると断片キャッシュとCSSの共有ファイル出力を有効にする
+        self.fragment_cache = ReportFragmentCache(cache_dir) if cache_dir else None
+        self._asset_dir = "."
         
     def generate_comprehensive_report(self, results: Dict[str, Any], output_file: str):
         """Generate a comprehensive test report"""
         
+        self._asset_dir = os.path.dirname(os.path.abspath(output_file))
+        
         # Extract data for report
         report_data = self._process_comprehensive_results(results)
         
@@ -39,11 +94,14 @@ class HTMLReportGenerator:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(html_content)
             
+        self._print_cache_stats()
         print(f"📄 HTML report generated: {output_file}")
         
     def generate_performance_report(self, results: Dict[str, Any], output_file: str):
         """Generate a performance-focused report"""
         
+        self._asset_dir = os.path.dirname(os.path.abspath(output_file))
+        
         # Extract performance data
         perf_data = self._process_performance_results(results)
         
@@ -54,8 +112,35 @@ class HTMLReportGenerator:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(html_content)
             
+        self._print_cache_stats()
         print(f"📄 Performance report generated: {output_file}")
         
+    def _cached(self, kind: str, data: Any, render: Callable[[], str]) -> str:
+        """Render a fragment through the fragment cache when it is enabled"""
+        if self.fragment_cache is None:
+            return render()
+        return self.fragment_cache.get_or_render(kind, data, render)
+        
+    def _print_cache_stats(self):
+        if self.fragment_cache is not None:
+            print(f"♻️  Fragment cache: {self.fragment_cache.hits} reused, {self.fragment_cache.misses} rendered")
+            
+    def _get_style_block(self) -> str:
+        """Inline <style> block, or a link to the shared stylesheet when caching is enabled"""
+        css = self._get_css_styles()
+        if self.fragment_cache is None:
+            return f"<style>\n        {css}\n    </style>"
+            
+        # ファイル名にハッシュを含めるため、内容が同じなら既存ファイルをそのまま共有できる
+        digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+        filename = f"report-{digest}.css"
+        path = os.path.join(self._asset_dir, filename)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(css)
+                
+        return f'<link rel="stylesheet" href="{filename}">'
+        
     def _process_comprehensive_results(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Process comprehensive test results for HTML generation"""
         
@@ -64,6 +149,7 @@ class HTMLReportGenerator:
         total_passed = 0
         total_duration = 0
         perspective_stats = {}
+        usage = UsageAggregator()
         
         for perspective_name, perspective_results in results.items():
             if isinstance(perspective_results, dict):
@@ -77,6 +163,8 @@ class HTMLReportGenerator:
                         perspective_total += session_data["total_tests"]
                         perspective_passed += session_data["passed_tests"]
                         perspective_duration += session_data.get("duration_seconds", 0)
+                        for record in session_data.get("results", []):
+                            usage.add(record)
                         
                 perspective_stats[perspective_name] = {
                     "total": perspective_total,
@@ -102,6 +190,7 @@ class HTMLReportGenerator:
         return {
             "overall": overall_stats,
             "perspectives": perspective_stats,
+            "usage": usage.breakdown(),
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
@@ -137,9 +226,7 @@ class HTMLReportGenerator:
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>LangChain Function Calling Test Report</title>
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        {self._get_css_styles()}
-    </style>
+    {self._get_style_block()}
 </head>
 <body>
     <div class="container">
@@ -177,6 +264,8 @@ class HTMLReportGenerator:
             {self._generate_perspective_tables(data["perspectives"])}
         </div>
         
+        {self._generate_usage_section(data["usage"])}
+        
         <div class="insights">
             <h2>💡 Key Insights</h2>
             {self._generate_insights(data)}
@@ -184,7 +273,7 @@ class HTMLReportGenerator:
     </div>
     
     <script>
-        {self._generate_chart_script(chart_data)}
+        {self._cached("chart", chart_data, lambda: self._generate_chart_script(chart_data))}
     </script>
 </body>
 </html>
@@ -202,9 +291,7 @@ class HTMLReportGenerator:
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>LangChain Performance Benchmark Report</title>
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        {self._get_css_styles()}
-    </style>
+    {self._get_style_block()}
 </head>
 <body>
     <div class="container">
@@ -220,6 +307,8 @@ class HTMLReportGenerator:
             {self._generate_performance_charts(data["benchmark_results"])}
         </div>
         
+        {self._cached("profile", data["benchmark_results"], lambda: self._generate_profile_section(data["benchmark_results"]))}
+        
         <div class="system-info">
             <h2>🖥️ System Information</h2>
             {self._generate_system_info_table(data["system_info"])}
@@ -227,7 +316,7 @@ class HTMLReportGenerator:
     </div>
     
     <script>
-        {self._generate_performance_chart_script(data["benchmark_results"])}
+        {self._cached("perf-chart", data["benchmark_results"], lambda: self._generate_performance_chart_script(data["benchmark_results"]))}
     </script>
 </body>
 </html>
@@ -239,54 +328,176 @@ class HTMLReportGenerator:
         tables_html = ""
         
         for perspective_name, perspective_data in perspectives.items():
-            status_icon = "✅" if perspective_data["success_rate"] >= 80 else "⚠️" if perspective_data["success_rate"] >= 60 else "❌"
-            
-            tables_html += f"""
-            <div class="perspective-section">
-                <h3>{status_icon} {perspective_name.title().replace('_', ' ')}</h3>
-                <div class="perspective-stats">
-                    <span class="stat">Tests: {perspective_data["total"]}</span>
-                    <span class="stat success">Passed: {perspective_data["passed"]}</span>
-                    <span class="stat failure">Failed: {perspective_data["failed"]}</span>
-                    <span class="stat">Success Rate: {perspective_data["success_rate"]:.1f}%</span>
-                    <span class="stat">Duration: {perspective_data["duration"]:.2f}s</span>
-                </div>
+            tables_html += self._cached(
+                "perspective", self._perspective_cache_input(perspective_name, perspective_data),
+                lambda: self._render_perspective_table(perspective_name, perspective_data)
+            )
+            
+        return tables_html
+        
+    def _perspective_cache_input(self, perspective_name: str, perspective_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Only the fields the perspective table reads, so per-test payloads are not hashed"""
+        subcategories = {
+            sub_name: [sub_data["total_tests"], sub_data["passed_tests"], sub_data.get("success_rate", 0)]
+            for sub_name, sub_data in perspective_data["subcategories"].items()
+            if isinstance(sub_data, dict) and "total_tests" in sub_data
+        }
+        stats = {key: perspective_data[key] for key in ("total", "passed", "failed", "success_rate", "duration")}
+        return {"name": perspective_name, "stats": stats, "subcategories": subcategories}
+        
+    def _render_perspective_table(self, perspective_name: str, perspective_data: Dict[str, Any]) -> str:
+        """Render the table for a single perspective"""
+        tables_html = ""
+        
+        status_icon = "✅" if perspective_data["success_rate"] >= 80 else "⚠️" if perspective_data["success_rate"] >= 60 else "❌"
+        
+        tables_html += f"""
+        <div class="perspective-section">
+            <h3>{status_icon} {perspective_name.title().replace('_', ' ')}</h3>
+            <div class="perspective-stats">
+                <span class="stat">Tests: {perspective_data["total"]}</span>
+                <span class="stat success">Passed: {perspective_data["passed"]}</span>
+                <span class="stat failure">Failed: {perspective_data["failed"]}</span>
+                <span class="stat">Success Rate: {perspective_data["success_rate"]:.1f}%</span>
+                <span class="stat">Duration: {perspective_data["duration"]:.2f}s</span>
+            </div>
+            
+            <table class="results-table">
+                <thead>
+                    <tr>
+                        <th>Subcategory</th>
+                        <th>Tests</th>
+                        <th>Passed</th>
+                        <th>Failed</th>
+                        <th>Success Rate</th>
+                    </tr>
+                </thead>
+                <tbody>
+        """
+        
+        for sub_name, sub_data in perspective_data["subcategories"].items():
+            if isinstance(sub_data, dict) and "total_tests" in sub_data:
+                success_rate = sub_data.get("success_rate", 0)
+                status_class = "success" if success_rate >= 80 else "warning" if success_rate >= 60 else "failure"
                 
-                <table class="results-table">
-                    <thead>
-                        <tr>
-                            <th>Subcategory</th>
-                            <th>Tests</th>
-                            <th>Passed</th>
-                            <th>Failed</th>
-                            <th>Success Rate</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-            """
+                tables_html += f"""
+                    <tr class="{status_class}">
+                        <td>{sub_name.title().replace('_', ' ')}</td>
+                        <td>{sub_data["total_tests"]}</td>
+                        <td>{sub_data["passed_tests"]}</td>
+                        <td>{sub_data["total_tests"] - sub_data["passed_tests"]}</td>
+                        <td>{success_rate:.1f}%</td>
+                    </tr>
+                """
+                
+        tables_html += """
+                </tbody>
+            </table>
+        </div>
+        """
             
-            for sub_name, sub_data in perspective_data["subcategories"].items():
-                if isinstance(sub_data, dict) and "total_tests" in sub_data:
-                    success_rate = sub_data.get("success_rate", 0)
-                    status_class = "success" if success_rate >= 80 else "warning" if success_rate >= 60 else "failure"
-                    
-                    tables_html += f"""
-                        <tr class="{status_class}">
-                            <td>{sub_name.title().replace('_', ' ')}</td>
-                            <td>{sub_data["total_tests"]}</td>
-                            <td>{sub_data["passed_tests"]}</td>
-                            <td>{sub_data["total_tests"] - sub_data["passed_tests"]}</td>
-                            <td>{success_rate:.1f}%</td>
-                        </tr>
-                    """
-                    
-            tables_html += """
-                    </tbody>
-                </table>
+        return tables_html
+        
+    def _generate_usage_section(self, usage: Dict[str, Any]) -> str:
+        """Token and /execute payload usage by complexity, category and language (empty for results without usage)"""
+        overall = usage["overall"]
+        if not (overall["prompt_tokens"] or overall["tool_calls_sent"]):
+            return ""
+        return self._cached("usage", usage, lambda: self._render_usage_section(usage))
+        
+    def _render_usage_section(self, usage: Dict[str, Any]) -> str:
+        """Render the usage summary, the per-dimension tables and the per-tool payload table"""
+        overall = usage["overall"]
+        estimated = (f'<span class="stat">Estimated: {overall["estimated_tests"]} tests</span>'
+                     if overall["estimated_tests"] else "")
+        section_html = f"""
+        <div class="usage">
+            <h2>🔢 Token & Payload Usage</h2>
+            <div class="perspective-stats">
+                <span class="stat">Prompt Tokens: {overall["prompt_tokens"]:,}</span>
+                <span class="stat">Completion Tokens: {overall["completion_tokens"]:,}</span>
+                <span class="stat">Prompt Tokens / Turn: {overall["prompt_tokens_per_turn"]:,.0f}</span>
+                <span class="stat">Tool Definitions: {overall["tool_schema_share"]:.1f}% of prompt</span>
+                <span class="stat">Tool Calls: {overall["tool_calls_sent"]}</span>
+                <span class="stat">Sent: {overall["tool_request_bytes"]:,} B</span>
+                <span class="stat">Received: {overall["tool_response_bytes"]:,} B</span>
+                {estimated}
             </div>
+        """
+        
+        for dimension in USAGE_DIMENSIONS:
+            section_html += f"""
+            <h3>By {dimension.title()}</h3>
+            <table class="results-table">
+                <thead>
+                    <tr>
+                        <th>{dimension.title()}</th>
+                        <th>Tests</th>
+                        <th>Turns / Test</th>
+                        <th>Prompt Tokens / Test</th>
+                        <th>Completion Tokens / Test</th>
+                        <th>Prompt Tokens / Turn</th>
+                        <th>Tool Definitions</th>
+                        <th>Tool Calls</th>
+                        <th>Bytes / Tool Call</th>
+                        <th>Avg Time</th>
+                    </tr>
+                </thead>
+                <tbody>
+            """
+            for key, stats in usage[dimension].items():
+                section_html += f"""
+                    <tr>
+                        <td>{html.escape(str(key)).title().replace('_', ' ')}</td>
+                        <td>{stats["tests"]}</td>
+                        <td>{stats["turns_per_test"]:.1f}</td>
+                        <td>{stats["prompt_tokens_per_test"]:,.0f}</td>
+                        <td>{stats["completion_tokens_per_test"]:,.0f}</td>
+                        <td>{stats["prompt_tokens_per_turn"]:,.0f}</td>
+                        <td>{stats["tool_schema_share"]:.1f}%</td>
+                        <td>{stats["tool_calls_sent"]}</td>
+                        <td>{stats["bytes_per_tool_call"]:,.0f}</td>
+                        <td>{stats["avg_execution_time"]:.2f}s</td>
+                    </tr>
+                """
+            section_html += """
+                </tbody>
+            </table>
             """
             
-        return tables_html
+        if usage["by_tool"]:
+            section_html += """
+            <h3>By Tool</h3>
+            <table class="results-table">
+                <thead>
+                    <tr>
+                        <th>Tool</th>
+                        <th>Calls</th>
+                        <th>Bytes Sent</th>
+                        <th>Bytes Received</th>
+                        <th>Bytes / Call</th>
+                    </tr>
+                </thead>
+                <tbody>
+            """
+            for tool_name, tool in sorted(usage["by_tool"].items(), key=lambda item: -item[1]["calls"]):
+                per_call = (tool["request_bytes"] + tool["response_bytes"]) / tool["calls"] if tool["calls"] else 0
+                section_html += f"""
+                    <tr>
+                        <td>{html.escape(tool_name)}</td>
+                        <td>{tool["calls"]}</td>
+                        <td>{tool["request_bytes"]:,}</td>
+                        <td>{tool["response_bytes"]:,}</td>
+                        <td>{per_call:,.0f}</td>
+                    </tr>
+                """
+            section_html += """
+                </tbody>
+            </table>
+            """
+            
+        section_html += "</div>"
+        return section_html
         
     def _generate_performance_summary(self, results: Dict[str, Any]) -> str:
         """Generate performance summary cards"""
@@ -352,6 +563,53 @@ class HTMLReportGenerator:
         
         return table_html
         
+    def _generate_profile_section(self, results: Dict[str, Any]) -> str:
+        """Generate hot function tables for benchmarks run with --profile"""
+        profiled = {name: stats["profile"] for name, stats in results.items()
+                    if isinstance(stats, dict) and "profile" in stats}
+        if not profiled:
+            return ""
+            
+        section_html = """
+        <div class="profile-info">
+            <h2>🔥 Hot Functions</h2>
+        """
+        
+        for test_name, profile in profiled.items():
+            section_html += f"""
+            <h3>{test_name.title().replace('_', ' ')}</h3>
+            <p class="sub-metric">Samples: {profile.get("samples", 0)} /
+               Flame graph input: {profile.get("files", {}).get("collapsed_stacks", "-")}</p>
+            <table class="results-table">
+                <thead>
+                    <tr>
+                        <th>Function</th>
+                        <th>Location</th>
+                        <th>Calls</th>
+                        <th>Own Time (s)</th>
+                        <th>Cumulative (s)</th>
+                    </tr>
+                </thead>
+                <tbody>
+            """
+            for entry in profile.get("hot_functions", []):
+                section_html += f"""
+                    <tr>
+                        <td>{entry["function"]}</td>
+                        <td>{entry["file"]}:{entry["line"]}</td>
+                        <td>{entry["calls"]}</td>
+                        <td>{entry["tottime"]:.3f}</td>
+                        <td>{entry["cumtime"]:.3f}</td>
+                    </tr>
+                """
+            section_html += """
+                </tbody>
+            </table>
+            """
+            
+        section_html += "</div>"
+        return section_html
+        
     def _generate_insights(self, data: Dict[str, Any]) -> str:
         """Generate insights based on test results"""
         insights = []
@@ -564,7 +822,7 @@ class HTMLReportGenerator:
             margin-top: 0.25rem;
         }
         
-        .chart-section, .detailed-results, .insights, .performance-charts, .system-info {
+        .chart-section, .detailed-results, .usage, .insights, .performance-charts, .system-info, .profile-info, .test-details {
             background: white;
             padding: 2rem;
             border-radius: 10px;
@@ -572,7 +830,7 @@ class HTMLReportGenerator:
             margin-bottom: 2rem;
         }
         
-        .chart-section h2, .detailed-results h2, .insights h2, .performance-charts h2, .system-info h2 {
+        .chart-section h2, .detailed-results h2, .usage h2, .insights h2, .performance-charts h2, .system-info h2, .profile-info h2, .test-details h2 {
             margin-bottom: 1.5rem;
             color: #333;
             border-bottom: 2px solid #f0f0f0;
@@ -648,6 +906,20 @@ class HTMLReportGenerator:
             background: #fef2f2;
         }
         
+        .pager {
+            display: flex;
+            gap: 1rem;
+            align-items: center;
+        }
+        
+        .pager button {
+            padding: 0.25rem 0.75rem;
+            border: 1px solid #e5e5e5;
+            border-radius: 4px;
+            background: #f8f9fa;
+            cursor: pointer;
+        }
+        
         .chart-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
@@ -702,9 +974,340 @@ class HTMLReportGenerator:
         """Get the base HTML template"""
         return ""  # Template is generated dynamically
 
-def generate_html_report(results: Dict[str, Any], output_file: str, report_type: str = "comprehensive"):
+def _iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """トップレベルのJSON配列を要素ごとに逐次デコードする（ファイル全体を読み込まない）"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    started = False
+    
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if buffer.startswith("["):
+                buffer = buffer[1:]
+                started = True
+                continue
+        else:
+            buffer = buffer.lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            if buffer:
+                try:
+                    obj, end = decoder.raw_decode(buffer)
+                    # 数値などがチャンク境界で切れている可能性があるため、後続データがある場合のみ確定
+                    if end < len(buffer) or eof:
+                        yield obj
+                        buffer = buffer[end:]
+                        continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    
+        if eof:
+            if started:
+                raise json.JSONDecodeError("Unterminated JSON array", buffer, 0)
+            return
+            
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def flatten_session_results(results: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """ネストされたセッション結果 (perspective -> [subcategory ->] session) をテスト単位に展開"""
+    for perspective_name, perspective_results in results.items():
+        if not isinstance(perspective_results, dict):
+            continue
+        if "results" in perspective_results and "total_tests" in perspective_results:
+            sessions = {perspective_name: perspective_results}
+        else:
+            sessions = perspective_results
+            
+        for sub_name, session_data in sessions.items():
+            if not isinstance(session_data, dict):
+                continue
+            for record in session_data.get("results", []):
+                record = dict(record)
+                record.setdefault("perspective", perspective_name)
+                record.setdefault("subcategory", sub_name)
+                yield record
+
+
+def iter_result_records(input_file: str) -> Iterator[Dict[str, Any]]:
+    """
+    テスト結果ファイルからテスト単位のレコードを遅延読み込みする。
+    
+    対応形式:
+    - JSONL: 1行1テスト結果 (TestResult.to_dict() + perspective/subcategory)
+    - JSON配列: テスト結果の配列（要素ごとに逐次デコード）
+    - JSONオブジェクト: test_comprehensive.py の出力形式（全体を読み込んでから展開）
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        if input_file.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+            
+        first_char = ""
+        while not first_char:
+            char = f.read(1)
+            if not char:
+                return
+            if not char.isspace():
+                first_char = char
+                
+        f.seek(0)
+        if first_char == "[":
+            yield from _iter_json_array(f)
+        else:
+            data = json.load(f)
+            yield from flatten_session_results(data.get("results", data))
+
+
+class StreamingHTMLReportGenerator(HTMLReportGenerator):
+    """
+    大規模な結果セット向けのストリーミングHTMLレポート生成。
+    
+    入力を2回走査する（1回目で集計、2回目で詳細行を出力）ことで、
+    結果件数に関わらずメモリ使用量を一定に保つ。各セクションは生成され次第ファイルに書き出す。
+    詳細テーブルはページ単位の <template> として出力し、表示中のページのみDOMに展開する。
+    """
+    
+    def __init__(self, page_size: int = 200, excerpt_length: int = 160, cache_dir: Optional[str] = None):
+        super().__init__(cache_dir=cache_dir)
+        self.page_size = page_size
+        self.excerpt_length = excerpt_length
+        
+    def generate_streaming_report(self, records: Callable[[], Iterator[Dict[str, Any]]], output_file: str):
+        """Generate a comprehensive report from a re-iterable record source"""
+        self._asset_dir = os.path.dirname(os.path.abspath(output_file))
+        data = self._aggregate_records(records())
+        
+        labels = list(data["perspectives"].keys())
+        chart_data = {
+            "labels": labels,
+            "success_rates": [data["perspectives"][p]["success_rate"] for p in labels]
+        }
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(self._stream_header(data))
+            
+            f.write('<div class="detailed-results">\n<h2>📋 Detailed Results</h2>\n')
+            f.write(self._generate_perspective_tables(data["perspectives"]))
+            f.write('</div>\n')
+            f.write(self._generate_usage_section(data["usage"]))
+            
+            if data["perspectives"]:
+                f.write('<div class="insights">\n<h2>💡 Key Insights</h2>\n')
+                f.write(self._generate_insights(data))
+                f.write('</div>\n')
+                
+            page_count = self._stream_test_details(records(), f)
+            
+            f.write("</div>\n<script>\n")
+            f.write(self._cached("chart", chart_data, lambda: self._generate_chart_script(chart_data)))
+            f.write(self._generate_pager_script(page_count))
+            f.write("</script>\n</body>\n</html>\n")
+            
+        self._print_cache_stats()
+        print(f"📄 HTML report generated: {output_file}")
+        
+    def _aggregate_records(self, records: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregate counters per perspective and subcategory in a single pass"""
+        perspectives: Dict[str, Dict[str, Any]] = {}
+        total_tests = 0
+        total_passed = 0
+        total_duration = 0.0
+        usage = UsageAggregator()
+        
+        for record in records:
+            usage.add(record)
+            perspective_name = record.get("perspective") or record.get("category", "unknown")
+            sub_name = record.get("subcategory") or perspective_name
+            passed = bool(record.get("success"))
+            duration = record.get("execution_time", 0) or 0
+            
+            perspective = perspectives.setdefault(perspective_name, {
+                "total": 0, "passed": 0, "duration": 0.0, "subcategories": {}
+            })
+            sub = perspective["subcategories"].setdefault(sub_name, {"total_tests": 0, "passed_tests": 0})
+            
+            perspective["total"] += 1
+            perspective["duration"] += duration
+            sub["total_tests"] += 1
+            if passed:
+                perspective["passed"] += 1
+                sub["passed_tests"] += 1
+                
+            total_tests += 1
+            total_passed += 1 if passed else 0
+            total_duration += duration
+            
+        for perspective in perspectives.values():
+            perspective["failed"] = perspective["total"] - perspective["passed"]
+            perspective["success_rate"] = (perspective["passed"] / perspective["total"] * 100) if perspective["total"] > 0 else 0
+            for sub in perspective["subcategories"].values():
+                sub["success_rate"] = (sub["passed_tests"] / sub["total_tests"] * 100) if sub["total_tests"] > 0 else 0
+                
+        return {
+            "overall": {
+                "total_tests": total_tests,
+                "total_passed": total_passed,
+                "total_failed": total_tests - total_passed,
+                "success_rate": (total_passed / total_tests * 100) if total_tests > 0 else 0,
+                "total_duration": total_duration
+            },
+            "perspectives": perspectives,
+            "usage": usage.breakdown(),
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        
+    def _stream_header(self, data: Dict[str, Any]) -> str:
+        """Document head, summary cards and chart container"""
+        return f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>LangChain Function Calling Test Report</title>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    {self._get_style_block()}
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>🧪 LangChain Function Calling Test Report</h1>
+            <p class="timestamp">Generated: {data["timestamp"]}</p>
+        </header>
+        
+        <div class="summary-cards">
+            <div class="card">
+                <h3>Total Tests</h3>
+                <div class="metric">{data["overall"]["total_tests"]}</div>
+            </div>
+            <div class="card success">
+                <h3>Passed</h3>
+                <div class="metric">{data["overall"]["total_passed"]}</div>
+            </div>
+            <div class="card failure">
+                <h3>Failed</h3>
+                <div class="metric">{data["overall"]["total_failed"]}</div>
+            </div>
+            <div class="card">
+                <h3>Success Rate</h3>
+                <div class="metric">{data["overall"]["success_rate"]:.1f}%</div>
+            </div>
+        </div>
+        
+        <div class="chart-section">
+            <h2>📊 Success Rate by Perspective</h2>
+            <canvas id="successRateChart" width="400" height="200"></canvas>
+        </div>
+"""
+        
+    def _stream_test_details(self, records: Iterator[Dict[str, Any]], f: TextIO) -> int:
+        """Write per-test rows as paginated templates, returning the page count"""
+        f.write("""
+        <div class="test-details">
+            <h2>🔎 Test Details</h2>
+            <div class="pager">
+                <button onclick="showPage(currentPage - 1)">&laquo;</button>
+                <span id="pageLabel"></span>
+                <button onclick="showPage(currentPage + 1)">&raquo;</button>
+            </div>
+            <table class="results-table">
+                <thead>
+                    <tr>
+                        <th>Test ID</th>
+                        <th>Perspective</th>
+                        <th>Complexity</th>
+                        <th>Language</th>
+                        <th>Result</th>
+                        <th>Time (s)</th>
+                        <th>Functions</th>
+                        <th>Response / Error</th>
+                    </tr>
+                </thead>
+                <tbody id="detailRows"></tbody>
+            </table>
+""")
+        page_count = 0
+        rows_in_page = 0
+        
+        for record in records:
+            if rows_in_page == 0:
+                f.write(f'<template id="page-{page_count}">\n')
+                
+            f.write(self._render_detail_row(record))
+            rows_in_page += 1
+            
+            if rows_in_page >= self.page_size:
+                f.write("</template>\n")
+                page_count += 1
+                rows_in_page = 0
+                
+        if rows_in_page > 0:
+            f.write("</template>\n")
+            page_count += 1
+            
+        f.write("</div>\n")
+        return page_count
+        
+    def _render_detail_row(self, record: Dict[str, Any]) -> str:
+        """Render a single escaped table row"""
+        passed = bool(record.get("success"))
+        excerpt = record.get("error_message") or record.get("agent_response") or ""
+        if len(excerpt) > self.excerpt_length:
+            excerpt = excerpt[-self.excerpt_length:]
+        functions = ", ".join(record.get("actual_functions") or [])
+        
+        return (
+            f'<tr class="{"success" if passed else "failure"}">'
+            f'<td>{html.escape(str(record.get("test_id", "")))}</td>'
+            f'<td>{html.escape(str(record.get("perspective", record.get("category", ""))))}</td>'
+            f'<td>{html.escape(str(record.get("complexity", "")))}</td>'
+            f'<td>{html.escape(str(record.get("language", "")))}</td>'
+            f'<td>{"✅" if passed else "❌"}</td>'
+            f'<td>{record.get("execution_time", 0) or 0:.2f}</td>'
+            f'<td>{html.escape(functions)}</td>'
+            f'<td>{html.escape(excerpt)}</td>'
+            f'</tr>\n'
+        )
+        
+    def _generate_pager_script(self, page_count: int) -> str:
+        """Generate JavaScript that mounts one detail page at a time"""
+        return f"""
+        const pageCount = {page_count};
+        let currentPage = 0;
+        function showPage(page) {{
+            if (pageCount === 0) {{
+                document.getElementById('pageLabel').textContent = 'No results';
+                return;
+            }}
+            currentPage = Math.max(0, Math.min(pageCount - 1, page));
+            const body = document.getElementById('detailRows');
+            body.replaceChildren(document.getElementById('page-' + currentPage).content.cloneNode(true));
+            document.getElementById('pageLabel').textContent = 'Page ' + (currentPage + 1) + ' / ' + pageCount;
+        }}
+        showPage(0);
+        """
+
+
+def generate_streaming_html_report(input_file: str, output_file: str, page_size: int = 200,
+                                   cache_dir: Optional[str] = None):
+    """Generate a comprehensive report by streaming records from a JSON/JSONL results file"""
+    generator = StreamingHTMLReportGenerator(page_size=page_size, cache_dir=cache_dir)
+    generator.generate_streaming_report(lambda: iter_result_records(input_file), output_file)
+
+def generate_html_report(results: Dict[str, Any], output_file: str, report_type: str = "comprehensive",
+                         cache_dir: Optional[str] = None):
     """Main function to generate HTML reports"""
-    generator = HTMLReportGenerator()
+    generator = HTMLReportGenerator(cache_dir=cache_dir)
     
     if report_type == "performance":
         generator.generate_performance_report(results, output_file)
@@ -718,14 +1321,23 @@ def main():
     parser.add_argument("--output", type=str, default="report.html", help="Output HTML file")
     parser.add_argument("--type", type=str, choices=["comprehensive", "performance"], 
                        default="comprehensive", help="Report type")
+    parser.add_argument("--stream", action="store_true",
+                       help="Stream records from a JSON/JSONL results file with constant memory")
+    parser.add_argument("--page-size", type=int, default=200, help="Rows per detail page in streaming mode")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                       help="Reuse rendered fragments for unchanged sections and emit CSS as a shared file")
     
     args = parser.parse_args()
     
     try:
+        if args.stream:
+            generate_streaming_html_report(args.input, args.output, args.page_size, args.cache_dir)
+            return 0
+            
         with open(args.input, 'r', encoding='utf-8') as f:
             results = json.load(f)
             
-        generate_html_report(results, args.output, args.type)
+        generate_html_report(results, args.output, args.type, args.cache_dir)
         
         return 0
         
@@ -7,9 +7,8 @@ import time
 import json
 import re
 import traceback
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 from datetime import datetime
-import requests
 from langchain_client import create_agent
 
 class TestResult:
@@ -30,6 +29,23 @@ class TestResult:
         self.function_calls_log = []
         self.complexity = ""
         self.language = ""
+        self.llm_cache_hits = 0
+        self.llm_cache_misses = 0
+        self.llm_latency_saved = 0.0
+        self.model_turns = 0
+        self.trajectory_cache_hit = False
+        self.rejected_tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_schema_tokens = 0
+        self.token_usage_estimated = False
+        self.turn_token_usage: List[Dict[str, Any]] = []
+        self.tool_calls_sent = 0
+        self.tool_request_bytes = 0
+        self.tool_response_bytes = 0
+        self.tool_payloads: Dict[str, Dict[str, int]] = {}
+        self.time_to_first_token: Optional[float] = None
+        self.time_to_first_tool_call: Optional[float] = None
         
     def to_dict(self) -> Dict[str, Any]:
         """テスト結果をJSON シリアライゼーション用の辞書に変換"""
@@ -48,7 +64,24 @@ class TestResult:
             "agent_response": self.agent_response,
             "function_calls_log": self.function_calls_log,
             "complexity": self.complexity,
-            "language": self.language
+            "language": self.language,
+            "llm_cache_hits": self.llm_cache_hits,
+            "llm_cache_misses": self.llm_cache_misses,
+            "llm_latency_saved": self.llm_latency_saved,
+            "model_turns": self.model_turns,
+            "trajectory_cache_hit": self.trajectory_cache_hit,
+            "rejected_tool_calls": self.rejected_tool_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_schema_tokens": self.tool_schema_tokens,
+            "token_usage_estimated": self.token_usage_estimated,
+            "turn_token_usage": self.turn_token_usage,
+            "tool_calls_sent": self.tool_calls_sent,
+            "tool_request_bytes": self.tool_request_bytes,
+            "tool_response_bytes": self.tool_response_bytes,
+            "tool_payloads": self.tool_payloads,
+            "time_to_first_token": self.time_to_first_token,
+            "time_to_first_tool_call": self.time_to_first_tool_call
         }
 
 class TestSession:
@@ -88,6 +121,11 @@ class TestSession:
             return 0.0
         return (self.passed_tests / self.total_tests) * 100
         
+    def get_usage_breakdown(self) -> Dict[str, Any]:
+        """Token and /execute payload usage, overall and by complexity, category and language"""
+        from usage_accounting import usage_breakdown
+        return usage_breakdown(result.to_dict() for result in self.results)
+        
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary for JSON serialization"""
         return {
@@ -100,21 +138,27 @@ class TestSession:
             "success_rate": self.get_success_rate(),
             "server_available": self.server_available,
             "agent_initialized": self.agent_initialized,
+            "usage": self.get_usage_breakdown(),
             "results": [result.to_dict() for result in self.results]
         }
 
 class TestExecutor:
     """Main test execution engine"""
     
-    def __init__(self, server_url: str = "http://localhost:8080"):
+    def __init__(self, server_url: str = "http://localhost:8080", parallel_tool_calls: bool = False,
+                 tool_descriptions: Optional[Dict[str, str]] = None, max_tools: Optional[int] = None):
         self.server_url = server_url
+        self.parallel_tool_calls = parallel_tool_calls
+        self.tool_descriptions = tool_descriptions
+        self.max_tools = max_tools
         self.agent = None
         self.session = TestSession()
         
     def check_server_availability(self) -> bool:
         """Check if C# server is running and available"""
         try:
-            response = requests.get(f"{self.server_url}/tools", timeout=5)
+            from csharp_tools import get_http_session
+            response = get_http_session().get(f"{self.server_url}/tools", timeout=5)
             self.session.server_available = response.status_code == 200
             return self.session.server_available
         except Exception as e:
@@ -125,7 +169,8 @@ class TestExecutor:
     def initialize_agent(self) -> bool:
         """Initialize LangChain agent"""
         try:
-            self.agent = create_agent()
+            self.agent = create_agent(parallel_tool_calls=self.parallel_tool_calls, server_url=self.server_url,
+                                      tool_descriptions=self.tool_descriptions, max_tools=self.max_tools)
             self.session.agent_initialized = True
             return True
         except Exception as e:
@@ -392,6 +437,13 @@ class TestExecutor:
         else:
             result.language = "english"
             
+        # エージェント実行時にのみ必要なモジュール（LangChainを読み込む）
+        from agent_callbacks import ModelTurnCounter, StreamTimingHandler, TokenUsageCounter
+        from csharp_tools import record_payloads
+        from llm_cache import get_active_llm_cache, record_cache_usage
+        from schema_validator import record_validation
+        
+        llm_cache = get_active_llm_cache()
         start_time = time.time()
         
         try:
@@ -407,8 +459,14 @@ class TestExecutor:
             old_stdout = sys.stdout
             sys.stdout = captured_output
             
+            turn_counter = ModelTurnCounter()
+            timing = StreamTimingHandler()
+            token_usage = TokenUsageCounter()
             try:
-                response = self.agent.invoke({"input": result.prompt})
+                with record_payloads() as payloads, record_cache_usage() as cache_usage, \
+                        record_validation() as validation:
+                    response = self.agent.invoke({"input": result.prompt},
+                                                 config={"callbacks": [turn_counter, timing, token_usage]})
                 
                 # 標準出力を復元
                 sys.stdout = old_stdout
@@ -417,6 +475,7 @@ class TestExecutor:
                 # レスポンスと詳細ログを結合
                 if isinstance(response, dict):
                     final_output = response.get("output", str(response))
+                    result.trajectory_cache_hit = bool(response.get("trajectory_cache_hit"))
                 else:
                     final_output = str(response)
                 
@@ -429,6 +488,15 @@ class TestExecutor:
             finally:
                 # 必ず標準出力を復元
                 sys.stdout = old_stdout
+                result.model_turns = turn_counter.turns
+                result.time_to_first_token = timing.time_to_first_token
+                result.time_to_first_tool_call = timing.time_to_first_tool_call
+                self._record_usage(result, token_usage, payloads)
+                result.rejected_tool_calls = validation.rejected
+                if llm_cache is not None:
+                    result.llm_cache_hits = cache_usage.hits
+                    result.llm_cache_misses = cache_usage.misses
+                    result.llm_latency_saved = cache_usage.saved_seconds
             
             # Extract function calls
             result.actual_functions = self.extract_function_calls(result.agent_response)
@@ -446,6 +514,19 @@ class TestExecutor:
         result.execution_time = time.time() - start_time
         return result
         
+    def _record_usage(self, result: TestResult, token_usage, payloads):
+        """Copy token counts and /execute payload sizes collected during the agent run into the result"""
+        totals = token_usage.totals()
+        result.prompt_tokens = totals["prompt_tokens"]
+        result.completion_tokens = totals["completion_tokens"]
+        result.tool_schema_tokens = totals["tool_schema_tokens"]
+        result.token_usage_estimated = totals["estimated"]
+        result.turn_token_usage = token_usage.turns
+        result.tool_calls_sent = payloads.calls
+        result.tool_request_bytes = payloads.request_bytes
+        result.tool_response_bytes = payloads.response_bytes
+        result.tool_payloads = payloads.by_tool
+        
     def evaluate_test_success(self, test_data: Dict[str, Any], result: TestResult) -> bool:
         """テストが成功したかどうかを評価（詳細デバッグ付き）"""
         
@@ -523,12 +604,15 @@ class TestExecutor:
         
         return final_success
         
-    def run_test_suite(self, test_suite: List[Dict[str, Any]], 
+    def run_test_suite(self, test_suite: Iterable[Dict[str, Any]], 
                       max_tests: Optional[int] = None) -> TestSession:
-        """Run a complete test suite"""
+        """Run a complete test suite (a list, or any iterable such as test_generator.iter_corpus)"""
         
         print("Starting test suite execution...")
-        print(f"Total tests to run: {len(test_suite) if not max_tests else min(max_tests, len(test_suite))}")
+        if hasattr(test_suite, "__len__"):
+            print(f"Total tests to run: {len(test_suite) if not max_tests else min(max_tests, len(test_suite))}")
+        else:
+            print(f"Total tests to run: {max_tests if max_tests else 'streaming'}")
         
         # Pre-flight checks
         if not self.check_server_availability():
@@ -595,6 +679,74 @@ def save_test_results(session: TestSession, filename: str):
         json.dump(session.to_dict(), f, ensure_ascii=False, indent=2)
     print(f"Results saved to {filename}")
 
+def save_test_results_jsonl(session: TestSession, filename: str, perspective: Optional[str] = None,
+                           subcategory: Optional[str] = None, mode: str = 'a'):
+    """Write test results as JSONL (one result per line) for streaming reports"""
+    with open(filename, mode, encoding='utf-8') as f:
+        for result in session.results:
+            record = result.to_dict()
+            if perspective:
+                record["perspective"] = perspective
+                record["subcategory"] = subcategory or perspective
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def add_runtime_arguments(parser):
+    """Add the record/replay, LLM cache, trajectory cache and tool transport options shared by the test scripts"""
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record-cassette", type=str, metavar="PATH",
+                               help="Record all model and tool traffic to a cassette file")
+    cassette_group.add_argument("--replay-cassette", type=str, metavar="PATH",
+                               help="Replay model and tool traffic from a cassette file")
+    parser.add_argument("--llm-cache", type=str, metavar="DIR",
+                        help="Reuse identical chat-completion responses from an on-disk cache")
+    parser.add_argument("--llm-cache-ttl", type=float, default=168.0, metavar="HOURS",
+                        help="Expire cached responses after this many hours (default: 168)")
+    parser.add_argument("--llm-cache-max-mb", type=float, default=256.0, metavar="MB",
+                        help="Evict least recently used responses above this size (default: 256)")
+    parser.add_argument("--trajectory-cache", type=str, metavar="DIR",
+                        help="Replay cached tool-call trajectories for repeated prompts without calling the model")
+    parser.add_argument("--tool-retries", type=int, metavar="N",
+                        help="Retry failed tool calls up to N attempts with jittered exponential backoff")
+    parser.add_argument("--circuit-breaker", type=int, metavar="FAILURES",
+                        help="Fail tool calls fast after FAILURES consecutive failures of a server")
+    parser.add_argument("--hedge-percentile", type=float, metavar="P",
+                        help="Send a hedged duplicate of a tool call slower than the P-th latency percentile")
+
+def apply_runtime_arguments(args):
+    """Enable the options added by add_runtime_arguments (before agents are created)"""
+    if args.record_cassette:
+        from cassette import use_cassette
+        use_cassette(args.record_cassette, mode="record")
+    elif args.replay_cassette:
+        from cassette import use_cassette
+        use_cassette(args.replay_cassette, mode="replay")
+    if args.llm_cache:
+        from llm_cache import use_llm_cache
+        use_llm_cache(args.llm_cache, ttl_seconds=args.llm_cache_ttl * 3600, max_mb=args.llm_cache_max_mb)
+    if args.trajectory_cache:
+        from trajectory_cache import use_trajectory_cache
+        use_trajectory_cache(args.trajectory_cache)
+    if args.tool_retries or args.circuit_breaker or args.hedge_percentile:
+        from tool_transport import use_tool_transport, RetryPolicy
+        use_tool_transport(retry=RetryPolicy(args.tool_retries) if args.tool_retries else None,
+                           failure_threshold=args.circuit_breaker, hedge_percentile=args.hedge_percentile)
+
+def print_runtime_stats(args):
+    """Print statistics of the options enabled by apply_runtime_arguments"""
+    if args.record_cassette or args.replay_cassette:
+        from cassette import print_cassette_stats
+        print_cassette_stats()
+    if args.llm_cache:
+        from llm_cache import print_llm_cache_stats
+        print_llm_cache_stats()
+    if args.trajectory_cache:
+        from trajectory_cache import print_trajectory_cache_stats
+        print_trajectory_cache_stats()
+    from schema_validator import print_validation_stats
+    print_validation_stats()
+    from tool_transport import print_tool_transport_stats
+    print_tool_transport_stats()
+
 def load_test_results(filename: str) -> Dict[str, Any]:
     """Load test results from JSON file"""
     with open(filename, 'r', encoding='utf-8') as f:
@@ -615,6 +767,25 @@ def print_test_summary(session: TestSession):
     print(f"❌ Failed: {session.failed_tests}")
     print(f"📈 Success Rate: {session.get_success_rate():.1f}%")
     
+    cache_hits = sum(r.llm_cache_hits for r in session.results)
+    cache_lookups = cache_hits + sum(r.llm_cache_misses for r in session.results)
+    if cache_lookups:
+        print(f"💾 LLM Cache: {cache_hits}/{cache_lookups} hits ({cache_hits / cache_lookups * 100:.1f}%), "
+              f"{sum(r.llm_latency_saved for r in session.results):.2f}s latency saved")
+    
+    trajectory_hits = sum(1 for r in session.results if r.trajectory_cache_hit)
+    if trajectory_hits:
+        print(f"🧭 Trajectory Cache: {trajectory_hits}/{session.total_tests} tests answered without the model "
+              f"({trajectory_hits / session.total_tests * 100:.1f}%)")
+    
+    rejected_calls = sum(r.rejected_tool_calls for r in session.results)
+    if rejected_calls:
+        print(f"🛡️  Schema Validation: {rejected_calls} invalid tool calls rejected locally "
+              f"({rejected_calls} server round-trips saved)")
+    
+    from usage_accounting import print_usage_breakdown
+    print_usage_breakdown(session.get_usage_breakdown())
+    
     # Breakdown by category
     categories = {}
     for result in session.results:
@@ -0,0 +1,218 @@
+"""
+ツール説明のトークン計測とコンパクトな説明の作成
+
+/tools のツール定義（FunctionServer.GetToolDefinitions）は prime_factorization や factorial のように
+複数段落の日本語の説明を持ち、エージェントの全ターンでプロンプトに含まれる。
+このモジュールは各ツール定義がプロンプトに加えるトークン数を計測し、説明の短縮版（バリアント）を作成する。
+バリアントの成功率・実行時間への影響は test_performance.py --benchmark-tool-descriptions で A/B 比較する。
+
+バリアント:
+- full: サーバーの説明そのまま
+- compact: 最初の段落と制約の箇条書き（節ごとに1行にまとめる）、使用例は最初の1件のみ。
+  結果の型・エラーハンドリングの節と使用例の後の締めくくりの文は削除
+- minimal: 最初の1行のみ
+- --variants で指定した JSON ファイル（{"バリアント名": {"ツール名": "説明", ...}}）の手書きのバリアント
+
+トークン数は LangChain がモデルに送る関数定義（name, description, parameters の JSON）を tiktoken の
+o200k_base（gpt-4.1 のエンコーディング）で数える。エンコーディングを取得できない環境では文字数から概算する。
+
+使用方法:
+    python tool_descriptions.py                                  # http://localhost:8080 のツールを計測
+    python tool_descriptions.py --server http://localhost:8081 --show compact
+    python tool_descriptions.py --save tool_description_variants.json
+    python test_performance.py --benchmark-tool-descriptions compact minimal
+"""
+
+import re
+import sys
+import json
+import argparse
+from typing import Dict, Any, List, Optional, Callable
+
+# compact で削除する節（モデルの関数選択・引数の組み立てに使われない説明）
+COMPACT_DROP_SECTIONS = ("結果の型", "エラーハンドリング")
+# compact で最初の1件だけ残す節
+COMPACT_EXAMPLE_SECTIONS = ("使用例",)
+
+SECTION_HEADER_PATTERN = re.compile(r"^([^-\s][^:：]*)[:：]$")
+
+TOKEN_ENCODING = "o200k_base"
+_encoding = None
+_encoding_loaded = False
+
+
+def _split_paragraphs(text: str) -> List[List[str]]:
+    paragraphs = [[line.strip() for line in block.splitlines() if line.strip()]
+                  for block in re.split(r"\n\s*\n", text.strip())]
+    return [lines for lines in paragraphs if lines]
+
+
+def compact_description(text: str) -> str:
+    """最初の段落と制約を残し、1つの節を1行にまとめた説明"""
+    paragraphs = _split_paragraphs(text)
+    if not paragraphs:
+        return text
+    lines = [" ".join(paragraphs[0])]
+    after_examples = False
+    for paragraph in paragraphs[1:]:
+        header = SECTION_HEADER_PATTERN.match(paragraph[0])
+        body = paragraph[1:] if header else paragraph
+        if header and header.group(1).startswith(COMPACT_DROP_SECTIONS):
+            continue
+        if header and header.group(1).startswith(COMPACT_EXAMPLE_SECTIONS):
+            body = body[:1]
+            after_examples = True
+        elif not header and after_examples:
+            # 使用例の後の締めくくりの文は制約の繰り返しのため残さない
+            continue
+        items = [(line[2:] if line.startswith("- ") else line).rstrip("。") for line in body]
+        # 最初の段落と同じ内容の繰り返しは残さない
+        items = [item for item in items if item not in lines[0]]
+        if items:
+            lines.append((f"{header.group(1)}: " if header else "") + "; ".join(items))
+    return "\n".join(lines)
+
+
+def minimal_description(text: str) -> str:
+    """最初の1行のみの説明"""
+    stripped = text.strip()
+    return stripped.splitlines()[0] if stripped else text
+
+
+# バリアント名 -> 説明の変換
+VARIANT_BUILDERS: Dict[str, Callable[[str], str]] = {
+    "compact": compact_description,
+    "minimal": minimal_description,
+}
+
+
+def build_variants(tool_defs: List[Dict[str, Any]],
+                   extra_variants: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Dict[str, str]]:
+    """
+    バリアント名 -> {ツール名: 説明} を作成する（full はサーバーの説明そのまま）
+
+    extra_variants の手書きのバリアントで指定のないツールはサーバーの説明を使う
+    """
+    full = {tool["name"]: tool["description"] for tool in tool_defs}
+    variants = {"full": full}
+    for name, builder in VARIANT_BUILDERS.items():
+        variants[name] = {tool_name: builder(description) for tool_name, description in full.items()}
+    for name, descriptions in (extra_variants or {}).items():
+        variants[name] = dict(full, **descriptions)
+    return variants
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception:
+            # tiktoken がない、またはエンコーディングをダウンロードできない（オフライン）場合は概算する
+            _encoding = None
+    return _encoding
+
+
+def token_counter_name() -> str:
+    if _get_encoding() is not None:
+        return f"tiktoken {TOKEN_ENCODING}"
+    return "estimate: ASCII 4 chars/token, others 1 char/token"
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def function_definition(tool_def: Dict[str, Any], description: Optional[str] = None) -> Dict[str, Any]:
+    """LangChain がモデルに送る関数定義（CSharpFunctionTool を変換したもの）"""
+    from langchain_core.utils.function_calling import convert_to_openai_function
+    from csharp_tools import CSharpFunctionTool
+    tool = CSharpFunctionTool(name=tool_def["name"],
+                              description=description if description is not None else tool_def["description"],
+                              parameters_schema=tool_def.get("parameters", {}))
+    return convert_to_openai_function(tool)
+
+
+def measure_tool_tokens(tool_defs: List[Dict[str, Any]],
+                        descriptions: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """ツール名 -> 関数定義のトークン数（descriptions で説明を置き換えて計測）"""
+    descriptions = descriptions or {}
+    return {tool["name"]: count_tokens(json.dumps(function_definition(tool, descriptions.get(tool["name"])),
+                                                  ensure_ascii=False))
+            for tool in tool_defs}
+
+
+def measure_variants(tool_defs: List[Dict[str, Any]], variants: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    """各バリアントのツールごとのトークン数と合計（1ターンあたりにプロンプトへ加わる量）"""
+    results = {"counter": token_counter_name(), "variants": {}}
+    for name, descriptions in variants.items():
+        per_tool = measure_tool_tokens(tool_defs, descriptions)
+        results["variants"][name] = {"per_tool": per_tool, "total": sum(per_tool.values())}
+    return results
+
+
+def fetch_tool_definitions(server_url: str = "http://localhost:8080") -> List[Dict[str, Any]]:
+    from csharp_tools import get_http_session
+    response = get_http_session().get(f"{server_url}/tools", timeout=30)
+    response.raise_for_status()
+    return response.json().get("tools", [])
+
+
+def load_variants_file(path: str) -> Dict[str, Dict[str, str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_token_report(results: Dict[str, Any]):
+    variants = results["variants"]
+    names = list(variants)
+    print(f"\n📏 Tool definition tokens per model turn ({results['counter']})")
+    print(f"  {'Tool':<28}" + "".join(f"{name:>12}" for name in names))
+    for tool_name in variants["full"]["per_tool"]:
+        print(f"  {tool_name:<28}" + "".join(f"{variants[name]['per_tool'][tool_name]:>12,}" for name in names))
+    print(f"  {'TOTAL':<28}" + "".join(f"{variants[name]['total']:>12,}" for name in names))
+    full_total = variants["full"]["total"]
+    for name in names[1:]:
+        saved = full_total - variants[name]["total"]
+        print(f"  {name}: {saved:,} tokens saved per turn ({saved / full_total * 100 if full_total else 0:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tool-definition tokens and build compact description variants")
+    parser.add_argument("--server", type=str, default="http://localhost:8080", help="Function server URL")
+    parser.add_argument("--variants", type=str, metavar="FILE",
+                        help="JSON file with hand-written variants: {variant: {tool: description}}")
+    parser.add_argument("--show", type=str, metavar="VARIANT", help="Print the descriptions of a variant")
+    parser.add_argument("--save", type=str, metavar="FILE", help="Save all variants as JSON (editable, reusable with --variants)")
+    args = parser.parse_args()
+
+    try:
+        tool_defs = fetch_tool_definitions(args.server)
+        variants = build_variants(tool_defs, load_variants_file(args.variants) if args.variants else None)
+        print_token_report(measure_variants(tool_defs, variants))
+
+        if args.show:
+            if args.show not in variants:
+                raise Exception(f"Unknown variant: {args.show} (available: {', '.join(variants)})")
+            for tool_name, description in variants[args.show].items():
+                print(f"\n===== {tool_name}\n{description}")
+
+        if args.save:
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(variants, f, ensure_ascii=False, indent=2)
+            print(f"\n📁 Variants saved to {args.save}")
+        return 0
+
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
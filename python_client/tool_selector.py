@@ -0,0 +1,438 @@
+"""
+プロンプトごとのツールの事前選択（ローカル、ネットワーク不要）
+
+create_openai_functions_agent はすべてのツール定義を毎ターンのプロンプトに含めるが、多くのプロンプトが
+必要とするのは1〜2個のツールだけである。このモジュールはツール名・説明・キーワードの文字 n-gram の
+TF-IDF 類似度でプロンプトに関係しそうなツールを選び、モデルにはそのツールだけを渡す。
+
+- 文字 2-gram / 3-gram（NFKC 正規化、小文字化、数字の並びは # に置換）で、日本語・英語の両方に単語分割なしで対応する
+- ツール名・説明の最初の行に加え、既知のツールは TOOL_KEYWORDS の同義語（日本語・英語）も索引に含める
+- プロンプトに含まれるキーワード（ツール名・TOOL_KEYWORDS の語）のツールはすべて選び、
+  残りは類似度が最高スコアの min_relative_score 倍以上のツールで max_tools 個まで補う。
+  選んだツールのバッチ版（<name>_batch）も加える
+- 安全なフォールバック: キーワードが1つも含まれず、類似度の最高スコアも min_score 未満
+  （関係するツールを判断できない）なら全ツールを渡す。
+  選択が外れた場合（モデルが存在しないツール名を返した、またはキーワードなしで選んだツールを1つも使わずに
+  回答した）も、その時点で打ち切って全ツールで実行し直す（ToolSubsettingAgent）。ツールの実行エラーはそのまま返す
+
+使用方法:
+    from tool_selector import ToolSelector
+    selector = ToolSelector(tools)                # name / description 属性を持つツール（または /tools の定義）
+    selector.select("84を素因数分解してください")   # ["prime_factorization", "prime_factorization_batch"]
+
+    python tool_selector.py --benchmark                          # カタログを拡大しながら選択時間・トークン・再現率を計測
+    python tool_selector.py --benchmark --sizes 21 100 500 2000
+    python test_performance.py --benchmark-tool-subsetting       # 全ツール/選択したツールで A/B 比較（モデルを使用）
+"""
+
+import re
+import sys
+import math
+import time
+import random
+import argparse
+import statistics
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_MAX_TOOLS = 6
+DEFAULT_MIN_SCORE = 0.2
+DEFAULT_MIN_RELATIVE_SCORE = 0.5
+NGRAM_SIZES = (2, 3)
+
+# 既知のツールの同義語（空白区切り、説明に現れない言い回し・英語のプロンプト用、# は数字の並び）
+TOOL_KEYWORDS: Dict[str, str] = {
+    "prime_factorization": "素因数分解 素因数 因数分解 約数 prime factorization factorize factors",
+    "sum": "合計 総和 の和 足し算 足す 加算 sum add total plus",
+    "multiply": "の積 と積 掛け算 掛け合わせ 掛ける 乗算 multiply product times",
+    "divide": "割り算 割る 除算 divide division quotient",
+    "power": "べき乗 累乗 二乗 三乗 #乗 ^ power exponent squared cubed",
+    "factorial": "階乗 factorial",
+    "gcd": "最大公約数 公約数 greatest common divisor gcd",
+    "lcm": "最小公倍数 公倍数 least common multiple lcm",
+    "is_prime": "素数 素数判定 prime number primality",
+    "square_root": "平方根 ルート square root sqrt",
+    "abs": "絶対値 absolute value",
+    "modulo": "剰余 余り remainder modulo",
+    "max": "最大値 最大 一番大き 最も大き maximum largest max",
+    "min": "最小値 最小 一番小さ 最も小さ minimum smallest min",
+    "average": "平均 平均値 average mean",
+    "map": "それぞれ すべて 全て 各数 each every",
+    "compose": "次に その結果 得られた 最後に then",
+}
+
+_DIGITS_PATTERN = re.compile(r"[0-9][0-9,.]*")
+_SPACES_PATTERN = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower().replace("_", " ")
+    return _SPACES_PATTERN.sub(" ", _DIGITS_PATTERN.sub("#", text)).strip()
+
+
+def _keyword_pattern(keyword: str) -> "re.Pattern":
+    """英字のキーワードは単語単位（"add" が "address" に一致しない）、それ以外は部分文字列で一致させる"""
+    escaped = re.escape(keyword)
+    return re.compile(rf"\b{escaped}\b" if re.fullmatch(r"[a-z ]+", keyword) else escaped)
+
+
+def ngrams(text: str) -> set:
+    """正規化したテキストの文字 n-gram の集合"""
+    text = _normalize(text)
+    return {gram for n in NGRAM_SIZES for gram in (text[i:i + n] for i in range(len(text) - n + 1)) if " " not in gram}
+
+
+def _tool_fields(tool: Any) -> tuple:
+    if isinstance(tool, dict):
+        return tool["name"], tool.get("description", "")
+    return tool.name, tool.description
+
+
+class ToolSelector:
+    """ツール名・説明の文字 n-gram による TF-IDF 類似度でプロンプトに関係するツールを選ぶ"""
+
+    def __init__(self, tools: Sequence[Any], max_tools: int = DEFAULT_MAX_TOOLS, min_score: float = DEFAULT_MIN_SCORE,
+                 min_relative_score: float = DEFAULT_MIN_RELATIVE_SCORE,
+                 keywords: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            tools: name / description を持つツール（LangChain のツール、または /tools の定義の辞書）
+            max_tools: 選択するツールの最大数（バッチ版の追加分を除く）
+            min_score: 最高スコアがこれ未満なら全ツールにフォールバックする
+            min_relative_score: 最高スコアに対するこの割合以上のツールを選ぶ
+            keywords: ツール名 -> 索引に加える同義語（省略時は TOOL_KEYWORDS）
+        """
+        self.max_tools = max_tools
+        self.min_score = min_score
+        self.min_relative_score = min_relative_score
+        keywords = TOOL_KEYWORDS if keywords is None else keywords
+
+        self.names: List[str] = []
+        documents = []
+        # キーワードの先頭2文字 -> (キーワードのパターン, ツールの番号)（プロンプトに現れる2文字のキーワードだけを照合する）
+        self._keywords: Dict[str, List[tuple]] = {}
+        for index, tool in enumerate(tools):
+            name, description = _tool_fields(tool)
+            self.names.append(name)
+            summary = description.strip().splitlines()[0] if description.strip() else ""
+            documents.append(ngrams(" ".join((name, summary, keywords.get(name, "")))))
+            for keyword in [_normalize(name)] + keywords.get(name, "").split():
+                keyword = _normalize(keyword)
+                if len(keyword) >= 2:
+                    self._keywords.setdefault(keyword[:2], []).append((_keyword_pattern(keyword), index))
+
+        # idf: 多くのツールに現れる n-gram（「する」「計算」など）ほど重みを小さくする
+        document_frequency: Dict[str, int] = {}
+        for grams in documents:
+            for gram in grams:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+        count = len(documents)
+        self._idf = {gram: math.log((count + 1) / (frequency + 0.5)) for gram, frequency in document_frequency.items()}
+        self._vectors = [{gram: self._idf[gram] for gram in grams} for grams in documents]
+        self._norms = [math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0 for vector in self._vectors]
+        # n-gram -> それを含むツールの番号（プロンプトに現れる n-gram のツールだけを採点する）
+        self._postings: Dict[str, List[int]] = {}
+        for index, grams in enumerate(documents):
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(index)
+        self._batch_names = {name: f"{name}_batch" for name in self.names if f"{name}_batch" in set(self.names)}
+
+    def scores(self, prompt: str) -> Dict[str, float]:
+        """ツール名 -> プロンプトとのコサイン類似度（0 のツールは含まない）"""
+        grams = [gram for gram in ngrams(prompt) if gram in self._postings]
+        if not grams:
+            return {}
+        prompt_norm = math.sqrt(sum(self._idf[gram] ** 2 for gram in grams))
+        dot: Dict[int, float] = {}
+        for gram in grams:
+            weight = self._idf[gram] ** 2
+            for index in self._postings[gram]:
+                dot[index] = dot.get(index, 0.0) + weight
+        return {self.names[index]: value / (self._norms[index] * prompt_norm) for index, value in dot.items()}
+
+    def keyword_hits(self, prompt: str) -> List[str]:
+        """プロンプトに含まれるキーワード（ツール名・同義語）を持つツール名（出現順）"""
+        text = _normalize(prompt)
+        found: Dict[int, int] = {}
+        for start in {text[i:i + 2] for i in range(len(text) - 1)}:
+            for pattern, index in self._keywords.get(start, ()):
+                match = pattern.search(text)
+                if match and (index not in found or match.start() < found[index]):
+                    found[index] = match.start()
+        return [self.names[index] for index in sorted(found, key=found.get)]
+
+    def select(self, prompt: str) -> Optional[List[str]]:
+        """選んだツール名のリスト（関係するツールを判断できない場合は None = 全ツール）"""
+        return self._select(prompt)[0]
+
+    def _select(self, prompt: str) -> tuple:
+        """(選んだツール名のリストまたは None, キーワードが含まれていたツール名)"""
+        hits = self.keyword_hits(prompt)
+        ranked = sorted(self.scores(prompt).items(), key=lambda item: -item[1])
+        top = ranked[0][1] if ranked else 0.0
+        if not hits and top < self.min_score:
+            return None, hits
+        threshold = max(self.min_score, top * self.min_relative_score)
+        similar = [name for name, score in ranked if score >= threshold and name not in hits]
+        selected = hits + similar[:max(0, self.max_tools - len(hits))]
+        selected += [self._batch_names[name] for name in selected
+                     if name in self._batch_names and self._batch_names[name] not in selected]
+        return selected, hits
+
+
+class _SubsetMiss(Exception):
+    pass
+
+
+class _SubsetMissDetector(BaseCallbackHandler):
+    """
+    選んだツールでの実行中に選択の外れを検出し、例外で実行を打ち切るコールバック
+    （raise_error により AgentExecutor の外まで伝わり、会話履歴への保存も行われない）
+
+    - モデルが存在しないツール名を返した（InvalidTool の「... is not a valid tool」になる）
+    - キーワードが含まれず類似度だけで選んだのに、ツールを1つも呼ばずに回答した
+    """
+
+    raise_error = True
+
+    def __init__(self, tool_names, keyword_matched: bool):
+        self.tool_names = tool_names
+        self.keyword_matched = keyword_matched
+        self.actions = 0
+
+    def on_agent_action(self, action, **kwargs):
+        # 出力解析エラー時の疑似ツール（_Exception）は選択の外れではない
+        if action.tool != "_Exception" and action.tool not in self.tool_names:
+            raise _SubsetMiss(f"{action.tool} is not a valid tool")
+        self.actions += 1
+
+    def on_agent_finish(self, finish, **kwargs):
+        if not self.actions and not self.keyword_matched:
+            raise _SubsetMiss("answered without tools")
+
+
+class ToolSubsettingAgent:
+    """
+    AgentExecutor をラップし、プロンプトごとに選んだツールだけをモデルに渡して実行する。
+    選んだツールごとの AgentExecutor は build_executor で作成して再利用し（会話履歴は共有）、
+    実行はすべてのツールを受け付ける（モデルが選択外のツール名を返しても実行できる）。
+    選択が外れた場合（_SubsetMissDetector）だけ全ツールで実行し直し、ツールの実行エラーなどの例外はそのまま送出する。
+    invoke 以外の属性（memory, verbose など）は元の AgentExecutor に委譲する。
+    """
+
+    def __init__(self, agent, selector: ToolSelector, build_executor: Callable[[List[Any]], Any],
+                 max_cached_executors: int = 32):
+        self.agent = agent
+        self.selector = selector
+        self.build_executor = build_executor
+        self.max_cached_executors = max_cached_executors
+        self._tools = {tool.name: tool for tool in agent.tools}
+        self._executors: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"prompts": 0, "subset": 0, "fallback_full": 0, "retried_full": 0, "selected_tools": 0,
+                      "selection_seconds": 0.0}
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def _executor_for(self, names: List[str]):
+        key = tuple(sorted(names))
+        with self._lock:
+            executor = self._executors.get(key)
+            if executor is not None:
+                self._executors.move_to_end(key)
+                return executor
+        executor = self.build_executor([self._tools[name] for name in key])
+        with self._lock:
+            self._executors[key] = executor
+            while len(self._executors) > self.max_cached_executors:
+                self._executors.popitem(last=False)
+        return executor
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        start = time.perf_counter()
+        names, hits = self.selector._select(inputs.get("input", ""))
+        if names is not None:
+            names = [name for name in names if name in self._tools]
+        subset = bool(names) and len(names) < len(self._tools)
+        with self._lock:
+            self.stats["prompts"] += 1
+            self.stats["selection_seconds"] += time.perf_counter() - start
+            self.stats["subset" if subset else "fallback_full"] += 1
+            if subset:
+                self.stats["selected_tools"] += len(names)
+
+        if not subset:
+            return self.agent.invoke(inputs, config=config, **kwargs)
+
+        # 検出用のコールバックを先頭に置き、外れたアクションを他のコールバック（軌跡の記録など）に渡さない
+        detector = _SubsetMissDetector(self._tools, keyword_matched=bool(hits))
+        subset_config = dict(config or {})
+        subset_config["callbacks"] = [detector] + list(subset_config.get("callbacks") or [])
+        try:
+            return self._executor_for(names).invoke(inputs, config=subset_config, **kwargs)
+        except _SubsetMiss:
+            with self._lock:
+                self.stats["retried_full"] += 1
+            return self.agent.invoke(inputs, config=config, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["total_tools"] = len(self._tools)
+        stats["average_selected_tools"] = stats["selected_tools"] / stats["subset"] if stats["subset"] else 0.0
+        stats["average_selection_us"] = stats["selection_seconds"] / stats["prompts"] * 1e6 if stats["prompts"] else 0.0
+        return stats
+
+
+def find_subsetting_agent(agent) -> Optional[ToolSubsettingAgent]:
+    """エージェント（軌跡キャッシュ等のラッパーを含む）から ToolSubsettingAgent を探す"""
+    while agent is not None and not isinstance(agent, ToolSubsettingAgent):
+        agent = getattr(agent, "__dict__", {}).get("agent")
+    return agent
+
+
+def print_tool_selection_stats(stats: Optional[Dict[str, Any]]):
+    if not stats or not stats["prompts"]:
+        return
+    print(f"🎯 Tool subsetting: {stats['subset']}/{stats['prompts']} prompts used "
+          f"{stats['average_selected_tools']:.1f}/{stats['total_tools']} tools "
+          f"({stats['fallback_full']} fell back to all tools, {stats['retried_full']} retried with all tools, "
+          f"{stats['average_selection_us']:.0f}µs per selection)")
+
+
+# --- カタログの拡大に対するベンチマーク ---
+
+# 合成ツールの語彙（数学関数のカタログに似た説明を持つ無関係なツール）
+_SYNTHETIC_SUBJECTS = ["文字列", "日付", "温度", "距離", "重さ", "通貨", "画像", "行列", "ベクトル", "色",
+                       "ファイル", "時刻", "角度", "面積", "体積", "速度", "圧力", "エネルギー", "周波数", "データ"]
+_SYNTHETIC_VERBS = [("convert", "を別の単位に変換する"), ("format", "を整形して表示用の文字列にする"),
+                    ("validate", "が正しい形式かどうかを検証する"), ("normalize", "を正規化する"),
+                    ("compare", "を二つ比較して差を返す"), ("parse", "を文字列から解析する"),
+                    ("round", "を指定した桁で丸める"), ("encode", "を符号化する")]
+
+
+def synthetic_tools(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """ベンチマーク用の無関係なツール定義（/tools と同じ形式）"""
+    rng = random.Random(seed)
+    tools = []
+    for index in range(count):
+        subject = _SYNTHETIC_SUBJECTS[index % len(_SYNTHETIC_SUBJECTS)]
+        verb, phrase = _SYNTHETIC_VERBS[(index // len(_SYNTHETIC_SUBJECTS)) % len(_SYNTHETIC_VERBS)]
+        suffix = index // (len(_SYNTHETIC_SUBJECTS) * len(_SYNTHETIC_VERBS))
+        tools.append({
+            "name": f"{verb}_{_SYNTHETIC_SUBJECTS.index(subject)}_{suffix}",
+            "description": f"{subject}{phrase}。\n\n使用例:\n- {verb}(値) → 結果\n- オプション {rng.randint(1, 9)} 件",
+            "parameters": {"type": "object", "properties": {"value": {"type": "string", "description": "対象の値"}},
+                           "required": ["value"]},
+        })
+    return tools
+
+
+def benchmark(tool_defs: List[Dict[str, Any]], test_cases: List[Dict[str, Any]], sizes=(21, 100, 500, 2000),
+              max_tools: int = DEFAULT_MAX_TOOLS) -> Dict[str, Any]:
+    """
+    カタログのツール数を合成ツールで増やしながら、プロンプトごとの選択時間・モデルに渡すツール定義のトークン数・
+    期待する関数の再現率（expected_functions がすべて選択に含まれる割合）を計測する
+    """
+    from tool_descriptions import count_tokens, token_counter_name
+    import json
+
+    def definition_tokens(tool: Dict[str, Any]) -> int:
+        # LangChain が送る関数定義と同じ形（parameters は CSharpFunctionTool の kwargs スキーマ）
+        return count_tokens(json.dumps({"name": tool["name"], "description": tool["description"],
+                                        "parameters": {"properties": {"kwargs": {"additionalProperties": True,
+                                                                                 "default": None, "type": "object"}},
+                                                       "type": "object"}}, ensure_ascii=False))
+
+    prompts = [test for test in test_cases if test.get("prompt") and test.get("expected_functions")]
+    base_tokens = {tool["name"]: definition_tokens(tool) for tool in tool_defs}
+    extra_pool = synthetic_tools(max(sizes) - len(tool_defs)) if max(sizes) > len(tool_defs) else []
+    extra_tokens = {tool["name"]: definition_tokens(tool) for tool in extra_pool}
+
+    results = {"counter": token_counter_name(), "prompts": len(prompts), "sizes": {}}
+    for size in sizes:
+        catalog = tool_defs + extra_pool[:max(0, size - len(tool_defs))]
+        tokens = dict(base_tokens, **extra_tokens)
+        full_tokens = sum(tokens[tool["name"]] for tool in catalog)
+
+        start = time.perf_counter()
+        selector = ToolSelector(catalog, max_tools=max_tools)
+        index_seconds = time.perf_counter() - start
+
+        selection_times, subset_tokens, recalled, fallbacks = [], [], 0, 0
+        for test in prompts:
+            start = time.perf_counter()
+            selected = selector.select(test["prompt"])
+            selection_times.append(time.perf_counter() - start)
+            if selected is None:
+                fallbacks += 1
+                selected = [tool["name"] for tool in catalog]
+            subset_tokens.append(sum(tokens[name] for name in selected))
+            recalled += set(test["expected_functions"]) <= set(selected)
+
+        results["sizes"][len(catalog)] = {
+            "index_ms": index_seconds * 1000,
+            "selection_us_median": statistics.median(selection_times) * 1e6,
+            "full_tokens": full_tokens,
+            "subset_tokens_mean": statistics.mean(subset_tokens),
+            "recall_percent": recalled / len(prompts) * 100 if prompts else 0.0,
+            "fallback_percent": fallbacks / len(prompts) * 100 if prompts else 0.0,
+        }
+    return results
+
+
+def print_benchmark_report(results: Dict[str, Any]):
+    print(f"\n📊 Tool subsetting vs catalog size ({results['prompts']} prompts, tokens: {results['counter']})")
+    print(f"  {'tools':>6} {'index':>9} {'select':>10} {'full tok':>10} {'subset tok':>11} {'saved':>7} "
+          f"{'recall':>7} {'fallback':>9}")
+    for size, entry in results["sizes"].items():
+        saved = (1 - entry["subset_tokens_mean"] / entry["full_tokens"]) * 100 if entry["full_tokens"] else 0.0
+        print(f"  {size:>6} {entry['index_ms']:>7.1f}ms {entry['selection_us_median']:>8.0f}µs "
+              f"{entry['full_tokens']:>10,} {entry['subset_tokens_mean']:>11,.0f} {saved:>6.1f}% "
+              f"{entry['recall_percent']:>6.1f}% {entry['fallback_percent']:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-prompt tool pre-selection")
+    parser.add_argument("--benchmark", action="store_true", help="Measure selection time, tokens and recall")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[21, 100, 500, 2000], help="Catalog sizes")
+    parser.add_argument("--max-tools", type=int, default=DEFAULT_MAX_TOOLS, help="Tools selected per prompt")
+    parser.add_argument("--server", type=str, help="Function server URL (default: the local stand-in tool definitions)")
+    parser.add_argument("--prompt", type=str, help="Show the tools selected for a prompt")
+    args = parser.parse_args()
+
+    try:
+        if args.server:
+            from tool_descriptions import fetch_tool_definitions
+            tool_defs = fetch_tool_definitions(args.server)
+        else:
+            import local_function_server
+            import batch_kernels
+            tool_defs = (local_function_server.load_tool_definitions() + batch_kernels.BATCH_TOOL_DEFINITIONS
+                         + [local_function_server.MAP_TOOL_DEFINITION, local_function_server.COMPOSE_TOOL_DEFINITION])
+
+        if args.prompt:
+            selector = ToolSelector(tool_defs, max_tools=args.max_tools)
+            scores = selector.scores(args.prompt)
+            print(f"Selected: {selector.select(args.prompt) or 'all tools (fallback)'}")
+            for name, score in sorted(scores.items(), key=lambda item: -item[1])[:10]:
+                print(f"  {name:<28} {score:.3f}")
+
+        if args.benchmark or not args.prompt:
+            from test_data import ALL_TESTS
+            test_cases = [test for tests in ALL_TESTS.values() for test in tests]
+            print_benchmark_report(benchmark(tool_defs, test_cases, args.sizes, args.max_tools))
+        return 0
+
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,642 @@
+"""
+C#サーバーへのツール呼び出しの耐障害性（リトライ・サーキットブレーカー・ヘッジリクエスト）と重複呼び出しの集約
+
+CSharpFunctionTool は /execute を1回だけ呼び出すため、サーバーの一時的なエラーや応答の遅れが
+そのままエージェントの失敗・待ち時間になる。このモジュールは /execute の送信を次のポリシーで包む。
+
+- リトライ: 接続エラー・タイムアウト・502/503/504 を、ジッター付き指数バックオフ（full jitter）で再送する。
+  冪等な呼び出し（サーバーの関数はすべて副作用のない計算）のみが対象
+- サーキットブレーカー: サーバー（ベースURL）ごとに連続 failure_threshold 回失敗したら reset_timeout 秒間
+  送信せずに即座に失敗させる（CircuitOpenError）。経過後は1件の試行で回復を確認する（half-open）
+- ヘッジリクエスト: 応答がそのサーバーの成功時レイテンシの hedge_percentile パーセンタイルを超えたら
+  同じリクエストをもう1本送り、先に成功した応答を使う（冪等な呼び出しのみ）
+- 重複呼び出しの集約（single-flight）: 同じ (サーバー, 関数名, 引数) の呼び出しが実行中なら新たに送信せず、
+  実行中の呼び出しの結果（またはエラー）を共有する。並行ベンチマークや複数ユーザーの実行で
+  factorial(1000) などが同時に呼ばれる場合にサーバーへのリクエストを1回にまとめる（既定で有効）
+
+ポリシーを有効にしない場合も、接続タイムアウトを読み取りタイムアウト（30秒）と分けて
+到達できないサーバーで長く待たないようにする。
+
+各ポリシーの効果は、障害を注入したローカル代替サーバー（local_function_server.FaultProfile）に対する
+ベンチマークで計測する（python tool_transport.py --benchmark）。
+
+使用方法:
+    from tool_transport import use_tool_transport, RetryPolicy
+    use_tool_transport(retry=RetryPolicy(max_attempts=3), failure_threshold=5, hedge_percentile=95)
+
+    python test_comprehensive.py --quick --tool-retries 3 --circuit-breaker 5 --hedge-percentile 95
+    python tool_transport.py --benchmark
+    python tool_transport.py --benchmark --calls 500 --scenarios errors slow_tail
+    python tool_transport.py --benchmark-coalescing --threads 16
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+
+import requests
+
+# (接続タイムアウト, 読み取りタイムアウト)
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 30.0)
+
+# リトライ・ブレーカーの失敗として扱うHTTPステータス（サーバーの一時的な障害）
+RETRYABLE_STATUS = frozenset({502, 503, 504})
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """サーキットブレーカーが開いているため送信せずに失敗した"""
+
+
+class RetryPolicy:
+    """ジッター付き指数バックオフのリトライ設定"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.1, max_delay: float = 2.0,
+                 retry_on_status=RETRYABLE_STATUS):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on_status = frozenset(retry_on_status)
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目（1始まり）の失敗後の待ち時間（0 から上限までの一様乱数）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """1つのサーバーのサーキットブレーカー（closed → open → half-open → closed）"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """結果をサーバーの成否として数えない失敗（想定外の例外）の後、half-open の試行を再び許可する"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """失敗を記録し、これによりブレーカーが開いたら True を返す"""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+                return True
+            return False
+
+
+class LatencyTracker:
+    """サーバーごとの直近の成功時レイテンシ（ヘッジの待ち時間の算出用）"""
+
+    def __init__(self, window: int = 256):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+class _Flight:
+    """実行中の1回の呼び出し（待機している呼び出しに結果を渡す）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """同じキーの実行中の呼び出しを1回にまとめ、結果・例外を待機中の呼び出しと共有する"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0}
+        self._coalesced_by_function: Dict[str, int] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], function_name: str = "") -> Any:
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            self._stats["calls"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+                self._coalesced_by_function[function_name] = self._coalesced_by_function.get(function_name, 0) + 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # 完了後の呼び出しは新たに実行する（結果をキャッシュするのではなく、同時実行分のみ共有）
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, coalesced_by_function=dict(self._coalesced_by_function))
+        stats["coalesced_percent"] = stats["coalesced"] / stats["calls"] * 100 if stats["calls"] else 0.0
+        return stats
+
+
+def coalescing_key(base_url: str, function_name: str, arguments: Dict[str, Any]) -> str:
+    """集約のキー: サーバー・関数名（大文字小文字を区別しない）・キー順を正規化した引数"""
+    return "\n".join((base_url, (function_name or "").lower(),
+                      json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)))
+
+
+class ResilientTransport:
+    """
+    /execute の送信にリトライ・サーキットブレーカー・ヘッジを適用するトランスポート
+
+    Args:
+        retry: リトライ設定（None ならリトライしない）
+        failure_threshold: サーキットブレーカーを開く連続失敗数（None なら無効）
+        reset_timeout: ブレーカーを開いてから試行を再開するまでの秒数
+        hedge_percentile: ヘッジを送るレイテンシのパーセンタイル（None なら無効）
+        hedge_min_delay: ヘッジを送るまでの最短の待ち時間（秒）
+        hedge_min_samples: ヘッジを始めるまでに必要な成功時レイテンシの件数
+        timeout: requests のタイムアウト（秒、または (接続, 読み取り)）
+        session: 使用するHTTPセッション（省略時は csharp_tools の共有セッション）
+    """
+
+    def __init__(self, retry: Optional[RetryPolicy] = None, failure_threshold: Optional[int] = None,
+                 reset_timeout: float = 10.0, hedge_percentile: Optional[float] = None,
+                 hedge_min_delay: float = 0.05, hedge_min_samples: int = 20,
+                 timeout: Timeout = DEFAULT_TIMEOUT, session: Optional[requests.Session] = None):
+        self.retry = retry
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.timeout = timeout
+        self.session = session
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "failed_attempts": 0, "circuit_rejections": 0,
+                       "circuit_opens": 0, "hedges": 0, "hedge_wins": 0}
+
+    def describe(self) -> str:
+        policies = []
+        if self.retry:
+            policies.append(f"retry x{self.retry.max_attempts}")
+        if self.failure_threshold:
+            policies.append(f"circuit breaker after {self.failure_threshold} failures")
+        if self.hedge_percentile:
+            policies.append(f"hedge at p{self.hedge_percentile:g}")
+        return ", ".join(policies) or "single attempt"
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _get_session(self) -> requests.Session:
+        if self.session is not None:
+            return self.session
+        from csharp_tools import get_http_session
+        return get_http_session()
+
+    def _breaker(self, base_url: str) -> Optional[CircuitBreaker]:
+        if not self.failure_threshold:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(base_url)
+            if breaker is None:
+                breaker = self._breakers[base_url] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _latency(self, base_url: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._latencies.get(base_url)
+            if tracker is None:
+                tracker = self._latencies[base_url] = LatencyTracker()
+            return tracker
+
+    def _send(self, url: str, payload: Dict[str, Any]) -> requests.Response:
+        self._count("attempts")
+        return self._get_session().post(url, json=payload, headers={"Content-Type": "application/json"},
+                                        timeout=self.timeout)
+
+    def _hedged_send(self, url: str, payload: Dict[str, Any], delay: float) -> requests.Response:
+        """delay 秒以内に応答がなければ同じリクエストをもう1本送り、先に成功した応答を返す"""
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        primary = self._hedge_pool.submit(self._send, url, payload)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = self._hedge_pool.submit(self._send, url, payload)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: f.exception() is not None):
+                # 片方が失敗しても、もう片方が残っていればその応答を待つ
+                if future.exception() is None or not pending:
+                    if future is hedge and future.exception() is None:
+                        self._count("hedge_wins")
+                    return future.result()
+
+    def post(self, base_url: str, path: str, payload: Dict[str, Any], idempotent: bool = True) -> requests.Response:
+        """
+        base_url + path に JSON を送信する（ポリシーで回復できなかった失敗は requests の例外として送出）
+
+        502/503/504 の応答はリトライし尽くした後、最後の応答をそのまま返す（呼び出し側の raise_for_status に任せる）
+        """
+        self._count("calls")
+        url = f"{base_url}{path}"
+        breaker = self._breaker(base_url)
+        max_attempts = self.retry.max_attempts if self.retry and idempotent else 1
+        latency = self._latency(base_url)
+        retry_status = self.retry.retry_on_status if self.retry else RETRYABLE_STATUS
+
+        for attempt in range(1, max_attempts + 1):
+            if breaker is not None and not breaker.allow():
+                self._count("circuit_rejections")
+                raise CircuitOpenError(f"Circuit open for {base_url}: failing fast "
+                                       f"(retry in {breaker.retry_after():.1f}s)")
+
+            hedge_delay = None
+            if self.hedge_percentile and idempotent:
+                threshold = latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+                if threshold is not None:
+                    hedge_delay = max(self.hedge_min_delay, threshold)
+
+            start = time.perf_counter()
+            try:
+                if hedge_delay is not None:
+                    response = self._hedged_send(url, payload, hedge_delay)
+                else:
+                    response = self._send(url, payload)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record_failure(breaker)
+                if attempt == max_attempts:
+                    raise
+            except BaseException:
+                # リトライしない例外でも half-open の試行中フラグを残さない（残すとブレーカーが開いたままになる）
+                if breaker is not None:
+                    breaker.release_probe()
+                raise
+            else:
+                if response.status_code not in retry_status:
+                    latency.add(time.perf_counter() - start)
+                    if breaker is not None:
+                        breaker.record_success()
+                    return response
+                self._record_failure(breaker)
+                if attempt == max_attempts:
+                    return response
+
+            self._count("retries")
+            time.sleep(self.retry.backoff(attempt))
+
+    def _record_failure(self, breaker: Optional[CircuitBreaker]):
+        self._count("failed_attempts")
+        if breaker is not None and breaker.record_failure():
+            self._count("circuit_opens")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_circuits"] = [url for url, breaker in self._breakers.items() if breaker.state != "closed"]
+        stats["policy"] = self.describe()
+        return stats
+
+
+_default_transport: Optional[ResilientTransport] = None
+_active_transport: Optional[ResilientTransport] = None
+
+
+def use_tool_transport(retry: Optional[RetryPolicy] = None, failure_threshold: Optional[int] = None,
+                       reset_timeout: float = 10.0, hedge_percentile: Optional[float] = None,
+                       timeout: Timeout = DEFAULT_TIMEOUT) -> ResilientTransport:
+    """以降のツール呼び出し（CSharpFunctionTool）に使うトランスポートのポリシーを設定する"""
+    global _active_transport
+    _active_transport = ResilientTransport(retry=retry, failure_threshold=failure_threshold,
+                                           reset_timeout=reset_timeout, hedge_percentile=hedge_percentile,
+                                           timeout=timeout)
+    print(f"🛟 Tool transport: {_active_transport.describe()}")
+    return _active_transport
+
+
+def get_active_tool_transport() -> Optional[ResilientTransport]:
+    return _active_transport
+
+
+def get_tool_transport() -> ResilientTransport:
+    """有効なトランスポート（use_tool_transport で設定していなければ1回だけ送信する既定のもの）"""
+    global _default_transport
+    if _active_transport is not None:
+        return _active_transport
+    if _default_transport is None:
+        _default_transport = ResilientTransport()
+    return _default_transport
+
+
+# プロセス内で共有する重複呼び出しの集約（CSharpFunctionTool の冪等な呼び出しに適用）
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
+
+
+def set_request_coalescing(enabled: bool):
+    """同一の同時ツール呼び出しの集約を有効/無効にする（既定は有効）"""
+    _single_flight.enabled = enabled
+
+
+def print_tool_transport_stats(transport: Optional[ResilientTransport] = None):
+    transport = transport or _active_transport
+    if transport is not None:
+        stats = transport.get_stats()
+        print(f"🛟 Tool transport ({stats['policy']}): {stats['calls']} calls, {stats['attempts']} attempts, "
+              f"{stats['retries']} retries, {stats['hedges']} hedges ({stats['hedge_wins']} won), "
+              f"{stats['circuit_rejections']} failed fast, {stats['circuit_opens']} circuit opens")
+    coalescing = _single_flight.get_stats()
+    if coalescing["coalesced"]:
+        print(f"🔗 Coalesced tool calls: {coalescing['coalesced']}/{coalescing['calls']} "
+              f"({coalescing['coalesced_percent']:.1f}%) shared an identical in-flight request")
+        for function_name, count in sorted(coalescing["coalesced_by_function"].items(), key=lambda item: -item[1]):
+            print(f"    {function_name:<24} {count:>6}")
+
+
+# --- 障害注入ベンチマーク ---
+
+# シナリオ名 -> (説明, FaultProfile の引数, 呼び出し数の割合)
+BENCHMARK_SCENARIOS: Dict[str, Tuple[str, Dict[str, Any], float]] = {
+    "healthy": ("no faults", {}, 1.0),
+    "errors": ("20% of requests answered with 503", {"error_rate": 0.2}, 1.0),
+    "drops": ("10% of connections closed without a response", {"drop_rate": 0.1}, 1.0),
+    "slow_tail": ("5% of requests delayed by 0.3s", {"delay_rate": 0.05, "delay_seconds": 0.3}, 1.0),
+    # 応答しないサーバー: 呼び出しのたびにタイムアウトまで待たされる（呼び出し数は 1/10）
+    "outage": ("server accepts connections but never answers", {"delay_rate": 1.0, "delay_seconds": 30.0}, 0.1),
+}
+
+
+def benchmark_policies() -> Dict[str, Dict[str, Any]]:
+    """ポリシー名 -> ResilientTransport の引数"""
+    retry = RetryPolicy(max_attempts=3, base_delay=0.02, max_delay=0.2)
+    return {
+        "single": {},
+        "retry": {"retry": retry},
+        "retry+breaker": {"retry": retry, "failure_threshold": 5, "reset_timeout": 2.0},
+        "retry+hedge": {"retry": retry, "hedge_percentile": 90, "hedge_min_delay": 0.01},
+    }
+
+
+def _percentile(data: List[float], percentile: float) -> float:
+    ordered = sorted(data)
+    return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)] if ordered else 0.0
+
+
+def _run_calls(transport: ResilientTransport, base_url: str, calls: int) -> Dict[str, Any]:
+    latencies = []
+    succeeded = 0
+    for i in range(calls):
+        start = time.perf_counter()
+        try:
+            response = transport.post(base_url, "/execute", {
+                "function_name": "is_prime", "arguments": {"number": 1000 + i}, "request_id": str(i)})
+            succeeded += response.status_code == 200 and response.json().get("success", False)
+        except requests.exceptions.RequestException:
+            pass
+        latencies.append(time.perf_counter() - start)
+    stats = transport.get_stats()
+    return {
+        "calls": calls,
+        "success_rate": succeeded / calls * 100 if calls else 0.0,
+        "mean": sum(latencies) / calls if calls else 0.0,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+        "total_seconds": sum(latencies),
+        "attempts_per_call": stats["attempts"] / calls if calls else 0.0,
+        "hedges": stats["hedges"],
+        "failed_fast": stats["circuit_rejections"],
+    }
+
+
+def benchmark(scenarios: List[str], calls: int = 200, timeout: float = 0.5, seed: int = 0) -> Dict[str, Any]:
+    """
+    障害を注入したローカル代替サーバーを起動し、シナリオごとに各ポリシーで /execute を calls 回呼び出す
+
+    timeout は読み取りタイムアウト（応答しないサーバーで1回の試行が待たされる時間）
+    """
+    from local_function_server import create_server, FaultProfile
+
+    results = {"calls": calls, "timeout": timeout, "scenarios": {}}
+    for scenario in scenarios:
+        description, fault_args, call_share = BENCHMARK_SCENARIOS[scenario]
+        scenario_calls = max(1, int(calls * call_share))
+        rows = {}
+        for policy_name, policy_args in benchmark_policies().items():
+            server = create_server(port=0, batch=False, map_tool=False, compose_tool=False,
+                                   faults=FaultProfile(seed=seed, **fault_args))
+            server.RequestHandlerClass.log_message = lambda handler, *log_args: None
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://localhost:{server.server_address[1]}"
+            session = requests.Session()
+            try:
+                random.seed(seed)
+                transport = ResilientTransport(timeout=(1.0, timeout), session=session, **policy_args)
+                rows[policy_name] = _run_calls(transport, base_url, scenario_calls)
+            finally:
+                server.shutdown()
+                server.server_close()
+                session.close()
+        results["scenarios"][scenario] = {"description": description, "calls": scenario_calls, "policies": rows}
+    return results
+
+
+def print_benchmark_report(results: Dict[str, Any]):
+    print(f"\n🛟 Tool transport fault-injection benchmark (read timeout {results['timeout']}s)")
+    for scenario, data in results["scenarios"].items():
+        print(f"\n  {scenario}: {data['description']} ({data['calls']} calls)")
+        print(f"    {'policy':<15}{'success':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'total':>9}"
+              f"{'attempts':>10}{'hedges':>8}{'fast-fail':>11}")
+        for policy, row in data["policies"].items():
+            print(f"    {policy:<15}{row['success_rate']:>8.1f}%{row['mean'] * 1000:>7.1f}ms"
+                  f"{row['p50'] * 1000:>7.1f}ms{row['p95'] * 1000:>7.1f}ms{row['p99'] * 1000:>7.1f}ms"
+                  f"{row['total_seconds']:>8.2f}s{row['attempts_per_call']:>10.2f}{row['hedges']:>8}"
+                  f"{row['failed_fast']:>11}")
+
+
+# 並行ベンチマークで複数のエージェントが同時に呼び出す典型的なツール呼び出し
+COALESCING_HOT_CALLS: List[Tuple[str, Dict[str, Any]]] = [
+    ("factorial", {"number": 1000}),
+    ("prime_factorization", {"number": 999983}),
+    ("is_prime", {"number": 1000003}),
+]
+
+
+def coalescing_benchmark(threads: int = 16, rounds: int = 20, server_delay: float = 0.02) -> Dict[str, Any]:
+    """
+    threads 本のスレッドが各ラウンドで同じツール呼び出しを同時に行い、集約なし/ありのサーバーへの
+    リクエスト数と呼び出しの待ち時間を比較する（サーバーは各リクエストに server_delay 秒かかる）
+    """
+    from local_function_server import create_server, FaultProfile
+
+    results = {"threads": threads, "rounds": rounds, "server_delay": server_delay, "modes": {}}
+    for mode, enabled in (("no coalescing", False), ("coalescing", True)):
+        server = create_server(port=0, batch=False, map_tool=False, compose_tool=False,
+                               faults=FaultProfile(delay_rate=1.0, delay_seconds=server_delay))
+        server.RequestHandlerClass.log_message = lambda handler, *log_args: None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://localhost:{server.server_address[1]}"
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=threads))
+        transport = ResilientTransport(session=session)
+        flight = SingleFlight(enabled=enabled)
+        barrier = threading.Barrier(threads)
+        latencies: List[float] = []
+        failures = []
+        lock = threading.Lock()
+
+        def worker():
+            for round_index in range(rounds):
+                function_name, arguments = COALESCING_HOT_CALLS[round_index % len(COALESCING_HOT_CALLS)]
+                payload = {"function_name": function_name, "arguments": arguments, "request_id": ""}
+                barrier.wait()
+                start = time.perf_counter()
+                try:
+                    response = flight.do(coalescing_key(base_url, function_name, arguments),
+                                         lambda: transport.post(base_url, "/execute", payload), function_name)
+                    ok = response.status_code == 200
+                except requests.exceptions.RequestException:
+                    ok = False
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                    if not ok:
+                        failures.append(round_index)
+
+        try:
+            start = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            wall_time = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+            session.close()
+
+        flight_stats = flight.get_stats()
+        results["modes"][mode] = {
+            "calls": len(latencies),
+            "server_requests": transport.get_stats()["attempts"],
+            "coalesced": flight_stats["coalesced"],
+            "failures": len(failures),
+            "wall_time": wall_time,
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p95": _percentile(latencies, 95),
+        }
+    return results
+
+
+def print_coalescing_report(results: Dict[str, Any]):
+    print(f"\n🔗 Single-flight coalescing benchmark ({results['threads']} threads x {results['rounds']} rounds "
+          f"of identical calls, {results['server_delay'] * 1000:.0f}ms server time per request)")
+    print(f"    {'mode':<15}{'calls':>7}{'requests':>10}{'coalesced':>11}{'failures':>10}{'mean':>9}{'p95':>9}{'wall':>9}")
+    for mode, row in results["modes"].items():
+        print(f"    {mode:<15}{row['calls']:>7}{row['server_requests']:>10}{row['coalesced']:>11}{row['failures']:>10}"
+              f"{row['mean'] * 1000:>7.1f}ms{row['p95'] * 1000:>7.1f}ms{row['wall_time']:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resilient tool transport: fault-injection and coalescing benchmarks")
+    parser.add_argument("--benchmark", action="store_true", help="Run the fault-injection benchmark")
+    parser.add_argument("--scenarios", type=str, nargs="+", default=list(BENCHMARK_SCENARIOS),
+                        choices=list(BENCHMARK_SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--calls", type=int, default=200, help="Tool calls per scenario and policy (default: 200)")
+    parser.add_argument("--timeout", type=float, default=0.5, help="Read timeout per attempt in seconds (default: 0.5)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for fault injection and jitter")
+    parser.add_argument("--benchmark-coalescing", action="store_true",
+                        help="Compare server requests with and without coalescing identical concurrent calls")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent callers for --benchmark-coalescing")
+    parser.add_argument("--rounds", type=int, default=20, help="Rounds of identical calls for --benchmark-coalescing")
+    args = parser.parse_args()
+
+    if not (args.benchmark or args.benchmark_coalescing):
+        parser.print_help()
+        return 0
+    try:
+        if args.benchmark:
+            print_benchmark_report(benchmark(args.scenarios, args.calls, args.timeout, args.seed))
+        if args.benchmark_coalescing:
+            print_coalescing_report(coalescing_benchmark(args.threads, args.rounds))
+        return 0
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+ツール呼び出し軌跡のキャッシュ（同一プロンプトでのモデル呼び出しの省略）
+
+正規化後に同一となるプロンプトは、常に同じ順序・同じ引数のツール呼び出しを経て同じ回答になる。
+エージェントが成功した実行の軌跡（ツール名と引数の順序付きリスト、各ツールの結果、最終回答のテンプレート）を
+正規化プロンプトごとに保存し、次回以降はモデルを呼ばずにツールだけをC#サーバーへ直接再実行する。
+
+再実行中にツールの結果が記録と異なる・ツールが存在しない・エラーになる、のいずれかが起きた場合は
+その時点で軌跡を破棄し、通常どおりエージェント（LLM）で処理し直す。
+
+- キー: プロンプトの正規化（NFKC、空白の統一、小文字化）とツール定義の集合から決まる SHA-256
+- 会話履歴はキーに含めない（履歴に依存する追加質問は、ツール結果の不一致で検出されない限り再利用される）
+- 最終回答は各ツール結果の出現箇所をプレースホルダーにしたテンプレートとして保存し、再実行の結果で埋める
+- キャッシュから回答した場合も、invoke に渡されたコールバックにはチェーン・ツールのイベントを発生させる
+  （モデルは呼ばないため LLM のイベントは発生しない）。応答の "trajectory_cache_hit" でヒットかどうかを返す
+
+使用方法:
+    from trajectory_cache import use_trajectory_cache
+    use_trajectory_cache(".trajectory_cache")      # 以降に create_agent で作成するエージェントで有効
+
+    python test_comprehensive.py --quick --trajectory-cache .trajectory_cache
+    python trajectory_cache.py --info .trajectory_cache
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManager
+
+CACHE_VERSION = 1
+
+# 最終回答テンプレート中のツール結果のプレースホルダー
+PLACEHOLDER_FORMAT = "{{{{step_{index}}}}}"
+PLACEHOLDER_PATTERN = re.compile(r"\{\{step_(\d+)\}\}")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """全角/半角・空白・大文字小文字の違いを吸収したプロンプト"""
+    prompt = unicodedata.normalize("NFKC", prompt)
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+def trajectory_key(prompt: str, tool_names: List[str]) -> str:
+    payload = json.dumps({"version": CACHE_VERSION, "prompt": normalize_prompt(prompt), "tools": sorted(tool_names)},
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_answer_template(answer: str, observations: List[str]) -> str:
+    """回答中のツール結果（数値の一部に一致するものは除く）をプレースホルダーに置き換える"""
+    # 長い結果から置換し、"36" の中の "6" のような部分一致を避ける
+    for index in sorted(range(len(observations)), key=lambda i: -len(observations[i])):
+        observation = observations[index]
+        if not observation:
+            continue
+        pattern = r"(?<![\w.])" + re.escape(observation) + r"(?![\w.])"
+        answer = re.sub(pattern, PLACEHOLDER_FORMAT.format(index=index), answer)
+    return answer
+
+
+def fill_answer_template(template: str, observations: List[str]) -> str:
+    return PLACEHOLDER_PATTERN.sub(lambda match: observations[int(match.group(1))], template)
+
+
+class TrajectoryRecorder(BaseCallbackHandler):
+    """
+    エージェント実行中のツール呼び出しと結果を順に記録するコールバック
+
+    ツールの結果は on_tool_start で対応付けたツール実行の run_id で各ステップに渡すため、
+    並列実行でツールの完了順が前後しても結果が入れ替わらない。
+    """
+
+    def __init__(self):
+        self.steps: List[Dict[str, Any]] = []
+        self.valid = True
+        self._steps_by_run: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def on_agent_action(self, action, **kwargs):
+        # 出力解析エラー時の疑似ツールを含む軌跡は再利用しない
+        if action.tool == "_Exception":
+            self.valid = False
+        with self._lock:
+            self.steps.append({"tool": action.tool, "tool_input": action.tool_input, "observation": None})
+
+    def on_tool_start(self, serialized, input_str, *, run_id=None, inputs=None, **kwargs):
+        name = (serialized or {}).get("name")
+        with self._lock:
+            started = [id(step) for step in self._steps_by_run.values()]
+            candidates = [step for step in self.steps if id(step) not in started and step["tool"] == name]
+            # 同じツールの呼び出しが複数ある場合は引数で区別する
+            matching = [step for step in candidates
+                        if step["tool_input"] == inputs or str(step["tool_input"]) == input_str]
+            if matching or candidates:
+                self._steps_by_run[run_id] = (matching or candidates)[0]
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        with self._lock:
+            step = self._steps_by_run.get(run_id)
+            if step is None:
+                self.valid = False
+                return
+            step["observation"] = str(getattr(output, "content", output))
+
+    def on_tool_error(self, error, **kwargs):
+        self.valid = False
+
+    def on_chain_error(self, error, **kwargs):
+        # 途中で打ち切られた実行（選択したツールでの実行の中断など）のステップは軌跡として使えない
+        self.valid = False
+
+
+class TrajectoryCache:
+    """正規化プロンプトごとの成功した軌跡（ディスク保存）"""
+
+    def __init__(self, cache_dir: str = ".trajectory_cache"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.divergences = 0
+        self.stored = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, prompt: str, steps: List[Dict[str, Any]], answer: str, elapsed: float):
+        observations = [step["observation"] for step in steps]
+        entry = {
+            "version": CACHE_VERSION,
+            "prompt": normalize_prompt(prompt),
+            "recorded_at": datetime.now().isoformat(),
+            "agent_seconds": elapsed,
+            "steps": steps,
+            "answer_template": build_answer_template(answer, observations),
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stored += 1
+
+    def discard(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def record_hit(self, saved_seconds: float):
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += saved_seconds
+
+    def record_miss(self, diverged: bool = False):
+        with self._lock:
+            self.misses += 1
+            if diverged:
+                self.divergences += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_dir": self.cache_dir,
+                "hits": self.hits,
+                "misses": self.misses,
+                "divergences": self.divergences,
+                "stored": self.stored,
+                "hit_rate": (self.hits / lookups * 100) if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+class TrajectoryCachingAgent:
+    """
+    AgentExecutor をラップし、キャッシュ済みの軌跡があればツールのみを再実行して回答する。
+    invoke 以外の属性（memory, verbose など）は元の AgentExecutor に委譲する。
+    """
+
+    def __init__(self, agent, cache: TrajectoryCache):
+        self.agent = agent
+        self.cache = cache
+        self._tools = {tool.name: tool for tool in agent.tools}
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Returns:
+            AgentExecutor.invoke の応答に "trajectory_cache_hit"（キャッシュから回答したか）を加えたもの
+        """
+        prompt = inputs.get("input", "")
+        key = trajectory_key(prompt, list(self._tools))
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            replay_start = time.time()
+            # 呼び出し元のコールバック（ターン数・タイミング・トークン集計など）にも再実行のイベントを渡す
+            callback_manager = CallbackManager.configure((config or {}).get("callbacks"))
+            run_manager = callback_manager.on_chain_start({"name": "TrajectoryCachingAgent"}, inputs,
+                                                          name="TrajectoryCachingAgent")
+            output = self._replay(entry, run_manager)
+            if output is not None:
+                # 節約時間は記録時のエージェント実行時間からツール再実行の時間を引いたもの
+                self.cache.record_hit(max(0.0, entry.get("agent_seconds", 0.0) - (time.time() - replay_start)))
+                if self.agent.memory is not None:
+                    self.agent.memory.save_context({"input": prompt}, {"output": output})
+                run_manager.on_chain_end({"output": output})
+                return {**inputs, "output": output, "trajectory_cache_hit": True}
+            # ツール結果が記録と異なるため軌跡を破棄してエージェントで処理する
+            run_manager.on_chain_error(Exception("Cached trajectory diverged; falling back to the agent"))
+            self.cache.discard(key)
+        self.cache.record_miss(diverged=entry is not None)
+
+        recorder = TrajectoryRecorder()
+        config = dict(config or {})
+        config["callbacks"] = list(config.get("callbacks") or []) + [recorder]
+        start_time = time.time()
+        response = self.agent.invoke(inputs, config=config, **kwargs)
+
+        steps = recorder.steps
+        if recorder.valid and steps and all(step["observation"] is not None for step in steps):
+            self.cache.put(key, prompt, steps, str(response.get("output", "")), time.time() - start_time)
+        return {**response, "trajectory_cache_hit": False}
+
+    def _replay(self, entry: Dict[str, Any], run_manager=None) -> Optional[str]:
+        """記録された順にツールを実行し、全結果が一致すれば回答を返す（不一致なら None）"""
+        verbose = self.agent.verbose
+        if verbose:
+            print("\n\n> Entering new AgentExecutor chain (trajectory cache)...")
+        observations = []
+        for step in entry["steps"]:
+            tool = self._tools.get(step["tool"])
+            if tool is None:
+                return None
+            if verbose:
+                print(f"\nInvoking: `{step['tool']}` with `{step['tool_input']}`\n")
+            try:
+                observation = str(tool.run(step["tool_input"], verbose=False,
+                                           callbacks=run_manager.get_child() if run_manager else None))
+            except Exception:
+                return None
+            if observation != step["observation"]:
+                return None
+            if verbose:
+                print(observation)
+            observations.append(observation)
+
+        output = fill_answer_template(entry["answer_template"], observations)
+        if verbose:
+            print(f"{output}\n\n> Finished chain.")
+        return output
+
+
+# 以降に作成されるエージェントが使用するキャッシュ
+_active_trajectory_cache: Optional[TrajectoryCache] = None
+
+
+def use_trajectory_cache(cache_dir: str = ".trajectory_cache") -> TrajectoryCache:
+    """軌跡キャッシュを有効にする（create_agent で作成するエージェントに適用される）"""
+    global _active_trajectory_cache
+    _active_trajectory_cache = TrajectoryCache(cache_dir)
+    print(f"🧭 Tool trajectory cache: {cache_dir}")
+    return _active_trajectory_cache
+
+
+def get_active_trajectory_cache() -> Optional[TrajectoryCache]:
+    return _active_trajectory_cache
+
+
+def print_trajectory_cache_stats(cache: Optional[TrajectoryCache] = None):
+    cache = cache or _active_trajectory_cache
+    if cache is None:
+        return
+    stats = cache.get_stats()
+    print(f"🧭 Trajectory cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.1f}% hit rate, {stats['divergences']} divergences), "
+          f"{stats['saved_seconds']:.2f}s of agent time saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the tool trajectory cache")
+    parser.add_argument("--info", type=str, required=True, metavar="DIR", help="Trajectory cache directory")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.info):
+        print(f"❌ Cache directory not found: {args.info}")
+        return 1
+
+    entries = []
+    for name in sorted(os.listdir(args.info)):
+        if name.endswith(".json"):
+            with open(os.path.join(args.info, name), 'r', encoding='utf-8') as f:
+                entries.append(json.load(f))
+
+    print(f"Entries: {len(entries)}")
+    for entry in entries:
+        tools = " -> ".join(step["tool"] for step in entry["steps"])
+        print(f"  {entry['prompt'][:50]:<50} {tools}")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
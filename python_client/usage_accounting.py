@@ -0,0 +1,127 @@
+"""
+トークン数と /execute の送受信バイト数の集計
+
+TestResult.to_dict() の記録（JSON / JSONL の結果ファイルの1件）を受け取り、全体と
+複雑度・カテゴリ・言語ごとの合計・平均を求める。TestSession と test_reporter.py（HTMLレポート）の両方から
+使うため、標準ライブラリのみに依存する。
+
+記録されるフィールド（1テストあたり）:
+- prompt_tokens / completion_tokens: モデル呼び出しの入力・出力トークン数の合計（API の報告値、なければ概算）
+- tool_schema_tokens: prompt_tokens のうちツール定義（functions / tools 引数）が占めるトークン数
+- tool_calls_sent: /execute への送信回数、tool_request_bytes / tool_response_bytes: その本文のバイト数
+- tool_payloads: ツール名 -> {calls, request_bytes, response_bytes}
+
+使用方法:
+    from usage_accounting import usage_breakdown, print_usage_breakdown
+    usage = usage_breakdown(session.to_dict()["results"])
+    print_usage_breakdown(usage)
+"""
+
+from typing import Dict, Any, Iterable
+
+# テストごとに合計するフィールド
+USAGE_FIELDS = ("model_turns", "prompt_tokens", "completion_tokens", "tool_schema_tokens",
+                "tool_calls_sent", "tool_request_bytes", "tool_response_bytes")
+
+# 内訳を求める TestResult のフィールド
+USAGE_DIMENSIONS = ("complexity", "category", "language")
+
+
+def new_usage_totals() -> Dict[str, Any]:
+    totals = {"tests": 0, "execution_time": 0.0, "estimated_tests": 0}
+    totals.update((field, 0) for field in USAGE_FIELDS)
+    return totals
+
+
+def add_usage(totals: Dict[str, Any], record: Dict[str, Any]):
+    """1件の記録を合計に加える"""
+    totals["tests"] += 1
+    totals["execution_time"] += record.get("execution_time", 0) or 0
+    if record.get("token_usage_estimated"):
+        totals["estimated_tests"] += 1
+    for field in USAGE_FIELDS:
+        totals[field] += record.get(field, 0) or 0
+
+
+def finalize_usage(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """合計にテスト・ターン・ツール呼び出しあたりの平均を加える"""
+    tests, turns, calls = totals["tests"], totals["model_turns"], totals["tool_calls_sent"]
+    summary = dict(totals)
+    summary["avg_execution_time"] = totals["execution_time"] / tests if tests else 0.0
+    summary["turns_per_test"] = turns / tests if tests else 0.0
+    summary["prompt_tokens_per_test"] = totals["prompt_tokens"] / tests if tests else 0.0
+    summary["completion_tokens_per_test"] = totals["completion_tokens"] / tests if tests else 0.0
+    summary["prompt_tokens_per_turn"] = totals["prompt_tokens"] / turns if turns else 0.0
+    summary["tool_schema_share"] = (totals["tool_schema_tokens"] / totals["prompt_tokens"] * 100
+                                    if totals["prompt_tokens"] else 0.0)
+    summary["bytes_per_tool_call"] = ((totals["tool_request_bytes"] + totals["tool_response_bytes"]) / calls
+                                      if calls else 0.0)
+    return summary
+
+
+class UsageAggregator:
+    """記録を1件ずつ加えて全体・ツールごと・次元（複雑度・カテゴリ・言語）ごとの使用量を求める"""
+
+    def __init__(self):
+        self.overall = new_usage_totals()
+        self.by_tool: Dict[str, Dict[str, int]] = {}
+        self.groups: Dict[str, Dict[str, Dict[str, Any]]] = {dimension: {} for dimension in USAGE_DIMENSIONS}
+
+    def add(self, record: Dict[str, Any]):
+        add_usage(self.overall, record)
+        for dimension in USAGE_DIMENSIONS:
+            key = record.get(dimension) or "unknown"
+            add_usage(self.groups[dimension].setdefault(key, new_usage_totals()), record)
+        for tool_name, payload in (record.get("tool_payloads") or {}).items():
+            tool = self.by_tool.setdefault(tool_name, {"calls": 0, "request_bytes": 0, "response_bytes": 0})
+            for field in tool:
+                tool[field] += payload.get(field, 0)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Returns:
+            {"overall": {...}, "by_tool": {ツール名: {...}}, "complexity": {値: {...}}, "category": ..., "language": ...}
+        """
+        breakdown = {"overall": finalize_usage(self.overall),
+                     "by_tool": {name: dict(tool) for name, tool in self.by_tool.items()}}
+        for dimension, values in self.groups.items():
+            breakdown[dimension] = {key: finalize_usage(totals) for key, totals in values.items()}
+        return breakdown
+
+
+def usage_breakdown(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """記録を1回走査して使用量の内訳（UsageAggregator.breakdown）を求める"""
+    aggregator = UsageAggregator()
+    for record in records:
+        aggregator.add(record)
+    return aggregator.breakdown()
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:,.0f}{unit}" if unit == "B" else f"{size:,.1f}{unit}"
+        size /= 1024
+
+
+def print_usage_breakdown(usage: Dict[str, Any]):
+    overall = usage["overall"]
+    if not overall["tests"] or not (overall["prompt_tokens"] or overall["tool_calls_sent"]):
+        return
+    estimated = f", {overall['estimated_tests']} tests estimated" if overall["estimated_tests"] else ""
+    print(f"🔢 Tokens: {overall['prompt_tokens']:,} prompt / {overall['completion_tokens']:,} completion "
+          f"({overall['prompt_tokens_per_turn']:,.0f} prompt tokens per turn, "
+          f"{overall['tool_schema_share']:.1f}% tool definitions{estimated})")
+    print(f"📦 Tool payloads: {overall['tool_calls_sent']} /execute calls, "
+          f"{_format_bytes(overall['tool_request_bytes'])} sent, {_format_bytes(overall['tool_response_bytes'])} received")
+    for dimension in USAGE_DIMENSIONS:
+        groups = usage[dimension]
+        if len(groups) < 2:
+            continue
+        print(f"\n🔢 Usage by {dimension.title()}:")
+        print(f"  {'':<20}{'tests':>7}{'turns/test':>12}{'prompt/test':>13}{'compl/test':>12}"
+              f"{'schema %':>10}{'bytes/call':>12}{'avg time':>10}")
+        for key, stats in groups.items():
+            print(f"  {key:<20}{stats['tests']:>7}{stats['turns_per_test']:>12.1f}{stats['prompt_tokens_per_test']:>13,.0f}"
+                  f"{stats['completion_tokens_per_test']:>12,.0f}{stats['tool_schema_share']:>9.1f}%"
+                  f"{stats['bytes_per_tool_call']:>12,.0f}{stats['avg_execution_time']:>9.2f}s")